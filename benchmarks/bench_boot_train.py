@@ -0,0 +1,135 @@
+"""Measure BootIssuePredictor training memory and time on a large CSV.
+
+Generates a synthetic boot-issue CSV, then runs each mode in a fresh
+interpreter and reports its wall time and peak RSS. Run from the
+repository root::
+
+    python benchmarks/bench_boot_train.py --rows 10000000
+
+Modes:
+
+* ``baseline`` -- interpreter plus pandas/sklearn imports only.
+* ``read_legacy`` -- ``pd.read_csv`` with inferred dtypes (what
+  ``load_data`` did before it declared dtypes; load only, no fit).
+* ``read_typed`` -- ``BootIssuePredictor.load_data`` with explicit dtypes.
+* ``stream_sgd`` -- full ``BootIssuePredictor(incremental=True)`` training.
+* ``forest`` -- full random-forest training (slow beyond ~1M rows).
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HELPERS = (
+    "boot_repair.py", "llm_cache.py", "memory_utils.py", "patch_utils.py",
+    "telemetry_utils.py", "voice_utils.py",
+)
+
+CHILD = """
+import logging, resource, sys, time
+logging.disable(logging.INFO)
+mode, chunksize = sys.argv[1], int(sys.argv[2])
+# Import everything up front so every mode shares the same fixed cost.
+import pandas as pd
+import sklearn.ensemble, sklearn.linear_model, sklearn.pipeline
+from boot_repair import BootIssuePredictor, DATA_DIR
+csv = DATA_DIR / "synthetic_boot_issues.csv"
+start = time.perf_counter()
+if mode == "baseline":
+    rows = 0
+elif mode == "read_legacy":
+    rows = len(pd.read_csv(csv))
+elif mode == "read_typed":
+    p = BootIssuePredictor(data_path=DATA_DIR / "missing.csv")
+    rows = len(p.load_data(csv))
+else:
+    p = BootIssuePredictor(
+        incremental=(mode == "stream_sgd"), chunksize=chunksize)
+    assert p.is_fitted, "training failed"
+    rows = -1
+elapsed = time.perf_counter() - start
+try:
+    # VmHWM starts fresh at exec; ru_maxrss inherits the parent's peak.
+    with open("/proc/self/status") as f:
+        hwm = next(line for line in f if line.startswith("VmHWM"))
+    rss_mb = int(hwm.split()[1]) / 1024
+except OSError:
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(f"{elapsed:.2f} {rss_mb:.0f} {rows}")
+"""
+
+
+def write_csv(path: Path, rows: int, chunk: int = 1_000_000):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    header = True
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        cpu = (rng.random(n) * 100).round(1)
+        mem = (rng.random(n) * 100).round(1)
+        disk = (rng.random(n) * 500).round(2)
+        efi = rng.random(n) < 0.5
+        issue = np.where(
+            disk < 20, "filesystem_corrupt",
+            np.where(mem > 95, "kernel_panic_rootfs",
+                     np.where(~efi & (cpu > 90), "grub_device_error",
+                              "no_issue")))
+        noise = rng.random(n) < 0.02
+        issue[noise] = rng.choice(
+            ["filesystem_corrupt", "kernel_panic_rootfs", "no_issue"],
+            noise.sum())
+        pd.DataFrame({
+            "cpu_percent": cpu,
+            "memory_percent": mem,
+            "disk_free_gb": disk,
+            "efi_mounted": efi,
+            "issue": issue,
+        }).to_csv(path, mode="w" if header else "a", header=header,
+                  index=False)
+        header = False
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.add_argument("--chunksize", type=int, default=500_000)
+    p.add_argument(
+        "--modes", default="baseline,read_legacy,read_typed,stream_sgd",
+        help="comma-separated; add 'forest' for the full random forest")
+    a = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for name in HELPERS:
+            shutil.copy(ROOT / name, tmp / name)
+        (tmp / "data").mkdir()
+        csv = tmp / "data" / "synthetic_boot_issues.csv"
+
+        start = time.perf_counter()
+        write_csv(csv, a.rows)
+        size_mb = csv.stat().st_size / 2**20
+        print(f"generated {a.rows:,} rows ({size_mb:,.0f} MiB) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        for mode in a.modes.split(","):
+            shutil.rmtree(tmp / "models", ignore_errors=True)
+            proc = subprocess.run(
+                [sys.executable, "-c", CHILD, mode, str(a.chunksize)],
+                cwd=tmp, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{mode:12s} failed:\n{proc.stderr}")
+                continue
+            elapsed, rss, _ = proc.stdout.split()[-3:]
+            print(f"{mode:12s} wall {float(elapsed):8.2f}s  "
+                  f"peak RSS {int(rss):6,d} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure ``CommanderState`` enqueue/fetch throughput on a large queue.
+
+Run from the repository root::
+
+    python benchmarks/bench_queue.py --rows 1000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared import state as state_module
+from layered_agent_full.shared.protocol import FunctionCall
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--workers", type=int, default=1000)
+    p.add_argument("--batch", type=int, default=1000, help="tasks per group commit")
+    a = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_module.DB_PATH = Path(tmp) / "tasks.db"
+        s = state_module.CommanderState()
+        fc = FunctionCall(name="run_shell", arguments={"command": "true"})
+
+        start = time.perf_counter()
+        for i in range(0, a.rows, a.batch):
+            n = min(a.batch, a.rows - i)
+            s.enqueue_many((f"w{(i + j) % a.workers}", fc) for j in range(n))
+        enq = time.perf_counter() - start
+        print(f"enqueue_many: {a.rows} rows in {enq:.2f}s ({a.rows / enq:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            s.enqueue("w0", fc)
+        single = time.perf_counter() - start
+        print(f"enqueue (1 commit each) at {a.rows} rows: {1000 / single:,.0f} rows/s")
+
+        start = time.perf_counter()
+        fetched = sum(len(s.fetch_tasks(f"w{w}")) for w in range(a.workers))
+        fetch = time.perf_counter() - start
+        print(f"fetch_tasks: {fetched} rows for {a.workers} workers in {fetch:.2f}s "
+              f"({fetched / fetch:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        for w in range(a.workers):
+            s.fetch_tasks(f"w{w}")
+        empty = time.perf_counter() - start
+        print(f"empty poll: {empty / a.workers * 1e6:.0f} us/poll")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measure commander result-ingest throughput with an encrypted vault.
+
+Each run times ``post_result`` twice: once uncached (secrets.toml parsed
+and the Fernet key derived for every result, as before the key cache) as
+the baseline, then through the cached ``SecretsFile``/``fernet_for`` path.
+
+Run from the repository root::
+
+    python benchmarks/bench_result_ingest.py --results 5000
+"""
+import argparse
+import base64
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import toml
+from cryptography.fernet import Fernet
+
+
+def _ingest(server, token, payloads, prefix):
+    start = time.perf_counter()
+    for i, payload in enumerate(payloads):
+        server.post_result(f"{prefix}{i}", body={"payload": payload}, authorization=token)
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--results", type=int, default=5000)
+    a = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["HOME"] = tmp
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        cfg = Path(tmp) / ".config" / "agent"
+        cfg.mkdir(parents=True)
+        (cfg / "secrets.toml").write_text('vault_passphrase = "bench-passphrase"\n')
+
+        from layered_agent_full.shared import state as state_module
+        from layered_agent_full.shared.utils import aes_encrypt
+
+        state_module.DB_PATH = Path(tmp) / "tasks.db"
+        server = importlib.import_module("layered_agent_full.commander.server")
+        token = server.state.bearer_token
+
+        payloads = [
+            aes_encrypt(json.dumps({"task_id": str(i), "result": {"n": i}}).encode(), "bench-passphrase").decode()
+            for i in range(a.results)
+        ]
+
+        def uncached_passphrase():
+            return toml.load(cfg / "secrets.toml").get("vault_passphrase")
+
+        def uncached_fernet(passphrase):
+            key = hashlib.sha256(passphrase.encode()).digest()
+            return Fernet(base64.urlsafe_b64encode(key))
+
+        cached = server._vault_passphrase, server.aes_decrypt
+        server._vault_passphrase = uncached_passphrase
+        server.aes_decrypt = lambda token, passphrase: uncached_fernet(passphrase).decrypt(token)
+        try:
+            base = _ingest(server, token, payloads, "u")
+        finally:
+            server._vault_passphrase, server.aes_decrypt = cached
+        print(f"POST /result (uncached): {a.results} results in {base:.2f}s "
+              f"({a.results / base:,.0f} results/s)")
+
+        elapsed = _ingest(server, token, payloads, "c")
+        print(f"POST /result (cached):   {a.results} results in {elapsed:.2f}s "
+              f"({a.results / elapsed:,.0f} results/s, {base / elapsed:.1f}x)")
+
+        start = time.perf_counter()
+        for _ in range(a.results):
+            uncached_fernet("bench-passphrase").encrypt(b'{"result": 1}')
+        base = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(a.results):
+            aes_encrypt(b'{"result": 1}', "bench-passphrase")
+        elapsed = time.perf_counter() - start
+        print(f"aes_encrypt: {a.results / base:,.0f} calls/s uncached, "
+              f"{a.results / elapsed:,.0f} calls/s cached")
+
+
+if __name__ == "__main__":
+    main()
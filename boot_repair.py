@@ -1,37 +1,64 @@
+from __future__ import annotations
+
 import sys
 import logging
 from logging.handlers import TimedRotatingFileHandler
 import os
 import subprocess
-import shutil
 import asyncio
-import psutil
+import hashlib
+import importlib
 import ast
-from typing import Dict, Any
-import tkinter as tk
-from tkinter import ttk
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
+from llm_cache import LLMCache
 from memory_utils import ConversationMemory
+from patch_utils import PatchError, PatchValidator, apply_unified_diff
+from telemetry_utils import TelemetrySampler
 from voice_utils import speak, listen
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-import pandas as pd
 from dotenv import load_dotenv
-from pyvirtualdisplay import Display
 import atexit
-
-# If you want local LLM usage:
-from transformers import AutoTokenizer
-try:
-    from vllm import LLM, SamplingParams
-except Exception:
-    LLM = None
-    SamplingParams = None
-
-# 3rd-party LLM API (DeepSeek or OpenAI):
-from openai import OpenAI
 import time
 import threading
+from collections import deque
+
+
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    sklearn, pandas, tkinter, openai and friends account for well over a
+    second of import time, and most runs (``--testmode`` in particular)
+    never touch them.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+np = _LazyModule("numpy")
+pd = _LazyModule("pandas")
+joblib = _LazyModule("joblib")
+tk = _LazyModule("tkinter")
+ttk = _LazyModule("tkinter.ttk")
+sklearn = _LazyModule("sklearn")
+sklearn_ensemble = _LazyModule("sklearn.ensemble")
+sklearn_linear_model = _LazyModule("sklearn.linear_model")
+sklearn_model_selection = _LazyModule("sklearn.model_selection")
+sklearn_pipeline = _LazyModule("sklearn.pipeline")
+sklearn_preprocessing = _LazyModule("sklearn.preprocessing")
 
 # -------------------------------------------------------------------
 # WARNING: This code is a simplified demonstration of patch-based
@@ -58,8 +85,23 @@ def ensure_directories_exist():
 
 ensure_directories_exist()
 
+# Background telemetry: sampling period (s) and ring-buffer length.
+TELEMETRY_INTERVAL = float(os.getenv("BOOT_REPAIR_SAMPLE_INTERVAL", "1.0"))
+TELEMETRY_WINDOW = int(os.getenv("BOOT_REPAIR_SAMPLE_WINDOW", "300"))
+
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "REPLACE_ME")
 DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_MODEL = "deepseek-chat"
+# Run on the CPU with vLLM when the DeepSeek API client is unavailable.
+LOCAL_LLM_MODEL = "deepseek-ai/DeepSeek-V2.5"
+DEEPSEEK_SYSTEM_PROMPT = (
+    "You are an autonomous repair assistant that returns patches (diff)."
+)
+
+# On-disk cache of LLM answers: entry lifetime (s) and max entry count.
+LLM_CACHE_FILE = DATA_DIR / "llm_cache.sqlite3"
+LLM_CACHE_TTL = float(os.getenv("BOOT_REPAIR_LLM_CACHE_TTL", str(7 * 86400)))
+LLM_CACHE_SIZE = int(os.getenv("BOOT_REPAIR_LLM_CACHE_SIZE", "1000"))
 
 # ----------- GLOBAL LOGGING CONFIG -----------
 logging.basicConfig(
@@ -77,8 +119,10 @@ logging.basicConfig(
 logger = logging.getLogger("boot_repair_automation")
 logger.debug("Logger initialized successfully.")
 
-# Start a virtual display if no DISPLAY environment variable is present
+# The virtual display, the DeepSeek client and the local vLLM model are
+# created on first use rather than at import time.
 display = None
+_display_lock = threading.Lock()
 
 
 def _stop_virtual_display():
@@ -90,68 +134,138 @@ def _stop_virtual_display():
             logger.warning(f"Failed to stop virtual display: {e}")
 
 
-if not os.environ.get("DISPLAY"):
-    try:
-        display = Display()
-        display.start()
-        logger.debug("Started virtual X display for headless environment.")
-        atexit.register(_stop_virtual_display)
-    except Exception as e:
-        logger.warning(f"Failed to start virtual display: {e}")
+def ensure_display():
+    """Start a virtual X display if no DISPLAY environment variable is set."""
+    global display
+    with _display_lock:
+        if display is not None or os.environ.get("DISPLAY"):
+            return display
+        try:
+            from pyvirtualdisplay import Display
+            display = Display()
+            display.start()
+            logger.debug("Started virtual X display for headless environment.")
+            atexit.register(_stop_virtual_display)
+        except Exception as e:
+            logger.warning(f"Failed to start virtual display: {e}")
+        return display
 
-# -------------- LLM / DEEPSEEK SETUP --------------
-try:
-    if LLM is not None:
-        tokenizer = AutoTokenizer.from_pretrained("deepseek-ai/DeepSeek-V2.5")
-        llm = LLM(
-            model="deepseek-ai/DeepSeek-V2.5",
-            tensor_parallel_size=1,
-            max_model_len=8192,
-            trust_remote_code=True,
-            enforce_eager=True,
-            device="cpu"
-        )
-        sampling_params = SamplingParams(
-            temperature=0.3,
-            max_tokens=256,
-            stop_token_ids=[tokenizer.eos_token_id],
-        )
-    else:
-        raise RuntimeError("vLLM not available")
-except Exception as e:
-    logger.warning(f"vLLM local model not available: {e}")
-    llm = None
-    sampling_params = None
 
-try:
-    ds_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
-except Exception as e:
-    logger.warning(f"Failed to initialize DeepSeek client: {e}")
-    ds_client = None
+# -------------- LLM / DEEPSEEK SETUP --------------
+_UNSET = object()
+_ds_client: Any = _UNSET
+_local_llm: Any = _UNSET
+_llm_cache: Optional[LLMCache] = None
+_llm_lock = threading.Lock()
+
+
+def get_ds_client():
+    """Return the DeepSeek API client, or None if it cannot be created."""
+    global _ds_client
+    with _llm_lock:
+        if _ds_client is _UNSET:
+            try:
+                from openai import OpenAI
+                _ds_client = OpenAI(
+                    api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL
+                )
+            except Exception as e:
+                logger.warning(f"Failed to initialize DeepSeek client: {e}")
+                _ds_client = None
+        return _ds_client
+
+
+def get_local_llm() -> Tuple[Optional[Any], Optional[Any]]:
+    """Return ``(llm, sampling_params)`` for local vLLM inference.
+
+    Both are None when vLLM or the model is unavailable.
+    """
+    global _local_llm
+    with _llm_lock:
+        if _local_llm is _UNSET:
+            try:
+                from transformers import AutoTokenizer
+                from vllm import LLM, SamplingParams
+                tokenizer = AutoTokenizer.from_pretrained(LOCAL_LLM_MODEL)
+                llm = LLM(
+                    model=LOCAL_LLM_MODEL,
+                    tensor_parallel_size=1,
+                    max_model_len=8192,
+                    trust_remote_code=True,
+                    enforce_eager=True,
+                    device="cpu"
+                )
+                sampling_params = SamplingParams(
+                    temperature=0.3,
+                    max_tokens=256,
+                    stop_token_ids=[tokenizer.eos_token_id],
+                )
+                _local_llm = (llm, sampling_params)
+            except Exception as e:
+                logger.warning(f"vLLM local model not available: {e}")
+                _local_llm = (None, None)
+        return _local_llm
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the shared on-disk LLM response cache."""
+    global _llm_cache
+    with _llm_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache(
+                LLM_CACHE_FILE, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE)
+            atexit.register(_llm_cache.close)
+        return _llm_cache
+
+
+def query_local_llm(prompt: str) -> Optional[str]:
+    """Answer ``prompt`` with the local vLLM model; None if there is none."""
+    llm, sampling_params = get_local_llm()
+    if llm is None:
+        return None
+    try:
+        outputs = llm.generate(
+            [f"{DEEPSEEK_SYSTEM_PROMPT}\n\n{prompt}"], sampling_params)
+        return outputs[0].outputs[0].text
+    except Exception as e:
+        logger.error(f"Local LLM generation failed: {e}")
+        return None
 
 
 def query_deepseek(prompt: str) -> str:
     """
-    Ask the LLM (DeepSeek or fallback) for a response.
+    Ask the LLM (DeepSeek, or the local vLLM model without an API client)
+    for a response.
+
+    Successful answers are cached on disk by (model, system message,
+    prompt), so a repeated prompt costs no API round trip. Placeholder and
+    error replies are never cached.
     """
+    cache = get_llm_cache()
+    cached = cache.get(DEEPSEEK_MODEL, DEEPSEEK_SYSTEM_PROMPT, prompt)
+    if cached is not None:
+        logger.debug(f"LLM cache hit ({cache.hits} hits, "
+                     f"{cache.misses} misses).")
+        return cached
+
+    ds_client = get_ds_client()
     if ds_client is not None:
         try:
             response = ds_client.chat.completions.create(
-                model="deepseek-chat",
+                model=DEEPSEEK_MODEL,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an autonomous repair assistant "
-                            "that returns patches (diff)."
-                        ),
-                    },
+                    {"role": "system", "content": DEEPSEEK_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
                 ],
                 stream=False
             )
             if response and response.choices:
-                return response.choices[0].message.content
+                content = response.choices[0].message.content
+                if content:
+                    cache.put(
+                        DEEPSEEK_MODEL, DEEPSEEK_SYSTEM_PROMPT, prompt,
+                        content)
+                return content
             else:
                 logger.error("Empty or invalid response from DeepSeek API.")
                 return "I couldn't process your request. Please try again."
@@ -159,13 +273,43 @@ def query_deepseek(prompt: str) -> str:
             logger.error(f"Failed to query DeepSeek API: {e}")
             return "I couldn't process your request. Please try again."
     else:
-        logger.warning("No DeepSeek client. Returning placeholder.")
+        cached = cache.get(LOCAL_LLM_MODEL, DEEPSEEK_SYSTEM_PROMPT, prompt)
+        if cached is not None:
+            return cached
+        content = query_local_llm(prompt)
+        if content:
+            cache.put(LOCAL_LLM_MODEL, DEEPSEEK_SYSTEM_PROMPT, prompt, content)
+            return content
+        logger.warning("No DeepSeek client or local LLM. Returning placeholder.")
         return "No LLM is configured. (Placeholder response)."
 
 # --------------------------------------------------------------------------
 #    PATCH-BASED SELF-MODIFICATION LOGIC
 # --------------------------------------------------------------------------
 
+# Imported once by the warm validator so each --testmode check can skip
+# them (see patch_utils.PatchValidator).
+VALIDATOR_PRELOAD = (
+    "dotenv", "psutil", "llm_cache", "memory_utils", "patch_utils",
+    "telemetry_utils", "voice_utils",
+)
+_patch_validator: Optional[PatchValidator] = None
+_validator_lock = threading.Lock()
+
+
+def get_patch_validator() -> PatchValidator:
+    global _patch_validator
+    with _validator_lock:
+        if _patch_validator is None:
+            _patch_validator = PatchValidator(
+                THIS_FILE_PATH.parent,
+                filename=THIS_FILE_PATH.name,
+                preload=VALIDATOR_PRELOAD,
+                timeout=10,
+            )
+            atexit.register(_patch_validator.close)
+        return _patch_validator
+
 
 def propose_patch_changes(user_instructions: str, error_info: str = "") -> str:
     """
@@ -205,70 +349,32 @@ def confirm_patch_application(diff_text: str) -> bool:
 
 def apply_patch_changes(diff_text: str) -> str:
     """
-    Parse a unified diff in diff_text, apply it to the current file in memory,
-    and write the result to a temp file for testing. If tests pass, finalize.
+    Apply the unified diff in diff_text to the current file in memory and
+    validate the result in a sandbox. If tests pass, finalize.
     """
     if not diff_text.strip():
         logger.info("No diff returned. No changes made.")
         return "No changes proposed."
 
-    if shutil.which("patch") is None:
-        msg = (
-            "The 'patch' command is required but not found. Please install it."
-        )
-        logger.error(msg)
-        return msg
-
     if not confirm_patch_application(diff_text):
         logger.info("Patch application cancelled by user.")
         return "Patch application cancelled."
 
-    # Read the current code lines
     try:
         with open(THIS_FILE_PATH, "r", encoding="utf-8") as f:
-            original_lines = f.readlines()
+            original_code = f.read()
     except Exception as e:
-        msg = f"Failed to read original file lines: {e}"
+        msg = f"Failed to read original file: {e}"
         logger.error(msg)
         return msg
 
-    # Parse the diff
-    patched_lines = []
     try:
-
-        patch_path = THIS_FILE_PATH.parent / "temp.patch"
-        with open(patch_path, "w", encoding="utf-8") as pf:
-            pf.write(diff_text)
-
-        original_temp = THIS_FILE_PATH.parent / "original_temp.py"
-        with open(original_temp, "w", encoding="utf-8") as of:
-            of.writelines(original_lines)
-
-        patched_temp = THIS_FILE_PATH.parent / "patched_temp.py"
-        patch_cmd = ["patch", str(original_temp), str(
-            patch_path), "-o", str(patched_temp)]
-        proc = subprocess.run(patch_cmd, capture_output=True, text=True)
-        if proc.returncode != 0:
-            msg = f"Patch command failed: {proc.stderr}"
-            logger.error(msg)
-            patch_path.unlink(missing_ok=True)
-            original_temp.unlink(missing_ok=True)
-            return msg
-
-        with open(patched_temp, "r", encoding="utf-8") as pf:
-            patched_lines = pf.readlines()
-
-        patch_path.unlink(missing_ok=True)
-        original_temp.unlink(missing_ok=True)
-        patched_temp.unlink(missing_ok=True)
-
-    except Exception as e:
+        new_code = apply_unified_diff(original_code, diff_text)
+    except PatchError as e:
         msg = f"Failed to apply patch: {e}"
         logger.error(msg)
         return msg
 
-    new_code = "".join(patched_lines)
-
     try:
         ast.parse(new_code)
     except SyntaxError as e:
@@ -284,10 +390,8 @@ def apply_patch_changes(diff_text: str) -> str:
 
     backup_path = THIS_FILE_PATH.parent / f"{THIS_FILE_PATH.stem}_backup.py"
     try:
-        with open(THIS_FILE_PATH, "r", encoding="utf-8") as oldf:
-            old_code = oldf.read()
         with open(backup_path, "w", encoding="utf-8") as bf:
-            bf.write(old_code)
+            bf.write(original_code)
 
         with open(THIS_FILE_PATH, "w", encoding="utf-8") as f:
             f.write(new_code)
@@ -303,35 +407,10 @@ def apply_patch_changes(diff_text: str) -> str:
 
 def run_local_test_suite_with_code(new_code: str) -> Dict[str, Any]:
     """
-    Minimal approach: write the code to a temp file with `--testmode`
-    to see if it starts up.
+    Minimal approach: run the code with `--testmode` in a sandbox to see if
+    it starts up. Uses a warm validator process shared across calls.
     """
-    temp_path = THIS_FILE_PATH.parent / "temp_patch_test.py"
-    try:
-        with open(temp_path, "w", encoding="utf-8") as f:
-            f.write(new_code)
-    except Exception as e:
-        return {"passed": False, "reason": f"Cannot write temp code: {e}"}
-
-    try:
-        result = subprocess.run(
-            [sys.executable, str(temp_path), "--testmode"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        temp_path.unlink(missing_ok=True)
-        if result.returncode != 0:
-            reason = (
-                f"Exit code {result.returncode}\n"
-                f"Stdout:\n{result.stdout}\n"
-                f"Stderr:\n{result.stderr}"
-            )
-            return {"passed": False, "reason": reason}
-        return {"passed": True, "reason": "All good."}
-    except Exception as e:
-        temp_path.unlink(missing_ok=True)
-        return {"passed": False, "reason": f"Test run exception: {e}"}
+    return get_patch_validator().validate(new_code)
 
 
 def attempt_git_commit(commit_msg: str):
@@ -373,6 +452,7 @@ def apply_solution(solution: str) -> bool:
 class BootRepairUI:
     def __init__(self, agent):
         self.agent = agent
+        ensure_display()
         self.root = tk.Tk()
         self.root.title("Patch-based Boot Repair UI")
         self.root.geometry("400x200")
@@ -412,11 +492,49 @@ class BootRepairUI:
                 text="Status: Repair failed or incomplete.")
 
 
+def _file_sha256(path: Path) -> Optional[str]:
+    """Return the hex sha256 of ``path``, or None if it cannot be read."""
+    try:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
 class BootIssuePredictor:
-    def __init__(self):
+    # Column order of the feature matrix; matches _get_system_state().
+    FEATURES = ("cpu_percent", "memory_percent", "disk_free_gb", "efi_mounted")
+    # Explicit CSV dtypes: roughly a third of pandas' inferred footprint.
+    CSV_DTYPES = {
+        "cpu_percent": "float32",
+        "memory_percent": "float32",
+        "disk_free_gb": "float32",
+        "efi_mounted": "bool",
+        "issue": "category",
+    }
+    CHUNK_ROWS = 500_000
+
+    def __init__(
+        self,
+        data_path: Optional[Path] = None,
+        model_path: Optional[Path] = None,
+        incremental: bool = False,
+        chunksize: int = CHUNK_ROWS,
+    ):
+        """``incremental=True`` streams the CSV in ``chunksize`` rows into
+        an SGD classifier via ``partial_fit`` instead of fitting a random
+        forest on the whole file, so memory stays bounded by one chunk.
+        """
         self.logger = logging.getLogger("boot_issue_predictor")
-        self.model = RandomForestClassifier(random_state=42)
-        self.data_path = DATA_DIR / "synthetic_boot_issues.csv"
+        self.incremental = incremental
+        self.chunksize = chunksize
+        self.model = self._new_model()
+        self.data_path = data_path or DATA_DIR / "synthetic_boot_issues.csv"
+        self.model_path = model_path or MODELS_DIR / "boot_issue_model.joblib"
+        self.data_hash: Optional[str] = None
         self.issue_mapping = {
             "kernel_panic_rootfs": "kernel_panic_rootfs",
             "filesystem_corrupt": "filesystem_corrupt",
@@ -426,59 +544,267 @@ class BootIssuePredictor:
         self.load_and_train_model()
 
     def load_and_train_model(self):
-        data = self.load_data(self.data_path)
-        if not data.empty:
-            self.train_model(data)
+        """Load the cached model for the current CSV, training if stale.
+
+        The fitted model is stored with joblib alongside the sha256 of the
+        training CSV, so a restart only retrains when the data changed.
+        """
+        data_hash = _file_sha256(self.data_path)
+        if data_hash is not None and data_hash == self.data_hash:
+            return
+        if data_hash is not None and self._load_cached_model(data_hash):
+            return
+        if self.incremental:
+            self.train_incremental(self.data_path)
         else:
-            self.logger.warning("No data available to train the model.")
+            data = self.load_data(self.data_path)
+            if data.empty:
+                self.logger.warning("No data available to train the model.")
+                return
+            self.train_model(data)
+        if self.is_fitted:
+            self.data_hash = data_hash
+            self._save_cached_model(data_hash)
+
+    def _new_model(self):
+        if self.incremental:
+            return sklearn_pipeline.Pipeline([
+                ("scale", sklearn_preprocessing.StandardScaler()),
+                ("clf", sklearn_linear_model.SGDClassifier(
+                    loss="log_loss", random_state=42)),
+            ])
+        return sklearn_ensemble.RandomForestClassifier(random_state=42)
+
+    def _cache_key(self, data_hash: str) -> Dict[str, str]:
+        return {
+            "data_sha256": data_hash,
+            "sklearn": sklearn.__version__,
+            "features": ",".join(self.FEATURES),
+            "model": "sgd" if self.incremental else "forest",
+        }
+
+    def _load_cached_model(self, data_hash: str) -> bool:
+        if not self.model_path.exists():
+            return False
+        try:
+            cached = joblib.load(self.model_path)
+            if cached.get("key") != self._cache_key(data_hash):
+                self.logger.info("Cached model is stale; retraining.")
+                return False
+            self.model = cached["model"]
+            self.data_hash = data_hash
+            self.logger.info(f"Loaded cached model from {self.model_path}")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Failed to load cached model: {e}")
+            return False
+
+    def _save_cached_model(self, data_hash: str):
+        tmp = self.model_path.with_suffix(self.model_path.suffix + ".tmp")
+        try:
+            self.model_path.parent.mkdir(parents=True, exist_ok=True)
+            joblib.dump(
+                {"key": self._cache_key(data_hash), "model": self.model}, tmp)
+            os.replace(tmp, self.model_path)
+        except Exception as e:
+            self.logger.warning(f"Failed to cache trained model: {e}")
+            tmp.unlink(missing_ok=True)
 
     def load_data(self, csv_path: Path) -> pd.DataFrame:
         if not csv_path.exists():
             self.logger.warning(f"Data file {csv_path} does not exist.")
             return pd.DataFrame()
         try:
-            data = pd.read_csv(csv_path)
-            data['issue'] = data['issue'].map(
-                self.issue_mapping).fillna("unknown")
-            data['efi_mounted'] = data['efi_mounted'].astype(int)
+            data = pd.read_csv(
+                csv_path,
+                usecols=list(self.CSV_DTYPES),
+                dtype=self.CSV_DTYPES,
+            )
+            data['issue'] = self._labels(data['issue'])
             return data
         except Exception as e:
             self.logger.error(f"Failed to load data: {e}")
             return pd.DataFrame()
 
+    def iter_chunks(self, csv_path: Path):
+        """Yield ``(X, y)`` arrays of at most ``chunksize`` rows."""
+        reader = pd.read_csv(
+            csv_path,
+            usecols=list(self.CSV_DTYPES),
+            dtype=self.CSV_DTYPES,
+            chunksize=self.chunksize,
+        )
+        with reader:
+            for chunk in reader:
+                X = chunk[list(self.FEATURES)].to_numpy(dtype=np.float64)
+                yield X, self._labels(chunk['issue']).to_numpy()
+
+    def _labels(self, issues: pd.Series) -> pd.Series:
+        return issues.map(self.issue_mapping).astype(object).fillna("unknown")
+
+    def train_incremental(self, csv_path: Path):
+        """Fit the SGD model chunk by chunk in a single pass over the CSV.
+
+        The scaler is updated with each chunk before the classifier sees
+        it. A random 20% of every chunk is held out and scored so the
+        logged accuracy is comparable with train_model().
+        """
+        if not csv_path.exists():
+            self.logger.warning(f"Data file {csv_path} does not exist.")
+            return
+        self.model = self._new_model()
+        scaler = self.model.named_steps["scale"]
+        clf = self.model.named_steps["clf"]
+        classes = np.array(
+            sorted(set(self.issue_mapping.values()) | {"unknown"}),
+            dtype=object,
+        )
+        rng = np.random.default_rng(42)
+        rows = correct = held = 0
+        try:
+            for X, y in self.iter_chunks(csv_path):
+                scaler.partial_fit(X)
+                hold = rng.random(len(X)) < 0.2
+                if (~hold).any():
+                    clf.partial_fit(
+                        scaler.transform(X[~hold]), y[~hold], classes=classes)
+                if hold.any() and hasattr(clf, "classes_"):
+                    pred = clf.predict(scaler.transform(X[hold]))
+                    correct += int((pred == y[hold]).sum())
+                    held += int(hold.sum())
+                rows += len(X)
+        except Exception as e:
+            self.logger.error(f"Failed to train model: {e}")
+            self.model = self._new_model()
+            return
+        if rows < 5:
+            self.logger.warning("Insufficient training data.")
+            self.model = self._new_model()
+            return
+        accuracy = correct / held if held else 0.0
+        self.logger.info(
+            f"Model trained incrementally on {rows} rows "
+            f"with accuracy: {accuracy:.2f}")
+
     def train_model(self, data: pd.DataFrame):
         try:
             if data.empty or len(data) < 5:
                 self.logger.warning("Insufficient training data.")
                 return
-            X = data.drop(columns=['issue'])
-            y = data['issue']
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42)
+            # Fit on a plain float matrix in FEATURES order so prediction
+            # can skip DataFrame construction entirely.
+            X = data[list(self.FEATURES)].to_numpy(dtype=np.float64)
+            y = data['issue'].to_numpy()
+            X_train, X_test, y_train, y_test = (
+                sklearn_model_selection.train_test_split(
+                    X, y, test_size=0.2, random_state=42))
             self.model.fit(X_train, y_train)
             accuracy = self.model.score(X_test, y_test)
             self.logger.info(f"Model trained with accuracy: {accuracy:.2f}")
         except Exception as e:
             self.logger.error(f"Failed to train model: {e}")
 
+    @property
+    def is_fitted(self) -> bool:
+        # Not feature_importances_: that property walks every tree.
+        return hasattr(self.model, "classes_")
+
+    def _predict_one(self, row: np.ndarray) -> str:
+        """Predict a single row without the forest's joblib dispatch.
+
+        RandomForestClassifier.predict fans out over its trees through
+        joblib, which costs milliseconds for one sample; summing the trees'
+        probabilities directly gives the same soft vote in a fraction of
+        that.
+        """
+        estimators = getattr(self.model, "estimators_", None)
+        if not estimators:
+            return str(self.model.predict(row)[0])
+        row = row.astype(np.float32)
+        proba = estimators[0].predict_proba(row, check_input=False)
+        for est in estimators[1:]:
+            proba += est.predict_proba(row, check_input=False)
+        return str(self.model.classes_[proba[0].argmax()])
+
+    def _as_matrix(self, states) -> np.ndarray:
+        """Coerce system states to an ``(n, len(FEATURES))`` float array.
+
+        Accepts an array already in FEATURES column order, a sequence of
+        such rows, or a sequence of state dicts. Missing or None values
+        become NaN.
+        """
+        if isinstance(states, np.ndarray):
+            X = states.astype(np.float64, copy=False)
+        else:
+            rows = [
+                [s.get(f) for f in self.FEATURES]
+                if isinstance(s, dict) else s
+                for s in states
+            ]
+            X = np.array(rows, dtype=np.float64)
+        return X.reshape(-1, len(self.FEATURES))
+
+    def predict_batch(self, states) -> List[str]:
+        """Predict one issue per state in a single model call.
+
+        Rows with missing values are reported as "unknown". ``states`` may
+        be any iterable, including a generator.
+        """
+        if not isinstance(states, np.ndarray):
+            states = list(states)
+        try:
+            X = self._as_matrix(states)
+            out = np.full(len(X), "unknown", dtype=object)
+            if not self.is_fitted:
+                self.logger.warning("Model is not fitted.")
+                return out.tolist()
+            valid = ~np.isnan(X).any(axis=1)
+            if not valid.all():
+                self.logger.warning(
+                    f"{int((~valid).sum())} invalid system state row(s).")
+            if valid.any():
+                out[valid] = self.model.predict(X[valid])
+            return out.tolist()
+        except Exception as e:
+            self.logger.error(f"Failed to predict issues: {e}")
+            return ["unknown"] * len(states)
+
     def predict_issue(self, system_state: Dict[str, Any]) -> str:
         try:
-            if not hasattr(self.model, "feature_importances_"):
+            if not self.is_fitted:
                 self.logger.warning("Model is not fitted.")
                 return "unknown"
-            df = pd.DataFrame([system_state])
-            if df.isnull().any().any():
+            row = np.array(
+                [[system_state.get(f) for f in self.FEATURES]],
+                dtype=np.float64,
+            )
+            if np.isnan(row).any():
                 self.logger.warning("Invalid system state data.")
                 return "unknown"
-            return self.model.predict(df)[0]
+            return self._predict_one(row)
         except Exception as e:
             self.logger.error(f"Failed to predict issue: {e}")
             return "unknown"
 
 
+class RepairCancelled(Exception):
+    """A repair step was stopped through DefaultProcessManager."""
+
+
 class BootRepairLogic:
-    def __init__(self):
+    # Commands run in order by _repair_kernel_panic_rootfs.
+    KERNEL_PANIC_ROOTFS_COMMANDS = (
+        ("mkinitcpio", "-P"),
+        ("grub-mkconfig", "-o", "/boot/grub/grub.cfg"),
+    )
+    # Lines of stdout/stderr kept per command for error reports.
+    OUTPUT_TAIL_LINES = 200
+
+    def __init__(
+        self, process_manager: Optional[DefaultProcessManager] = None
+    ):
         self.logger = logging.getLogger("boot_repair_logic")
+        self.process_manager = process_manager or DefaultProcessManager()
         self.current_process = None
         self.process_status = "idle"
 
@@ -503,31 +829,65 @@ class BootRepairLogic:
                 return await self.repair_issue(issue)
             return False
 
+    async def _run_command(self, cmd, generation: int) -> str:
+        """Run ``cmd`` without blocking the event loop.
+
+        stdout and stderr are drained concurrently as they are produced
+        (so a chatty command cannot fill a pipe and stall), logged line by
+        line, and the last OUTPUT_TAIL_LINES of each are kept. Raises
+        RepairCancelled if DefaultProcessManager.terminate_all() was
+        called since ``generation``, CalledProcessError on a non-zero
+        exit.
+        """
+        if self.process_manager.generation != generation:
+            raise RepairCancelled(f"Cancelled before {cmd[0]}")
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self.current_process = proc
+        self.process_manager.register(proc)
+        try:
+            out, err = await asyncio.gather(
+                self._drain(proc.stdout, cmd[0]),
+                self._drain(proc.stderr, cmd[0]),
+            )
+            returncode = await proc.wait()
+        except asyncio.CancelledError:
+            await self.process_manager.stop(proc)
+            raise
+        finally:
+            self.process_manager.unregister(proc)
+            self.current_process = None
+        if self.process_manager.generation != generation:
+            raise RepairCancelled(f"{cmd[0]} was terminated")
+        if returncode != 0:
+            raise subprocess.CalledProcessError(
+                returncode, list(cmd), output=out, stderr=err)
+        return out
+
+    async def _drain(self, stream: asyncio.StreamReader, name: str) -> str:
+        tail = deque(maxlen=self.OUTPUT_TAIL_LINES)
+        async for raw in stream:
+            line = raw.decode(errors="replace").rstrip("\n")
+            self.logger.debug(f"[{name}] {line}")
+            tail.append(line)
+        return "\n".join(tail)
+
     async def _repair_kernel_panic_rootfs(self) -> bool:
+        generation = self.process_manager.generation
         try:
             self.logger.info("Repairing kernel panic rootfs...")
-            self.current_process = subprocess.Popen(
-                ["mkinitcpio", "-P"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            self.current_process.wait()
-            if self.current_process.returncode != 0:
-                raise subprocess.CalledProcessError(
-                    self.current_process.returncode, self.current_process.args)
-
-            self.current_process = subprocess.Popen(
-                ["grub-mkconfig", "-o", "/boot/grub/grub.cfg"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            self.current_process.wait()
-            if self.current_process.returncode != 0:
-                raise subprocess.CalledProcessError(
-                    self.current_process.returncode, self.current_process.args)
+            for cmd in self.KERNEL_PANIC_ROOTFS_COMMANDS:
+                await self._run_command(cmd, generation)
 
             self.process_status = "completed"
             return True
+        except RepairCancelled as e:
+            self.logger.warning(f"Repair cancelled: {e}")
+            self.process_status = "cancelled"
+            return False
         except subprocess.CalledProcessError as e:
             err_msg = (
                 f"Command failed: {e.cmd}, "
@@ -555,17 +915,71 @@ class BootRepairLogic:
 
 
 class DefaultProcessManager:
-    def terminate_all(self):
-        logger.info("Terminating all processes... (Placeholder)")
+    """Tracks running repair subprocesses so any thread can stop them.
+
+    Processes are registered together with the event loop that owns them;
+    terminate_all() hands the terminate call to that loop with
+    call_soon_threadsafe, so it is safe from the chat or UI threads.
+    Each call also bumps ``generation``, which repairs in progress check
+    to stop before their next step.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs: Dict[Any, asyncio.AbstractEventLoop] = {}
+        self.generation = 0
+
+    def register(self, proc) -> None:
+        with self._lock:
+            self._procs[proc] = asyncio.get_running_loop()
+
+    def unregister(self, proc) -> None:
+        with self._lock:
+            self._procs.pop(proc, None)
+
+    def running(self) -> int:
+        with self._lock:
+            return len(self._procs)
+
+    def terminate_all(self) -> int:
+        with self._lock:
+            self.generation += 1
+            procs = list(self._procs.items())
+        for proc, loop in procs:
+            try:
+                loop.call_soon_threadsafe(self._terminate, proc)
+            except RuntimeError:
+                pass  # loop already closed; the process is gone with it
+        logger.info(f"Terminating {len(procs)} running process(es).")
+        return len(procs)
+
+    @staticmethod
+    def _terminate(proc) -> None:
+        if proc.returncode is None:
+            try:
+                proc.terminate()
+            except ProcessLookupError:
+                pass
+
+    async def stop(self, proc, timeout: float = 5.0) -> None:
+        """Terminate ``proc``, killing it if still alive after ``timeout``."""
+        self._terminate(proc)
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
 
 
 class EnhancedAutomationManager:
     def __init__(self):
         self.logger = logging.getLogger("enhanced_automation_manager")
         self.boot_issue_predictor = BootIssuePredictor()
-        self.boot_repair_logic = BootRepairLogic()
-        self.ui = BootRepairUI(self)
         self.process_manager = DefaultProcessManager()
+        self.boot_repair_logic = BootRepairLogic(self.process_manager)
+        self.ui = BootRepairUI(self)
+        self.telemetry = TelemetrySampler(
+            interval=TELEMETRY_INTERVAL, window=TELEMETRY_WINDOW)
 
         self._initialize_ml_model()
         self._start_monitoring()
@@ -578,7 +992,11 @@ class EnhancedAutomationManager:
             self.logger.error(f"Failed to initialize ML: {e}")
 
     def _start_monitoring(self):
-        self.logger.info("System monitoring started...")
+        self.telemetry.start()
+        self.logger.info(
+            f"System monitoring started (every {self.telemetry.interval}s, "
+            f"{self.telemetry.window}-sample window)."
+        )
 
     async def run_boot_repair(self) -> bool:
         try:
@@ -607,17 +1025,9 @@ class EnhancedAutomationManager:
             return False
 
     def _get_system_state(self) -> Dict[str, Any]:
+        """Rolling system state from the background telemetry sampler."""
         try:
-            cpu_percent = psutil.cpu_percent()
-            memory_percent = psutil.virtual_memory().percent
-            disk_free_gb = psutil.disk_usage('/').free / (1024 ** 3)
-            efi_mounted = os.path.exists('/boot/efi')
-            return {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory_percent,
-                "disk_free_gb": disk_free_gb,
-                "efi_mounted": efi_mounted
-            }
+            return self.telemetry.state()
         except Exception as e:
             self.logger.error(f"Failed to get system state: {e}")
             return {}
@@ -684,15 +1094,25 @@ class ChatInterface:
             return "Initiated boot repair."
         elif "status" in lower_input or "state" in lower_input:
             state = self.agent._get_system_state()
+            summary = self.agent.telemetry.summary()
+
+            def peak(field):
+                # an empty window (sampler not started yet) has no peak
+                value = summary[field]["max"]
+                return "n/a" if value is None else f"{value}%"
+
             return (
-                f"CPU: {state.get('cpu_percent')}%\n"
-                f"Memory: {state.get('memory_percent')}%\n"
+                f"CPU: {state.get('cpu_percent')}% "
+                f"(peak {peak('cpu_percent')})\n"
+                f"Memory: {state.get('memory_percent')}% "
+                f"(peak {peak('memory_percent')})\n"
                 f"Disk Free (GB): {state.get('disk_free_gb')}\n"
-                f"EFI Mounted: {state.get('efi_mounted')}"
+                f"EFI Mounted: {state.get('efi_mounted')}\n"
+                f"Window: {len(self.agent.telemetry)} samples"
             )
         elif "terminate" in lower_input or "stop" in lower_input:
-            self.agent.process_manager.terminate_all()
-            return "Terminated all running processes."
+            count = self.agent.process_manager.terminate_all()
+            return f"Terminated {count} running process(es)."
         elif (
             "self modify" in lower_input
             or "update code" in lower_input
@@ -0,0 +1,62 @@
+"""ASGI middleware for the commander API."""
+from __future__ import annotations
+
+import zlib
+
+from starlette.responses import PlainTextResponse
+
+# Largest request body accepted after decompression.
+MAX_INFLATED_BYTES = 64 * 1024 * 1024
+
+
+class GzipRequestMiddleware:
+    """Inflate request bodies sent with ``Content-Encoding: gzip``.
+
+    Starlette's ``GZipMiddleware`` only compresses responses. Workers gzip
+    large result batches and registrations, so the body is inflated here
+    (bounded by ``max_size`` to refuse gzip bombs) and handed to the route
+    as if it had been sent uncompressed. Corrupt bodies get a 400.
+    """
+
+    def __init__(self, app, max_size: int = MAX_INFLATED_BYTES):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = scope["headers"]
+        encoding = next((v for k, v in headers if k == b"content-encoding"), b"")
+        if encoding.strip().lower() != b"gzip":
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(b"".join(chunks), self.max_size + 1)
+        except zlib.error as e:
+            return await PlainTextResponse(f"bad gzip body: {e}", 400)(scope, receive, send)
+        if len(body) > self.max_size:
+            return await PlainTextResponse("request body too large", 413)(scope, receive, send)
+        if not inflater.eof:
+            return await PlainTextResponse("bad gzip body: truncated", 400)(scope, receive, send)
+
+        headers = [(k, v) for k, v in headers if k not in (b"content-encoding", b"content-length")]
+        headers.append((b"content-length", str(len(body)).encode()))
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(dict(scope, headers=headers), replay, send)
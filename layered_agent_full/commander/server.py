@@ -1,4 +1,4 @@
-import os, toml, pathlib, uuid, json, sys
+import os, pathlib, uuid, json, sys, asyncio, contextlib, logging, time
 
 # When executed directly ``python commander/server.py`` the package root is not
 # on ``sys.path``. Adjust the path so absolute imports under ``layered_agent_full``
@@ -7,112 +7,294 @@ if __package__ in (None, ""):
     # Add the repository root so ``layered_agent_full`` package can be imported
     sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
 
-from layered_agent_full.shared.state import CommanderState
+from layered_agent_full.shared.state import CommanderState, ROUTING_POLICY
 from layered_agent_full.shared.protocol import ChatMessage, FunctionCall
-from layered_agent_full.shared.utils import aes_decrypt
-from fastapi import FastAPI, Body, HTTPException, UploadFile, File, Header, Response
+from layered_agent_full.shared.utils import SecretsFile, aes_decrypt, reload_on_sighup
+from layered_agent_full.shared.validation import InvalidArguments
+from layered_agent_full.commander.middleware import GzipRequestMiddleware
+from fastapi import FastAPI, Body, HTTPException, UploadFile, File, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import openai
-6vfos9-codex/run-all-code-from-the-repo
-=======
-c6btom-codex/run-all-code-from-the-repo
-=======
-w55z61-codex/run-all-code-from-the-repo
-=======
-from layered_agent_full.shared.state import CommanderState
-from layered_agent_full.shared.protocol import ChatMessage, FunctionCall
-from layered_agent_full.shared.utils import aes_decrypt
-main
-main
-main
 
-app = FastAPI()
-state = CommanderState()
+state = CommanderState(routing=os.getenv("AGENT_ROUTING", ROUTING_POLICY))
+
+# secrets.toml is parsed once and re-read when it changes (or on SIGHUP)
+SECRETS = SecretsFile(pathlib.Path.home()/".config"/"agent"/"secrets.toml")
+reload_on_sighup(SECRETS)
 
 # Load OpenAI key
-OPENAI_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_KEY:
-    cfg = pathlib.Path.home()/".config"/"agent"/"secrets.toml"
-    data = toml.loads(cfg.read_text()) if cfg.exists() else {}
-    OPENAI_KEY = data.get("openai_api_key")
+OPENAI_KEY = os.getenv("OPENAI_API_KEY") or SECRETS.get("openai_api_key")
 if not OPENAI_KEY:
     raise RuntimeError("Missing OpenAI API key.")
-openai.api_key = OPENAI_KEY
+# One async client for all chats so HTTP connections are pooled and reused;
+# ``chat_slots`` caps how many LLM calls are in flight at once.
+CHAT_MODEL = os.getenv("AGENT_CHAT_MODEL", "gpt-4o-mini")
+llm = openai.AsyncOpenAI(api_key=OPENAI_KEY)
+chat_slots = asyncio.Semaphore(int(os.getenv("AGENT_CHAT_CONCURRENCY", "32")))
+# Only the skills most relevant to the message are offered to the model.
+SCHEMA_TOP_K = int(os.getenv("AGENT_SCHEMA_TOP_K", "8"))
+
+# Upper bound for ``GET /task/{worker_id}?wait=N`` long-polls and the interval
+# between keep-alive comments on the SSE task stream.
+LONG_POLL_MAX = float(os.getenv("AGENT_LONG_POLL_MAX", "60"))
+SSE_KEEPALIVE = float(os.getenv("AGENT_SSE_KEEPALIVE", "15"))
+# How often expired task leases are returned to the queue.
+LEASE_SWEEP_INTERVAL = float(os.getenv("AGENT_LEASE_SWEEP", "30"))
+# How often workers that stopped polling are evicted (see CommanderState.reap).
+REAP_INTERVAL = float(os.getenv("AGENT_REAP_INTERVAL", "30"))
+state.worker_ttl = float(os.getenv("AGENT_WORKER_TTL", state.worker_ttl))
+
+async def _every(interval: float, fn):
+    """Run ``fn`` every ``interval`` seconds in the threadpool (it commits to
+    SQLite under the state lock); an error is logged and the loop goes on."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(fn)
+        except Exception:
+            logging.exception("periodic %s failed", fn.__name__)
+
+async def _sweep_leases():
+    await _every(LEASE_SWEEP_INTERVAL, state.requeue_expired)
+
+async def _reap_workers():
+    await _every(REAP_INTERVAL, state.reap)
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [asyncio.create_task(_sweep_leases()), asyncio.create_task(_reap_workers())]
+    yield
+    for t in tasks:
+        t.cancel()
+    await llm.close()
+
+app = FastAPI(lifespan=lifespan)
+# workers gzip large request bodies (result batches, registrations)
+app.add_middleware(GzipRequestMiddleware)
 
 class ChatIn(BaseModel):
     message: str
+    # Conversation to continue; omitted -> the shared default session.
+    session_id: str | None = None
 
-@app.post("/chat")
-async def chat(inp: ChatIn):
-    # record
-    state.history.append(ChatMessage(role="user", content=inp.message))
-    # call
+def _chat_args(conv, message:str, **extra):
     call_args={
-        "model": "gpt-4o-mini",
-        "messages": [m.model_dump() for m in state.history]
+        "model": CHAT_MODEL,
+        "messages": conv.prompt(),
+        **extra,
     }
-    if state.function_schema:
-        call_args.update(functions=state.function_schema, function_call="auto")
-    resp = openai.chat.completions.create(**call_args)
+    functions=state.schema.top_k(message, SCHEMA_TOP_K)
+    if functions:
+        call_args.update(functions=functions, function_call="auto")
+    return call_args
+
+def _queue_call(fn_name:str, arguments:str|dict|None, session_id:str|None=None):
+    """Route a model function call to a worker and return the chat reply."""
+    if isinstance(arguments, str):
+        try:
+            arguments=json.loads(arguments or "{}")
+        except ValueError as e:
+            raise HTTPException(422, f"bad arguments for {fn_name}: {e}")
+    if arguments is not None and not isinstance(arguments, dict):
+        raise HTTPException(422, f"bad arguments for {fn_name}: expected a JSON object, got {type(arguments).__name__}")
+    wid = state.get_worker_with_skill(fn_name)
+    if not wid:
+        raise HTTPException(404, f"No worker for {fn_name}")
+    try:
+        task_id = state.enqueue(wid, FunctionCall(name=fn_name, arguments=arguments or {}), session_id)
+    except InvalidArguments as e:
+        raise HTTPException(422, str(e))
+    return f"\U0001f527 Queued `{fn_name}` as `{task_id}` on {wid}"
+
+@app.post("/chat")
+async def chat(inp: ChatIn):
+    conv = state.sessions.get(inp.session_id)
+    conv.append(ChatMessage(role="user", content=inp.message))
+    async with chat_slots:
+        resp = await llm.chat.completions.create(**_chat_args(conv, inp.message))
     choice = resp.choices[0].message
     if choice.function_call:
-        fc = choice.function_call
-        # map
-        fn_name = fc.name
-        args = fc.arguments or {}
-        # find worker
-        wid = state.get_worker_with_skill(fn_name)
-        if not wid:
-            raise HTTPException(404, f"No worker for {fn_name}")
-        task_id = state.enqueue(wid, fc)
-        reply = f"\ud83d\udd27 Queued `{fn_name}` as `{task_id}` on {wid}"
+        # enqueue commits to SQLite under the state lock; keep it off the event loop
+        reply = await run_in_threadpool(_queue_call, choice.function_call.name, choice.function_call.arguments, inp.session_id)
     else:
         reply = choice.content or ""
-    state.history.append(ChatMessage(role="assistant", content=reply))
-    state.history = state.history[-20:]
+    conv.append(ChatMessage(role="assistant", content=reply))
     return {"reply": reply}
 
+@app.post("/chat/stream")
+async def chat_stream(inp: ChatIn):
+    """Like ``/chat`` but forwards the reply as Server-Sent Events.
+
+    Emits ``token`` events (``{"delta": ...}``) as text arrives, then a single
+    ``reply`` event with the final reply (including queued function calls).
+    """
+    conv = state.sessions.get(inp.session_id)
+    conv.append(ChatMessage(role="user", content=inp.message))
+    call_args=_chat_args(conv, inp.message, stream=True)
+
+    async def events():
+        text=[]; fn_name=""; fn_args=[]
+        try:
+            async with chat_slots:
+                async for chunk in await llm.chat.completions.create(**call_args):
+                    if not chunk.choices:
+                        continue
+                    delta=chunk.choices[0].delta
+                    if delta.function_call:
+                        fn_name+=delta.function_call.name or ""
+                        fn_args.append(delta.function_call.arguments or "")
+                    elif delta.content:
+                        text.append(delta.content)
+                        yield f"event: token\ndata: {json.dumps({'delta': delta.content})}\n\n"
+            reply=await run_in_threadpool(_queue_call, fn_name, "".join(fn_args), inp.session_id) if fn_name else "".join(text)
+        except HTTPException as e:
+            reply=e.detail
+        except Exception as e:
+            reply=f"LLM error: {e}"
+        conv.append(ChatMessage(role="assistant", content=reply))
+        yield f"event: reply\ndata: {json.dumps({'reply': reply})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/status")
 def status():
     return state.snapshot()
 
+@app.get("/schema")
+def schema(if_none_match: str|None=Header(None)):
+    """Full function schema; the ETag is the schema version."""
+    etag=f'"{state.schema.version}"'
+    if if_none_match==etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(state.schema.serialized(), media_type="application/json", headers={"ETag": etag})
+
 @app.post("/register")
 def register_worker(payload: dict = Body(...)):
     if payload.get("token") != state.bearer_token:
         raise HTTPException(401, "bad token")
-    wid = payload.get("worker_id", str(uuid.uuid4()))
+    wid = payload.get("worker_id") or str(uuid.uuid4())
     payload["worker_id"] = wid
     state.register_worker(wid, payload)
     return {"worker_id": wid}
 
 @app.get("/task/{worker_id}")
-def get_task(worker_id: str, authorization: str|None=Header(None)):
+async def get_task(worker_id: str, wait: float = 0, max_tasks: int|None = None,
+                   held: list[str] = Query([]), authorization: str|None=Header(None)):
+    """Claim up to ``max_tasks`` queued tasks; with ``wait`` > 0 hold the request
+    open until work arrives or ``wait`` seconds (capped at ``LONG_POLL_MAX``) pass.
+    ``held`` lists the task ids the worker is still running, whose leases are renewed."""
     if authorization!=state.bearer_token: raise HTTPException(401)
     if worker_id not in state.workers: raise HTTPException(404)
-    tasks=state.fetch_tasks(worker_id)
+    # fetch_tasks does blocking SQLite work under the state lock; keep it
+    # off the event loop so one slow write does not stall every long-poll
+    deadline=time.monotonic()+min(max(wait, 0), LONG_POLL_MAX)
+    seq=state.task_seq(worker_id)
+    tasks=await run_in_threadpool(state.fetch_tasks, worker_id, max_tasks, None, held)
+    # a wake-up can find nothing to claim (it was for a finished task, or
+    # a lease sweep another fetch won), so keep waiting until the deadline
+    while not tasks and max_tasks != 0:
+        remaining=deadline-time.monotonic()
+        if remaining <= 0 or not await state.wait_for_tasks(worker_id, seq, remaining): break
+        seq=state.task_seq(worker_id)
+        tasks=await run_in_threadpool(state.fetch_tasks, worker_id, max_tasks)
     if not tasks: return Response(status_code=204)
     return {"tasks": tasks}
 
-@app.post("/result/{task_id}")
-def post_result(task_id:str, body:dict=Body(...), authorization:str|None=Header(None)):
+@app.get("/task/{worker_id}/stream")
+async def stream_tasks(worker_id: str, capacity: int|None = None, authorization: str|None=Header(None)):
+    """Push task batches to a worker as Server-Sent Events.
+
+    With ``capacity`` the worker never holds more than that many leased
+    tasks: each batch fills only its free slots and the stream claims more
+    as results come back, so queued work stays available to idle workers.
+    """
     if authorization!=state.bearer_token: raise HTTPException(401)
-    payload=body.get("payload")
-    cfg_path = pathlib.Path.home()/".config"/"agent"/"secrets.toml"
-    if cfg_path.exists():
-        vault = toml.loads(cfg_path.read_text()).get("vault_passphrase")
-    else:
-        vault = None
+    if worker_id not in state.workers: raise HTTPException(404)
+
+    async def events():
+        # ends if the worker is reaped, so it reconnects, gets 404 and re-registers
+        while worker_id in state.workers:
+            seq=state.task_seq(worker_id)
+            if capacity is None:
+                tasks=await run_in_threadpool(state.fetch_tasks, worker_id)
+            else:
+                tasks=await run_in_threadpool(state.fetch_within, worker_id, capacity)
+            if tasks:
+                yield f"event: tasks\ndata: {json.dumps({'tasks': tasks})}\n\n"
+            elif not await state.wait_for_tasks(worker_id, seq, SSE_KEEPALIVE):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
+def _vault_passphrase():
+    return SECRETS.get("vault_passphrase")
+
+def _decode_result(payload:str, vault:str|None):
     if vault:
         try:
-            result=json.loads(aes_decrypt(payload.encode(), vault))
+            return json.loads(aes_decrypt(payload.encode(), vault))
         except Exception:
-            result=json.loads(payload)
-    else:
-        result=json.loads(payload)
+            pass
+    return json.loads(payload)
+
+@app.post("/result/{task_id}")
+def post_result(task_id:str, body:dict=Body(...), authorization:str|None=Header(None)):
+    if authorization!=state.bearer_token: raise HTTPException(401)
+    try:
+        result=_decode_result(body.get("payload"), _vault_passphrase())
+    except (TypeError, ValueError) as e:
+        raise HTTPException(422, f"bad result payload: {e}")
     state.complete(task_id, result)
     return {"status":"ok"}
 
+def _ingest_results(items:list):
+    """Store the decodable entries; return ``(count, errors)``.
+
+    A bad entry is reported by index instead of failing the batch, so one
+    malformed result cannot make the worker resend (or lose) the others.
+    """
+    vault=_vault_passphrase()
+    results=[]
+    errors=[]
+    for n, i in enumerate(items):
+        try:
+            results.append((i["task_id"], _decode_result(i["payload"], vault)))
+        except (KeyError, TypeError, ValueError) as e:
+            errors.append({"index":n, "error":f"bad result entry: {e!r}"})
+    state.complete_many(results)
+    return len(results), errors
+
+@app.post("/results")
+async def post_results(request: Request, authorization:str|None=Header(None)):
+    """Store many results in one transaction.
+
+    Accepts ``{"results": [{"task_id": ..., "payload": ...}, ...]}`` or, with
+    ``Content-Type: application/x-ndjson``, one such entry per line. Entries
+    that cannot be decoded are skipped and listed under ``errors``; only an
+    unreadable body is rejected with 422.
+    """
+    if authorization!=state.bearer_token: raise HTTPException(401)
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items=[]
+            buf=b""
+            async for chunk in request.stream():
+                *lines, buf = (buf+chunk).split(b"\n")
+                items.extend(json.loads(l) for l in lines if l.strip())
+            if buf.strip():
+                items.append(json.loads(buf))
+        else:
+            items=(await request.json())["results"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(422, f"bad results body: {e}")
+    if not isinstance(items, list): raise HTTPException(422, "bad results body: results must be a list")
+    count, errors=await run_in_threadpool(_ingest_results, items)
+    if errors:
+        return {"status":"ok", "count":count, "errors":errors}
+    return {"status":"ok", "count":count}
+
 @app.post("/upload")
 async def upload(file: UploadFile=File(...)):
     d=os.getcwd()+"/uploads"
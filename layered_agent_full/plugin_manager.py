@@ -2,68 +2,314 @@
 
 from __future__ import annotations
 
+import hashlib
 import importlib.util
 import inspect
+import io
+import json
 import logging
+import os
 import subprocess
+import tarfile
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Callable
+from types import ModuleType
+from typing import Dict, Callable, Iterable, Tuple
 
 import requests
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _CachedModule:
+    stat: Tuple[int, int]  # (mtime_ns, size)
+    digest: str
+    module: ModuleType | None
+    skills: Dict[str, Callable] = field(default_factory=dict)
+
+
+def stat_key(path: Path) -> Tuple[int, int]:
+    """Cheap change fingerprint of a file: ``(mtime_ns, size)``."""
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def source_stats(directory: Path) -> Dict[Path, Tuple[int, int]]:
+    """:func:`stat_key` of every module (``*.py`` but ``__init__``) in ``directory``.
+
+    Comparing two results tells whether any module was added, removed or
+    modified without reading a file.
+    """
+    found = {}
+    for f in sorted(directory.glob("*.py")):
+        if f.stem == "__init__":
+            continue
+        try:
+            found[f] = stat_key(f)
+        except FileNotFoundError:
+            continue  # removed while scanning
+    return found
+
+
+class ModuleCache:
+    """Import the ``.py`` files of a directory, re-executing only changes.
+
+    Each file is keyed by ``(mtime_ns, size)``; when that changes the
+    content hash decides whether the module really has to be executed
+    again (a ``touch`` does not). Files that disappear are dropped along
+    with their skills. A module that fails to import is logged, its
+    previous skills (if any) are kept, and it is not retried until the
+    file changes again.
+
+    Modules are never registered in :data:`sys.modules`: a plugin named
+    like a real module must not shadow it, and dropping the cache entry is
+    all it takes to unload one.
+    """
+
+    def __init__(self, package: str | None = None):
+        self.package = package
+        self._modules: Dict[Path, _CachedModule] = {}
+
+    def _module_name(self, path: Path) -> str:
+        return f"{self.package}.{path.stem}" if self.package else path.stem
+
+    def changed(self, directory: Path) -> bool:
+        """Cheap check (stat only) whether ``load_dir`` would do any work."""
+        cached = {
+            p: m.stat for p, m in self._modules.items()
+            if p.parent == directory
+        }
+        return source_stats(directory) != cached
+
+    def load_dir(self, directory: Path) -> Dict[str, Callable]:
+        """Return the skills defined in ``directory``, importing as needed."""
+        sources = source_stats(directory)
+        for path in [p for p in self._modules if p.parent == directory]:
+            if path not in sources:
+                self._unload(path)
+        skills: Dict[str, Callable] = {}
+        for path, stat in sources.items():
+            entry = self._modules.get(path)
+            if entry is None or entry.stat != stat:
+                entry = self._refresh(path, stat, entry)
+            if entry is not None:
+                skills.update(entry.skills)
+        return skills
+
+    def _refresh(self, path: Path, stat, entry: _CachedModule | None):
+        try:
+            source = path.read_bytes()
+        except OSError as e:
+            logger.warning("Cannot read plugin %s: %s", path, e)
+            return entry
+        digest = hashlib.sha256(source).hexdigest()
+        if entry is not None and entry.digest == digest:
+            entry.stat = stat
+            return entry
+        name = self._module_name(path)
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(mod)
+        except Exception:
+            logger.exception("Failed to import %s", path)
+            # remember the broken version so it is not retried until edited
+            if entry is None:
+                entry = _CachedModule(stat, digest, None)
+                self._modules[path] = entry
+            entry.stat, entry.digest = stat, digest
+            return entry
+        if entry is not None:
+            logger.info("Reloaded %s", path)
+        skills = {
+            n: fn for n, fn in inspect.getmembers(mod, inspect.isfunction)
+            if getattr(fn, "_is_skill", False)
+        }
+        entry = _CachedModule(stat, digest, mod, skills)
+        self._modules[path] = entry
+        return entry
+
+    def _unload(self, path: Path) -> None:
+        entry = self._modules.pop(path)
+        logger.info("Unloaded %s (%s)", path, ", ".join(entry.skills))
+
+
+def _sha256_file(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    """Write ``data`` to ``path`` unless it already holds it.
+
+    Leaving identical files alone keeps their mtime, so the module cache
+    does not re-import them.
+    """
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    _atomic_write(path, data)
+    return True
+
+
 class PluginManager:
-    """Download and load skill plugins."""
+    """Download and load skill plugins.
 
-    def __init__(self, plugin_dir: Path | None = None):
+    Downloads share one pooled :class:`requests.Session`. The ETag and
+    Last-Modified of every fetched URL are remembered under
+    ``plugin_dir/.cache`` so a re-install sends a conditional request and
+    an unchanged plugin is neither re-downloaded nor rewritten. Git sources
+    are fetched into a cached bare repository and extracted once per
+    commit.
+    """
+
+    def __init__(self, plugin_dir: Path | None = None, max_workers: int = 8):
         self.plugin_dir = Path(plugin_dir or Path.home() / ".agent" / "plugins")
         self.plugin_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir = self.plugin_dir / ".cache"
+        self.max_workers = max_workers
         self.skills: Dict[str, Callable] = {}
+        self._cache = ModuleCache()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._http_lock = threading.Lock()
+        self._http_meta: Dict[str, Dict[str, str]] | None = None
+        self._git_lock = threading.Lock()
+
+    # -- HTTP -------------------------------------------------------------
+
+    def _http_cache(self) -> Dict[str, Dict[str, str]]:
+        if self._http_meta is None:
+            try:
+                self._http_meta = json.loads((self.cache_dir / "http.json").read_text())
+            except (OSError, ValueError):
+                self._http_meta = {}
+        return self._http_meta
+
+    def _save_http_cache(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.cache_dir / "http.json", json.dumps(self._http_meta).encode())
 
     def load_from_url(self, url: str) -> Path:
-        """Download a single Python module from ``url`` into ``plugin_dir``."""
+        """Download a single Python module from ``url`` into ``plugin_dir``.
+
+        If the plugin was fetched before and is unmodified on disk, the
+        request is conditional and a ``304`` leaves the file untouched.
+        """
         fname = url.split("/")[-1]
         if not fname.endswith(".py"):
             raise ValueError("Only .py plugins supported")
         dest = self.plugin_dir / fname
+        with self._http_lock:
+            meta = dict(self._http_cache().get(url, {}))
+        headers = {}
+        if meta and _sha256_file(dest) == meta.get("sha256"):
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
         logger.info("Downloading plugin %s", url)
-        resp = requests.get(url, timeout=30)
+        resp = self.session.get(url, headers=headers, timeout=30)
+        if resp.status_code == 304:
+            logger.info("Plugin %s not modified", url)
+            return dest
         resp.raise_for_status()
-        dest.write_bytes(resp.content)
+        _write_if_changed(dest, resp.content)
+        with self._http_lock:
+            self._http_cache()[url] = {
+                "etag": resp.headers.get("ETag", ""),
+                "last_modified": resp.headers.get("Last-Modified", ""),
+                "sha256": hashlib.sha256(resp.content).hexdigest(),
+            }
+            self._save_http_cache()
         return dest
 
-    def load_from_git(self, repo_url: str, subdir: str | None = None) -> Path:
-        """Clone ``repo_url`` and copy ``.py`` files to ``plugin_dir``."""
-        with tempfile.TemporaryDirectory() as tmp:
-            subprocess.run([
-                "git",
-                "clone",
-                "--depth",
-                "1",
-                repo_url,
-                tmp,
-            ], check=True)
-            src = Path(tmp)
-            if subdir:
-                src = src / subdir
-            for f in src.glob("*.py"):
-                (self.plugin_dir / f.name).write_bytes(f.read_bytes())
+    def install_many(self, urls: Iterable[str]) -> Dict[str, Path | Exception]:
+        """Fetch many plugin URLs concurrently.
+
+        Returns the installed path per URL, or the exception that URL
+        raised; one failure does not stop the others.
+        """
+        urls = list(dict.fromkeys(urls))
+        results: Dict[str, Path | Exception] = {}
+        if not urls:
+            return results
+        with ThreadPoolExecutor(min(self.max_workers, len(urls))) as pool:
+            futures = {url: pool.submit(self.load_from_url, url) for url in urls}
+            for url, fut in futures.items():
+                try:
+                    results[url] = fut.result()
+                except Exception as e:
+                    logger.warning("Plugin %s failed: %s", url, e)
+                    results[url] = e
+        return results
+
+    # -- git --------------------------------------------------------------
+
+    def _git(self, *args: str, **kw) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], check=True, capture_output=True, **kw)
+
+    def load_from_git(self, repo_url: str, subdir: str | None = None, ref: str = "HEAD") -> Path:
+        """Copy the ``.py`` files of ``repo_url`` (at ``ref``) to ``plugin_dir``.
+
+        The repository is fetched into a bare cache under ``plugin_dir/.cache``
+        and each commit is extracted once; when ``ref`` still points at an
+        extracted commit nothing is fetched. Only files whose content
+        differs are written.
+        """
+        git_dir = self.cache_dir / "git"
+        repo = git_dir / (hashlib.sha256(repo_url.encode()).hexdigest()[:16] + ".git")
+        with self._git_lock:
+            out = self._git("ls-remote", repo_url, ref, text=True).stdout.split()
+            commit = out[0] if out else None
+            tree = git_dir / "trees" / commit if commit else None
+            if tree is None or not tree.is_dir():
+                if not repo.is_dir():
+                    self._git("init", "--quiet", "--bare", str(repo))
+                self._git("--git-dir", str(repo), "fetch", "--quiet", "--depth", "1", repo_url, commit or ref)
+                commit = self._git("--git-dir", str(repo), "rev-parse", "FETCH_HEAD", text=True).stdout.strip()
+                tree = git_dir / "trees" / commit
+                if not tree.is_dir():
+                    archive = self._git("--git-dir", str(repo), "archive", "--format=tar", commit).stdout
+                    tmp = Path(tempfile.mkdtemp(dir=git_dir))
+                    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+                        if hasattr(tarfile, "data_filter"):
+                            tar.extraction_filter = tarfile.data_filter
+                        tar.extractall(tmp)
+                    tree.parent.mkdir(exist_ok=True)
+                    tmp.rename(tree)
+            else:
+                logger.info("Git plugins %s already at %s", repo_url, commit[:12])
+        src = tree / subdir if subdir else tree
+        for f in src.glob("*.py"):
+            _write_if_changed(self.plugin_dir / f.name, f.read_bytes())
         return self.plugin_dir
 
     def discover_plugins(self) -> Dict[str, Callable]:
-        """Import all plugin modules and return discovered skills."""
-        skills: Dict[str, Callable] = {}
-        for f in self.plugin_dir.glob("*.py"):
-            if f.stem == "__init__":
-                continue
-            spec = importlib.util.spec_from_file_location(f.stem, f)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
-            for name, fn in inspect.getmembers(mod, inspect.isfunction):
-                if getattr(fn, "_is_skill", False):
-                    skills[name] = fn
-        self.skills = skills
-        return skills
+        """Return skills from all plugin modules.
+
+        Only new or modified files are imported; see :class:`ModuleCache`.
+        """
+        self.skills = self._cache.load_dir(self.plugin_dir)
+        return self.skills
+
+    def plugins_changed(self) -> bool:
+        """True if plugin files were added, removed or modified."""
+        return self._cache.changed(self.plugin_dir)
@@ -0,0 +1,84 @@
+"""Per-session chat histories for the commander."""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from layered_agent_full.shared.protocol import ChatMessage
+
+DEFAULT_SESSION = "default"
+
+
+def estimate_tokens(msg: ChatMessage) -> int:
+    """Cheap token estimate: ~4 characters per token plus per-message overhead."""
+    return len(msg.content) // 4 + 4
+
+
+class Conversation:
+    """Messages of one session, trimmed from the front to a token budget.
+
+    The serialized ``model_dump()`` form of each message is cached as it is
+    appended, so building a prompt only costs the new messages.
+    """
+
+    def __init__(self, token_budget: int = 4000):
+        self.token_budget = token_budget
+        self.messages: List[ChatMessage] = []
+        self.tokens = 0
+        self._dumped: List[Dict[str, Any]] = []
+        self._costs: List[int] = []
+        self._lock = threading.Lock()
+
+    def append(self, msg: ChatMessage):
+        cost = estimate_tokens(msg)
+        with self._lock:
+            self.messages.append(msg)
+            self._dumped.append(msg.model_dump())
+            self._costs.append(cost)
+            self.tokens += cost
+            # always keep the newest message, even if it alone is over budget
+            drop = 0
+            while self.tokens > self.token_budget and drop < len(self._costs) - 1:
+                self.tokens -= self._costs[drop]
+                drop += 1
+            if drop:
+                del self.messages[:drop], self._dumped[:drop], self._costs[:drop]
+
+    def prompt(self) -> List[Dict[str, Any]]:
+        """Return a snapshot of the cached message dicts.
+
+        The list is copied under the lock so a concurrent ``append`` cannot
+        change or trim a prompt that is being sent; the dicts are shared and
+        must not be modified.
+        """
+        with self._lock:
+            return list(self._dumped)
+
+
+class ConversationStore:
+    """Session id -> ``Conversation``, evicting the least recently used."""
+
+    def __init__(self, max_sessions: int = 1000, token_budget: int = 4000):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._sessions: OrderedDict[str, Conversation] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str | None = None) -> Conversation:
+        session_id = session_id or DEFAULT_SESSION
+        with self._lock:
+            conv = self._sessions.get(session_id)
+            if conv is None:
+                conv = self._sessions[session_id] = Conversation(self.token_budget)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return conv
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -11,13 +11,15 @@ class FunctionCall(BaseModel):
     arguments: Dict[str, Any] = Field(default_factory=dict)
 
 
+def skill_schema_entry(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the OpenAI function-calling schema for one skill's metadata."""
+    return {
+        "name":        meta["name"],
+        "description": meta.get("description", ""),
+        "parameters":  meta.get("parameters", {"type": "object", "properties": {}}),
+    }
+
+
 def make_skill_schema(skills: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Return OpenAI function-calling schema list from skill metadata dict."""
-    return [
-        {
-            "name":        meta["name"],
-            "description": meta.get("description", ""),
-            "parameters":  meta.get("parameters", {"type": "object", "properties": {}}),
-        }
-        for meta in skills.values()
-    ]
+    return [skill_schema_entry(meta) for meta in skills.values()]
@@ -0,0 +1,148 @@
+"""Policies for choosing which worker runs a skill call."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+from typing import TYPE_CHECKING, Dict, List, Sequence, Set
+
+if TYPE_CHECKING:
+    from layered_agent_full.shared.state import CommanderState
+
+
+class RoutingPolicy:
+    """Pick one of ``candidates`` (workers offering ``skill``)."""
+
+    def select(self, skill: str, candidates: Sequence[str], state: "CommanderState") -> str:
+        raise NotImplementedError
+
+    def observe(self, worker_id: str, state: "CommanderState") -> None:
+        """Called after ``worker_id`` registered, was evicted or its load changed."""
+
+
+class RoundRobin(RoutingPolicy):
+    """Cycle through the workers offering each skill."""
+
+    def __init__(self):
+        self._counters: Dict[str, itertools.count] = {}
+
+    def select(self, skill, candidates, state):
+        counter = self._counters.setdefault(skill, itertools.count())
+        return candidates[next(counter) % len(candidates)]
+
+
+class _LoadBuckets:
+    """Workers of one skill grouped by outstanding count.
+
+    Each bucket keeps its workers in insertion order so ties rotate, and a
+    heap of bucket keys finds the least loaded one without looking at every
+    worker.
+    """
+
+    def __init__(self):
+        self.load: Dict[str, int] = {}
+        self.buckets: Dict[int, Dict[str, None]] = {}
+        self._keys: List[int] = []
+        self._queued: Set[int] = set()
+
+    def place(self, wid: str, count: int):
+        old = self.load.get(wid)
+        if old == count:
+            return
+        if old is not None:
+            self._discard(wid, old)
+        self.load[wid] = count
+        self.buckets.setdefault(count, {})[wid] = None
+        if count not in self._queued:
+            self._queued.add(count)
+            heapq.heappush(self._keys, count)
+
+    def remove(self, wid: str):
+        old = self.load.pop(wid, None)
+        if old is not None:
+            self._discard(wid, old)
+
+    def _discard(self, wid: str, count: int):
+        bucket = self.buckets[count]
+        del bucket[wid]
+        if not bucket:
+            del self.buckets[count]
+
+    def pop_least(self) -> str:
+        """Return the next least loaded worker and move it behind its ties."""
+        while self._keys[0] not in self.buckets:
+            self._queued.discard(heapq.heappop(self._keys))
+        bucket = self.buckets[self._keys[0]]
+        wid = next(iter(bucket))
+        del bucket[wid]
+        bucket[wid] = None
+        return wid
+
+
+class LeastOutstanding(RoundRobin):
+    """Prefer the worker with the fewest unfinished tasks; rotate among ties.
+
+    Workers are kept in per-skill load buckets updated through
+    :meth:`observe`, so a pick does not scan the candidates. A skill the
+    policy has not been told about falls back to a linear scan.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._skills: Dict[str, _LoadBuckets] = {}
+        self._offered: Dict[str, Set[str]] = {}
+
+    def observe(self, worker_id, state):
+        info = state.workers.get(worker_id)
+        skills = {s["name"] for s in info.get("skills", [])} if info else set()
+        for skill in self._offered.pop(worker_id, set()) - skills:
+            buckets = self._skills[skill]
+            buckets.remove(worker_id)
+            if not buckets.load:
+                del self._skills[skill]
+        count = state.outstanding.get(worker_id, 0)
+        for skill in skills:
+            self._skills.setdefault(skill, _LoadBuckets()).place(worker_id, count)
+        if skills:
+            self._offered[worker_id] = skills
+
+    def select(self, skill, candidates, state):
+        buckets = self._skills.get(skill)
+        if buckets is not None:
+            return buckets.pop_least()
+        start = super().select(skill, candidates, state)
+        offset = candidates.index(start)
+        rotated = candidates[offset:] + candidates[:offset]
+        return min(rotated, key=lambda wid: state.outstanding.get(wid, 0))
+
+
+class LatencyWeighted(RoutingPolicy):
+    """Pick randomly, weighted by the inverse of each worker's mean task latency.
+
+    Workers without a measurement yet get the fastest known latency so new
+    workers are tried promptly. Every pick is O(candidates): the weights
+    change with each completed task, so there is nothing worth indexing.
+    """
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng or random.Random()
+
+    def select(self, skill, candidates, state):
+        known = [state.latency[w] for w in candidates if w in state.latency]
+        default = min(known) if known else 1.0
+        weights = [1.0 / max(state.latency.get(w, default), 1e-3) for w in candidates]
+        return self.rng.choices(candidates, weights)[0]
+
+
+POLICIES = {
+    "round_robin": RoundRobin,
+    "least_outstanding": LeastOutstanding,
+    "latency_weighted": LatencyWeighted,
+}
+
+
+def make_policy(name: str) -> RoutingPolicy:
+    try:
+        return POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"unknown routing policy {name!r}; choose from {sorted(POLICIES)}")
@@ -0,0 +1,126 @@
+"""Incrementally maintained function-calling schema for registered skills."""
+from __future__ import annotations
+
+import heapq
+import json
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Set
+
+from layered_agent_full.shared.protocol import skill_schema_entry
+from layered_agent_full.shared.validation import compile_validator
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Matches on a skill's name count more than matches on its description.
+NAME_WEIGHT = 2.0
+
+
+def terms(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+class SkillSchemaIndex:
+    """Schema entries keyed by skill name.
+
+    ``update``/``remove`` touch only the affected skill and bump ``version``
+    when something changed; the list and JSON forms are rebuilt lazily once
+    per version. ``top_k`` ranks skills against a chat message through an
+    inverted term index so only the relevant ones are sent to the LLM.
+    ``validate`` checks call arguments with a validator compiled once per
+    schema entry.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._list: List[Dict[str, Any]] | None = None
+        self._json: str | None = None
+        self._validators: Dict[str, Callable[[Dict[str, Any]], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, meta: Dict[str, Any]) -> bool:
+        entry = skill_schema_entry(meta)
+        name = entry["name"]
+        with self._lock:
+            if self._entries.get(name) == entry:
+                return False
+            self._unindex(name)
+            self._entries[name] = entry
+            weights = {t: 1.0 for t in terms(entry["description"])}
+            weights.update({t: NAME_WEIGHT for t in terms(name.replace("_", " "))})
+            for t, w in weights.items():
+                self._index[t][name] = w
+            self._changed()
+            return True
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            if self._entries.pop(name, None) is None:
+                return False
+            self._unindex(name)
+            self._changed()
+            return True
+
+    def validate(self, name: str, arguments: Dict[str, Any]) -> List[str]:
+        """Errors in ``arguments`` for skill ``name``; unknown skills pass."""
+        with self._lock:
+            validator = self._validators.get(name)
+            if validator is None:
+                entry = self._entries.get(name)
+                if entry is None:
+                    return []
+                validator = self._validators[name] = compile_validator(entry["parameters"])
+        return validator(arguments)
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._list is None:
+                self._list = list(self._entries.values())
+            return self._list
+
+    def serialized(self) -> str:
+        with self._lock:
+            if self._json is None:
+                self._json = json.dumps(list(self._entries.values()))
+            return self._json
+
+    def top_k(self, message: str, k: int) -> List[Dict[str, Any]]:
+        """Return up to ``k`` entries, most relevant to ``message`` first."""
+        entries = self.as_list()
+        if k <= 0:
+            return []
+        if len(entries) <= k:
+            return entries
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            for t in terms(message):
+                for name, w in self._index.get(t, {}).items():
+                    scores[name] += w
+            best = heapq.nlargest(k, scores, key=scores.__getitem__)
+            chosen = [self._entries[n] for n in best]
+        # pad with unscored skills so the model still sees k options
+        picked = set(best)
+        chosen.extend(e for e in entries if e["name"] not in picked)
+        return chosen[:k]
+
+    def _unindex(self, name: str):
+        self._validators.pop(name, None)
+        old = self._entries.get(name)
+        if old is None:
+            return
+        for t in terms(old["description"]) | terms(name.replace("_", " ")):
+            bucket = self._index.get(t)
+            if bucket is not None:
+                bucket.pop(name, None)
+                if not bucket:
+                    del self._index[t]
+
+    def _changed(self):
+        self.version += 1
+        self._list = None
+        self._json = None
@@ -1,32 +1,82 @@
 from __future__ import annotations
+import asyncio
 import sqlite3
 import json
 import secrets
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
 
-from layered_agent_full.shared.protocol import ChatMessage, make_skill_schema
+from layered_agent_full.shared.conversation import ConversationStore
+from layered_agent_full.shared.protocol import ChatMessage
+from layered_agent_full.shared.routing import RoutingPolicy, make_policy
+from layered_agent_full.shared.schema import SkillSchemaIndex
+from layered_agent_full.shared.validation import InvalidArguments
 
 # Use a path relative to this file so the DB is found regardless of CWD.
 # The commander/planning module stores tasks in the same location.
 DB_PATH = Path(__file__).resolve().parent.parent / "commander" / "tasks.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+LEASE_SECONDS = 300.0
+# Chat history limits: sessions kept (LRU) and approximate tokens per session.
+MAX_SESSIONS = 1000
+HISTORY_TOKENS = 4000
+# Default worker selection policy (see shared.routing.POLICIES) and the
+# smoothing factor of the per-worker latency average.
+ROUTING_POLICY = "least_outstanding"
+LATENCY_ALPHA = 0.2
+# Workers not heard from (registration or task poll) for this many seconds
+# are considered dead by ``reap``. Keep it well above the worker's long-poll wait.
+WORKER_TTL = 90.0
+
 
 class CommanderState:
-    def __init__(self):
-        self.history: List[ChatMessage] = []
+    def __init__(self, routing: str | RoutingPolicy = ROUTING_POLICY):
+        self.sessions = ConversationStore(MAX_SESSIONS, HISTORY_TOKENS)
         self.workers: Dict[str, Dict[str, Any]] = {}
         self.skills: Dict[str, Dict[str, Any]] = {}
+        # Routing: skill -> workers offering it, plus the load signals the
+        # policies read (unfinished tasks and mean completion latency).
+        self.router = make_policy(routing) if isinstance(routing, str) else routing
+        self.skill_workers: Dict[str, List[str]] = {}
+        self.outstanding: Dict[str, int] = {}
+        self.latency: Dict[str, float] = {}
+        # Liveness: last registration/poll per worker and evicted worker ids.
+        self.worker_ttl: float = WORKER_TTL
+        self.last_seen: Dict[str, float] = {}
+        self.dead_workers: Set[str] = set()
+        # task id -> (worker id, enqueue time, chat session) until completion
+        self._inflight: Dict[str, Tuple[str, float, str | None]] = {}
         self.bearer_token: str = secrets.token_hex(16)
-        self.function_schema: List[Dict[str, Any]] = []
-        self._memory_queue: Dict[str, List[Dict[str, Any]]] = {}
+        # Function-calling schema, updated per skill as workers come and go.
+        self.schema = SkillSchemaIndex()
+        # Seconds a fetched task stays leased to a worker before it is
+        # handed out again.
+        self.lease_seconds: float = LEASE_SECONDS
+        # Long-poll support: ``enqueue`` bumps a per-worker sequence number and
+        # wakes any request awaiting ``wait_for_tasks``. That bookkeeping has
+        # its own short-held lock so the event loop never waits on ``_lock``,
+        # which is held across SQLite writes.
+        self._lock = threading.RLock()
+        self._wake_lock = threading.Lock()
+        self._task_seq: Dict[str, int] = {}
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._tx_depth = 0
+        self._on_commit: List[Callable[[], None]] = []
         self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
         self._init_db()
 
     def _init_db(self):
         c = self.conn.cursor()
+        # WAL lets readers proceed while a write is in flight; NORMAL sync is
+        # durable across application crashes and only fsyncs on checkpoint.
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
         c.execute(
             """
         CREATE TABLE IF NOT EXISTS audit (
@@ -41,116 +91,405 @@ class CommanderState:
             id TEXT PRIMARY KEY,
             worker_id TEXT,
             status TEXT,
-            payload TEXT
+            payload TEXT,
+            lease_expires REAL
         )"""
         )
+        cols = {row[1] for row in c.execute("PRAGMA table_info(queue)")}
+        if "lease_expires" not in cols:
+            c.execute("ALTER TABLE queue ADD COLUMN lease_expires REAL")
+        # Serves both halves of the claim query in fetch_tasks as range seeks.
+        c.execute("DROP INDEX IF EXISTS idx_queue_worker_status")
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_queue_claim "
+            "ON queue (worker_id, status, lease_expires)"
+        )
         self.conn.commit()
 
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Hold the state lock and commit once when the outermost block exits.
+
+        Nested blocks join the enclosing transaction, so several writes (e.g.
+        an audit row plus a queue row) share a single commit. Callbacks
+        registered with ``_after_commit`` run once that commit succeeds and
+        are discarded on rollback.
+        """
+        with self._lock:
+            self._tx_depth += 1
+            callbacks: List[Callable[[], None]] = []
+            try:
+                yield self.conn.cursor()
+                if self._tx_depth == 1:
+                    self.conn.commit()
+                    callbacks, self._on_commit = self._on_commit, []
+            except BaseException:
+                if self._tx_depth == 1:
+                    self.conn.rollback()
+                    self._on_commit.clear()
+                raise
+            finally:
+                self._tx_depth -= 1
+            for callback in callbacks:
+                callback()
+
+    def _after_commit(self, callback: Callable[[], None]):
+        """Run ``callback`` once the enclosing transaction has committed."""
+        self._on_commit.append(callback)
+
     def _audit(self, action: str, details: Dict[str, Any]):
-        self.conn.execute(
-            "INSERT INTO audit VALUES (?,?,?)",
-            (datetime.utcnow().isoformat(), action, json.dumps(details)),
-        )
-        self.conn.commit()
+        with self._transaction() as c:
+            c.execute(
+                "INSERT INTO audit VALUES (?,?,?)",
+                (datetime.utcnow().isoformat(), action, json.dumps(details)),
+            )
+
+    def audit(self, action: str, details: Dict[str, Any]):
+        """Record an audit event in its own transaction."""
+        self._audit(action, details)
+
+    @property
+    def function_schema(self) -> List[Dict[str, Any]]:
+        return self.schema.as_list()
 
     def register_worker(self, wid: str, info: Dict[str, Any]):
-        self.workers[wid] = info
-        for s in info.get("skills", []):
-            self.skills[s["name"]] = s
-        self.function_schema = make_skill_schema(self.skills)
+        with self._lock:
+            dropped = self._unindex_worker(wid)
+            self.workers[wid] = info
+            self.last_seen[wid] = time.time()
+            self.dead_workers.discard(wid)
+            for s in info.get("skills", []):
+                self.skills[s["name"]] = s
+                self.schema.update(s)
+                workers = self.skill_workers.setdefault(s["name"], [])
+                if wid not in workers:
+                    workers.append(wid)
+            self._drop_unserved(dropped)
+            self.router.observe(wid, self)
         self._audit("register_worker", {"worker_id": wid})
 
+    def _unindex_worker(self, wid: str) -> Set[str]:
+        """Remove ``wid`` from the routing index; return the skills it offered."""
+        names = {s["name"] for s in self.workers.get(wid, {}).get("skills", [])}
+        for name in names:
+            workers = self.skill_workers.get(name, [])
+            if wid in workers:
+                workers.remove(wid)
+        return names
+
+    def _drop_unserved(self, names: Iterable[str]):
+        """Forget skills among ``names`` that no registered worker offers."""
+        for name in names:
+            if not self.skill_workers.get(name):
+                self.skill_workers.pop(name, None)
+                self.skills.pop(name, None)
+                self.schema.remove(name)
+
+    def touch(self, wid: str, held: Iterable[str] = ()):
+        """Record a heartbeat from ``wid`` and renew the leases of ``held``."""
+        if wid in self.workers:
+            self.last_seen[wid] = time.time()
+            held = list(held)
+            if held:
+                self.renew_leases(wid, held)
+
+    def renew_leases(
+        self, worker_id: str, task_ids: Iterable[str], lease: float | None = None
+    ) -> int:
+        """Extend the unexpired leases of ``task_ids`` by ``lease`` seconds.
+
+        Workers report the tasks they are still running or holding in their
+        local backlog, and heartbeat far more often than ``lease_seconds``,
+        so those are not handed out again. Only reported tasks are renewed:
+        one the worker never received or has dropped lapses and is
+        re-delivered. Leases that already lapsed stay claimable.
+        """
+        now = time.time()
+        lease = self.lease_seconds if lease is None else lease
+        with self._transaction() as c:
+            c.executemany(
+                "UPDATE queue SET lease_expires=? "
+                "WHERE id=? AND worker_id=? AND status='sent' AND lease_expires>=?",
+                [(now + lease, task_id, worker_id, now) for task_id in task_ids],
+            )
+            return c.rowcount
+
+    def reap(self, ttl: float | None = None) -> List[str]:
+        """Evict workers silent for more than ``ttl`` seconds.
+
+        Their pending and leased tasks move to another live worker with the
+        same skill; tasks no live worker can run stay queued for the old id.
+        Returns the evicted worker ids.
+        """
+        cutoff = time.time() - (self.worker_ttl if ttl is None else ttl)
+        with self._lock:
+            stale = [wid for wid, seen in self.last_seen.items() if seen < cutoff]
+            for wid in stale:
+                self._evict(wid)
+        return stale
+
+    def _evict(self, wid: str):
+        self._drop_unserved(self._unindex_worker(wid))
+        self.workers.pop(wid, None)
+        self.last_seen.pop(wid, None)
+        self.dead_workers.add(wid)
+        moved = {}
+        with self._transaction() as c:
+            c.execute(
+                "SELECT id, payload FROM queue WHERE worker_id=? AND status IN ('pending','sent')",
+                (wid,),
+            )
+            for task_id, payload in c.fetchall():
+                target = self.get_worker_with_skill(json.loads(payload)["name"])
+                if target is None:
+                    continue
+                c.execute(
+                    "UPDATE queue SET worker_id=?, status='pending', lease_expires=NULL WHERE id=?",
+                    (target, task_id),
+                )
+                info = self._inflight.get(task_id)
+                if info:
+                    self._inflight[task_id] = (target,) + info[1:]
+                self.outstanding[target] = self.outstanding.get(target, 0) + 1
+                moved[task_id] = target
+            self.outstanding.pop(wid, None)
+            self._audit("evict_worker", {"worker_id": wid, "rerouted": moved})
+        self.router.observe(wid, self)
+        for target in set(moved.values()):
+            self.router.observe(target, self)
+        for target in set(moved.values()):
+            self._notify(target)
+
     def get_worker_with_skill(self, name: str) -> Any:
-        for wid, info in self.workers.items():
-            if any(s['name'] == name for s in info.get('skills', [])):
-                return wid
-        return None
+        with self._lock:
+            candidates = self.skill_workers.get(name)
+            if not candidates:
+                return None
+            return self.router.select(name, candidates, self)
+
+    @property
+    def history(self) -> List[ChatMessage]:
+        """Messages of the default chat session."""
+        return self.sessions.get().messages
+
+    def enqueue(self, worker_id: str, func_call: Any, session_id: str | None = None) -> str:
+        return self.enqueue_many([(worker_id, func_call)], session_id)[0]
 
-    def enqueue(self, worker_id: str, func_call: Any) -> str:
+    def enqueue_many(
+        self, calls: Iterable[Tuple[str, Any]], session_id: str | None = None
+    ) -> List[str]:
+        """Queue ``(worker_id, func_call)`` pairs under a single commit.
+
+        Results of these tasks are appended to chat session ``session_id``.
+        Arguments are checked against each skill's schema first; if any
+        call is invalid, ``InvalidArguments`` is raised and nothing is queued.
+        """
+        calls = list(calls)
+        for _, func_call in calls:
+            name = getattr(func_call, "name", "")
+            errors = self.schema.validate(name, getattr(func_call, "arguments", {}))
+            if errors:
+                raise InvalidArguments(name, errors)
+        queued = []
+        with self._transaction() as c:
+            for worker_id, func_call in calls:
+                queued.append((self._enqueue(c, worker_id, func_call), worker_id))
+            self._after_commit(partial(self._track, queued, session_id))
+        return [task_id for task_id, _ in queued]
+
+    def _track(self, queued: List[Tuple[str, str]], session_id: str | None):
+        """Count committed tasks as in flight and wake their workers."""
+        now = time.monotonic()
+        for task_id, worker_id in queued:
+            self._inflight[task_id] = (worker_id, now, session_id)
+            self.outstanding[worker_id] = self.outstanding.get(worker_id, 0) + 1
+        for worker_id in dict.fromkeys(w for _, w in queued):
+            self.router.observe(worker_id, self)
+            self._notify(worker_id)
+
+    def _enqueue(self, c: sqlite3.Cursor, worker_id: str, func_call: Any) -> str:
         task_id = secrets.token_hex(8)
+        function = {
+            "name": getattr(func_call, "name", ""),
+            "arguments": getattr(func_call, "arguments", {}),
+        }
         self._audit(
             'enqueue',
             {
                 'task_id': task_id,
                 'worker_id': worker_id,
-                'function': getattr(func_call, 'name', ''),
-                'arguments': getattr(func_call, 'arguments', {}),
+                'function': function['name'],
+                'arguments': function['arguments'],
             },
         )
-        c = self.conn.cursor()
         c.execute(
             "INSERT INTO queue (id, worker_id, status, payload) VALUES (?,?,?,?)",
-            (
-                task_id,
-                worker_id,
-                "pending",
-                json.dumps({
-                    "name": getattr(func_call, "name", ""),
-                    "arguments": getattr(func_call, "arguments", {})
-                }),
-            ),
+            (task_id, worker_id, "pending", json.dumps(function)),
         )
-        self.conn.commit()
-        # also store in memory for quick retrieval
-        task_obj = {
-            "id": task_id,
-            "function": {
-                "name": getattr(func_call, "name", ""),
-                "arguments": getattr(func_call, "arguments", {})
-            }
-        }
-        self._memory_queue.setdefault(worker_id, []).append(task_obj)
         return task_id
 
-    def fetch_tasks(self, worker_id: str) -> List[Dict[str, Any]]:
-        tasks = self._memory_queue.pop(worker_id, [])
-        mem_ids = [t["id"] for t in tasks]
+    def _notify(self, worker_id: str):
+        with self._wake_lock:
+            self._task_seq[worker_id] = self._task_seq.get(worker_id, 0) + 1
+            waiters = self._waiters.pop(worker_id, ())
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_resolve, fut)
 
-        if mem_ids:
-            placeholders = ",".join("?" for _ in mem_ids)
-            c = self.conn.cursor()
+    def task_seq(self, worker_id: str) -> int:
+        """Return the enqueue counter for ``worker_id``.
+
+        Read it *before* ``fetch_tasks`` and hand it to ``wait_for_tasks`` so a
+        task enqueued between the two calls is never missed.
+        """
+        with self._wake_lock:
+            return self._task_seq.get(worker_id, 0)
+
+    async def wait_for_tasks(self, worker_id: str, seq: int, timeout: float) -> bool:
+        """Wait until a task is enqueued for ``worker_id`` after ``seq``.
+
+        Returns ``False`` if ``timeout`` seconds pass without new work. The wait
+        happens on the event loop so idle long-polls do not hold a thread.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._wake_lock:
+            if self._task_seq.get(worker_id, 0) != seq:
+                return True
+            self._waiters.setdefault(worker_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._wake_lock:
+                self._waiters.get(worker_id, set()).discard(waiter)
+
+    def fetch_tasks(
+        self,
+        worker_id: str,
+        max_tasks: int | None = None,
+        lease: float | None = None,
+        held: Iterable[str] = (),
+    ) -> List[Dict[str, Any]]:
+        """Atomically claim up to ``max_tasks`` tasks queued for ``worker_id``.
+
+        Claimed rows become ``sent`` with a lease of ``lease`` seconds (default
+        ``lease_seconds``). Each fetch is a heartbeat that renews the leases
+        of the ``held`` tasks the worker still has (see ``renew_leases``); a
+        task whose lease runs out before ``complete`` is claimable again, so
+        work held by a dead worker, or lost on the way, is not lost for good.
+        """
+        now = time.time()
+        lease = self.lease_seconds if lease is None else lease
+        self.touch(worker_id, held)
+        with self._transaction() as c:
             c.execute(
-                f"UPDATE queue SET status='sent' WHERE id IN ({placeholders})",
-                mem_ids,
+                """
+            UPDATE queue SET status='sent', lease_expires=?
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT rowid AS r, id FROM queue
+                    WHERE worker_id=? AND status='pending'
+                    UNION ALL
+                    SELECT rowid, id FROM queue
+                    WHERE worker_id=? AND status='sent' AND lease_expires<?
+                )
+                ORDER BY r LIMIT ?
+            )
+            RETURNING rowid, id, payload""",
+                (
+                    now + lease,
+                    worker_id,
+                    worker_id,
+                    now,
+                    -1 if max_tasks is None else max_tasks,
+                ),
             )
-            self.conn.commit()
+            rows = sorted(c.fetchall())
+        return [{"id": tid, "function": json.loads(payload)} for _, tid, payload in rows]
 
-        c = self.conn.cursor()
-        c.execute(
-            "SELECT id, payload FROM queue WHERE worker_id=? AND status='pending'",
-            (worker_id,),
-        )
-        rows = c.fetchall()
-        db_ids = []
-        for tid, payload in rows:
-            db_ids.append(tid)
-            tasks.append({"id": tid, "function": json.loads(payload)})
-        if db_ids:
-            placeholders = ",".join("?" for _ in db_ids)
+    def fetch_within(self, worker_id: str, capacity: int) -> List[Dict[str, Any]]:
+        """``fetch_tasks`` that leaves ``worker_id`` holding at most ``capacity``
+        unexpired leases, for push streams that cannot say how many slots are free."""
+        with self._transaction() as c:
             c.execute(
-                f"UPDATE queue SET status='sent' WHERE id IN ({placeholders})",
-                db_ids,
+                "SELECT COUNT(*) FROM queue WHERE worker_id=? AND status='sent' AND lease_expires>=?",
+                (worker_id, time.time()),
             )
-            self.conn.commit()
+            leased = c.fetchone()[0]
+            return self.fetch_tasks(worker_id, max(capacity - leased, 0))
 
-        return tasks
+    def requeue_expired(self) -> int:
+        """Return tasks with lapsed leases to ``pending`` and wake their workers."""
+        with self._transaction() as c:
+            c.execute(
+                "UPDATE queue SET status='pending', lease_expires=NULL "
+                "WHERE status='sent' AND lease_expires<? RETURNING worker_id",
+                (time.time(),),
+            )
+            rows = c.fetchall()
+            for wid in {row[0] for row in rows}:
+                self._after_commit(partial(self._notify, wid))
+        return len(rows)
 
     def complete(self, task_id: str, result: Any):
-        self._audit('complete', {'task_id': task_id, 'result': result})
-        self.history.append(
-            ChatMessage(role='function', content=json.dumps({'task_id': task_id, 'result': result}))
+        self.complete_many([(task_id, result)])
+
+    def complete_many(self, results: Iterable[Tuple[str, Any]]):
+        """Record ``(task_id, result)`` pairs under a single commit."""
+        results = list(results)
+        with self._transaction() as c:
+            for task_id, result in results:
+                self._audit('complete', {'task_id': task_id, 'result': result})
+            c.executemany(
+                "UPDATE queue SET status='done', lease_expires=NULL WHERE id=?",
+                [(task_id,) for task_id, _ in results],
+            )
+            self._after_commit(partial(self._finish_many, results))
+
+    def _finish_many(self, results: List[Tuple[str, Any]]):
+        finished = [(self._inflight.pop(task_id, None), task_id, result) for task_id, result in results]
+        now = time.monotonic()
+        for info, _, _ in finished:
+            if info:
+                self._record_finish(info[0], now - info[1])
+        # a worker uploading results is alive even if it is too busy to poll,
+        # and has free slots again (wakes a capacity-limited task stream)
+        for wid in {info[0] for info, _, _ in finished if info}:
+            self.touch(wid)
+            self._notify(wid)
+        for info, task_id, result in finished:
+            self.sessions.get(info[2] if info else None).append(
+                ChatMessage(role='function', content=json.dumps({'task_id': task_id, 'result': result}))
+            )
+
+    def _record_finish(self, worker_id: str, elapsed: float):
+        self.outstanding[worker_id] = max(self.outstanding.get(worker_id, 0) - 1, 0)
+        prev = self.latency.get(worker_id)
+        self.latency[worker_id] = (
+            elapsed if prev is None else prev + LATENCY_ALPHA * (elapsed - prev)
         )
-        self.history = self.history[-20:]
+        self.router.observe(worker_id, self)
 
     def snapshot(self) -> Dict[str, Any]:
         return {
             'workers': list(self.workers.values()),
             'skills': list(self.skills.keys()),
+            'schema_version': self.schema.version,
+            'sessions': len(self.sessions),
+            'live_workers': len(self.workers),
+            'dead_workers': len(self.dead_workers),
             'bearer_token': self.bearer_token,
             'layer': 'L-3',
         }
 
 
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(True)
+
+
 # Test cases for planning and shared modules
 if __name__ == '__main__':
     print('Testing shared.protocol.make_skill_schema...')
@@ -1,8 +1,13 @@
 import os
 import json
 import toml
+import time
 import base64
+import signal
 import hashlib
+import threading
+from functools import lru_cache
+from pathlib import Path
 from cryptography.fernet import Fernet
 
 CONFIG_PATH = os.path.expanduser("~/.config/jarvis_agent/config.toml")
@@ -14,13 +19,77 @@ def load_config():
 
 config = load_config()
 
-def aes_encrypt(data: bytes, passphrase: str) -> bytes:
+@lru_cache(maxsize=8)
+def fernet_for(passphrase: str) -> Fernet:
+    """Return the (cached) Fernet cipher derived from ``passphrase``."""
     key = hashlib.sha256(passphrase.encode()).digest()
-    return Fernet(base64.urlsafe_b64encode(key)).encrypt(data)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+def aes_encrypt(data: bytes, passphrase: str) -> bytes:
+    return fernet_for(passphrase).encrypt(data)
 
 def aes_decrypt(token: bytes, passphrase: str) -> bytes:
-    key = hashlib.sha256(passphrase.encode()).digest()
-    return Fernet(base64.urlsafe_b64encode(key)).decrypt(token)
+    return fernet_for(passphrase).decrypt(token)
+
+
+class SecretsFile:
+    """A TOML secrets file parsed once and re-read only when it changes.
+
+    The file's mtime/size is checked at most every ``check_interval`` seconds;
+    ``invalidate`` (wired to SIGHUP by ``reload_on_sighup``) forces a re-read
+    on the next access.
+    """
+
+    def __init__(self, path, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._data: dict = {}
+        self._stamp = None
+        self._checked = None
+
+    def get(self, key: str, default=None):
+        return self.data().get(key, default)
+
+    def data(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked is None or now - self._checked >= self.check_interval:
+                self._checked = now
+                try:
+                    st = self.path.stat()
+                    stamp = (st.st_mtime_ns, st.st_size)
+                except FileNotFoundError:
+                    stamp = None
+                if stamp != self._stamp:
+                    self._stamp = stamp
+                    self._data = toml.loads(self.path.read_text()) if stamp else {}
+            return self._data
+
+    def invalidate(self):
+        with self._lock:
+            self._checked = None
+            self._stamp = ()
+
+
+def reload_on_sighup(*files: SecretsFile) -> bool:
+    """Invalidate ``files`` whenever the process receives SIGHUP.
+
+    Returns ``False`` where that is not possible (no SIGHUP on Windows, or
+    not called from the main thread).
+    """
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    previous = signal.getsignal(signal.SIGHUP)
+
+    def handler(signum, frame):
+        for f in files:
+            f.invalidate()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGHUP, handler)
+    return True
 
 def get_llm():
     if config.get('use_local_model'):
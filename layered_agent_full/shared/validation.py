@@ -0,0 +1,110 @@
+"""Argument validation against skill parameter schemas.
+
+Only the JSON Schema subset that worker manifests produce is understood:
+``type`` (a name or a list of names), ``properties``, ``required``,
+``additionalProperties: false`` and array ``items``. Other keywords are
+ignored, so an unfamiliar schema errs on the side of accepting a call.
+A schema is compiled once into a tree of closures, so checking a call
+does no schema interpretation.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+
+# ``check(value, path)`` returns a list of error messages, empty if valid.
+Check = Callable[[Any, str], List[str]]
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+
+class InvalidArguments(ValueError):
+    """A function call's arguments do not match the skill's schema."""
+
+    def __init__(self, name: str, errors: List[str]):
+        super().__init__(f"invalid arguments for {name}: " + "; ".join(errors))
+        self.name = name
+        self.errors = errors
+
+
+def _accept(value: Any, path: str) -> List[str]:
+    return []
+
+
+def compile_schema(schema: Dict[str, Any]) -> Check:
+    """Compile ``schema`` into a ``check(value, path)`` function."""
+    if not isinstance(schema, dict):
+        return _accept
+    checks: List[Check] = []
+
+    types = schema.get("type")
+    if isinstance(types, str):
+        types = [types]
+    tests = [_TYPES[t] for t in types or () if t in _TYPES]
+    if tests and len(tests) == len(types):
+        expected = " or ".join(types)
+
+        def check_type(value, path):
+            if any(t(value) for t in tests):
+                return []
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+        checks.append(check_type)
+
+    props = schema.get("properties")
+    if isinstance(props, dict):
+        fields = {k: compile_schema(v) for k, v in props.items()}
+        required = [k for k in schema.get("required", ()) if isinstance(k, str)]
+        closed = schema.get("additionalProperties") is False
+
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return []
+            errors = [f"{path}: missing required argument {k!r}" for k in required if k not in value]
+            for k, v in value.items():
+                check = fields.get(k)
+                if check is not None:
+                    errors += check(v, f"{path}.{k}")
+                elif closed:
+                    errors.append(f"{path}: unexpected argument {k!r}")
+            return errors
+        checks.append(check_object)
+
+    items = schema.get("items")
+    if isinstance(items, dict):
+        check_item = compile_schema(items)
+
+        def check_array(value, path):
+            if not isinstance(value, list):
+                return []
+            errors: List[str] = []
+            for i, v in enumerate(value):
+                errors += check_item(v, f"{path}[{i}]")
+            return errors
+        checks.append(check_array)
+
+    if not checks:
+        return _accept
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path):
+        errors: List[str] = []
+        for check in checks:
+            errors += check(value, path)
+            if errors:
+                break  # a type mismatch makes the rest meaningless
+        return errors
+    return check_all
+
+
+def compile_validator(schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], List[str]]:
+    """Return ``validate(arguments) -> errors`` for a skill's parameters schema."""
+    check = compile_schema(schema)
+    return lambda arguments: check(arguments, "arguments")
@@ -0,0 +1,122 @@
+"""HTTP client the worker uses to talk to the commander."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import random
+import socket
+from typing import Any, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# Request bodies at least this large are sent gzip-compressed.
+GZIP_MIN_BYTES = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _keepalive_options() -> List[tuple]:
+    """TCP keep-alive probes so idle long-polls survive NAT/proxy timeouts."""
+    opts = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            opts.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return opts
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + _keepalive_options()
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Backoff:
+    """Exponential backoff with full jitter.
+
+    The n-th consecutive ``next()`` returns a delay drawn uniformly from
+    ``[0, min(cap, base * 2**n)]``, so workers that failed together do not
+    retry together. ``reset()`` after a success starts over.
+    """
+
+    def __init__(self, base: float = 1.0, cap: float = 60.0, rng: random.Random | None = None):
+        self.base = base
+        self.cap = cap
+        self.failures = 0
+        self._rng = rng or random.Random()
+
+    def next(self) -> float:
+        ceiling = min(self.cap, self.base * 2 ** min(self.failures, 32))
+        self.failures += 1
+        return self._rng.uniform(0, ceiling)
+
+    def reset(self):
+        self.failures = 0
+
+
+class WorkerClient:
+    """Commander API over one pooled, keep-alive :class:`requests.Session`.
+
+    Connections are reused across polls and result uploads instead of
+    being opened per request; ``pool_size`` should cover the requests that
+    can be in flight at once (a poll or stream plus result uploads). JSON
+    bodies of ``gzip_min`` bytes or more are sent gzip-compressed.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        token: str,
+        pool_size: int = 4,
+        timeout: float = 15,
+        gzip_min: int | None = GZIP_MIN_BYTES,
+    ):
+        self.server = server.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.gzip_min = gzip_min
+        self.session = requests.Session()
+        adapter = _KeepAliveAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: str) -> str:
+        return f"{self.server}{path}"
+
+    def post_json(self, path: str, obj: Any, auth: bool = True, **kwargs) -> requests.Response:
+        body = json.dumps(obj).encode()
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers["Authorization"] = self.token
+        if self.gzip_min is not None and len(body) >= self.gzip_min:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(self.url(path), data=body, headers=headers, **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(self.url(path), headers={"Authorization": self.token}, **kwargs)
+
+    def register(self, info: Dict[str, Any]) -> str | None:
+        r = self.post_json("/register", {"token": self.token, **info}, auth=False)
+        r.raise_for_status()
+        return r.json().get("worker_id")
+
+    def send_results(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upload a batch; return the entries the commander could not store.
+
+        Raises :class:`requests.HTTPError` if the batch as a whole is refused.
+        """
+        r = self.post_json("/results", {"results": items})
+        r.raise_for_status()
+        errors = r.json().get("errors", [])
+        for e in errors:
+            logger.error("commander rejected result %s: %s", items[e["index"]].get("task_id"), e["error"])
+        return errors
+
+    def close(self):
+        self.session.close()
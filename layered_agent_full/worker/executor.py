@@ -0,0 +1,147 @@
+"""Bounded concurrent execution of worker skills."""
+
+from __future__ import annotations
+
+import importlib.util
+import inspect
+import logging
+import os
+import threading
+import traceback
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from types import ModuleType
+from typing import Any, Callable, Deque, Dict, Mapping, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ``done(task, status, result)`` is called once per submitted task.
+DoneCallback = Callable[[Dict[str, Any], str, Any], None]
+
+
+# Skill modules loaded in a pool process: path -> ((mtime_ns, size), module).
+# They stay out of ``sys.modules`` because a plugin's module name is its bare
+# file stem, and one called e.g. ``json.py`` must not replace the real module.
+_process_modules: Dict[str, Tuple[Tuple[int, int], ModuleType]] = {}
+
+
+def _call_in_process(path: str, module: str, name: str, kwargs: Dict[str, Any]) -> Any:
+    """Import ``name`` from the skill file at ``path`` in a pool process and call it.
+
+    The module is loaded once per process and again only if the file changes.
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _process_modules.get(path)
+    if cached is None or cached[0] != stamp:
+        spec = importlib.util.spec_from_file_location(module, path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        cached = _process_modules[path] = (stamp, mod)
+    return getattr(cached[1], name)(**kwargs)
+
+
+class SkillPool:
+    """Run skills on a thread pool, or a process pool for CPU-bound skills.
+
+    At most ``max_workers`` tasks are in flight. A skill declared with
+    ``@skill(concurrency=N)`` (or listed in ``limits``) runs at most ``N`` calls
+    at once; extra calls wait in a per-skill backlog without holding a thread.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_processes: int | None = None,
+        limits: Mapping[str, int] | None = None,
+    ):
+        self.max_workers = max_workers
+        self.max_processes = max_processes
+        self.limits: Dict[str, int] = dict(limits or {})
+        self._threads = ThreadPoolExecutor(max_workers, thread_name_prefix="skill")
+        self._processes: ProcessPoolExecutor | None = None
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._running: Dict[str, int] = defaultdict(int)
+        self._backlog: Dict[str, Deque[tuple]] = defaultdict(deque)
+
+    def free_slots(self) -> int:
+        with self._cond:
+            return self.max_workers - self._in_flight
+
+    def wait_for_slot(self, timeout: float | None = None) -> int:
+        """Block until at least one slot is free and return the free count."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_flight < self.max_workers, timeout)
+            return self.max_workers - self._in_flight
+
+    def submit(self, task: Dict[str, Any], skills: Mapping[str, Callable], done: DoneCallback):
+        """Schedule ``task`` and report its outcome through ``done``."""
+        name = task["function"]["name"]
+        fn = skills.get(name)
+        job = (task, fn, done)
+        with self._cond:
+            self._in_flight += 1
+            if self._running[name] >= self._limit(name, fn):
+                self._backlog[name].append(job)
+                return
+            self._running[name] += 1
+        self._start(job)
+
+    def shutdown(self, wait: bool = True):
+        self._threads.shutdown(wait=wait)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait)
+
+    def _limit(self, name: str, fn: Callable | None) -> int:
+        limit = self.limits.get(name) or getattr(fn, "_skill_concurrency", None)
+        return limit or self.max_workers
+
+    def _start(self, job: tuple):
+        task, fn, _ = job
+        kw = task["function"].get("arguments") or {}
+        try:
+            if fn is None:
+                raise KeyError(f"unknown skill {task['function']['name']!r}")
+            if getattr(fn, "_skill_executor", "thread") == "process":
+                fut = self._process_pool().submit(
+                    _call_in_process,
+                    getattr(fn, "_skill_path", None) or inspect.getsourcefile(fn),
+                    fn.__module__,
+                    fn.__name__,
+                    kw,
+                )
+            else:
+                fut = self._threads.submit(fn, **kw)
+        except Exception as e:
+            fut = Future()
+            fut.set_exception(e)
+        fut.add_done_callback(lambda f: self._finish(job, f))
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._cond:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(self.max_processes)
+            return self._processes
+
+    def _finish(self, job: tuple, fut: Future):
+        task, fn, done = job
+        exc = fut.exception()
+        if exc is None:
+            status, result = "success", fut.result()
+        else:
+            trace = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+            status, result = "error", {"trace": trace}
+        try:
+            done(task, status, result)
+        except Exception:
+            logger.exception("result callback failed for task %s", task.get("id"))
+        name = task["function"]["name"]
+        with self._cond:
+            self._in_flight -= 1
+            nxt = self._backlog[name].popleft() if self._backlog[name] else None
+            if nxt is None:
+                self._running[name] -= 1
+            self._cond.notify_all()
+        if nxt is not None:
+            self._start(nxt)
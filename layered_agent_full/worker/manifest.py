@@ -0,0 +1,368 @@
+"""Static skill manifest: find ``@skill`` functions without importing them.
+
+Skill modules are parsed with :mod:`ast` to get each skill's name,
+docstring, ``@skill(...)`` options and a JSON schema derived from its
+signature. The result is persisted per file (keyed by ``mtime_ns`` and
+size) so an unchanged skill directory is not even re-parsed. The module
+itself is imported only when one of its skills is first called, so
+optional heavy dependencies stay unloaded until they are needed.
+
+Only literal decorator arguments are understood, and functions marked
+as skills some other way (e.g. by setting ``_is_skill`` by hand) are
+not seen.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import tempfile
+import threading
+import types
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Tuple, Union, get_args, get_origin, get_type_hints
+
+from layered_agent_full.plugin_manager import source_stats
+
+logger = logging.getLogger(__name__)
+
+# ``X | Y`` at runtime (Python 3.10+).
+_UNION_TYPES = tuple(t for t in (Union, getattr(types, "UnionType", None)) if t is not None)
+
+# Bump when the shape of a cached entry changes.
+INDEX_VERSION = 2
+
+_JSON_TYPES = {
+    "str": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+    "list": "array",
+    "List": "array",
+    "Sequence": "array",
+    "tuple": "array",
+    "Tuple": "array",
+    "dict": "object",
+    "Dict": "object",
+    "Mapping": "object",
+}
+
+
+def _name(node: ast.AST) -> str | None:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _is_none(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and node.value is None
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    if "type" in schema:
+        schema["type"] = [schema["type"], "null"]
+    return schema
+
+
+def annotation_schema(node: ast.AST | None) -> Dict[str, Any]:
+    """JSON schema for a parameter annotation; ``{}`` if it is not understood."""
+    if node is None:
+        return {}
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        try:
+            node = ast.parse(node.value, mode="eval").body
+        except SyntaxError:
+            return {}
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        # ``X | None``
+        if _is_none(node.right):
+            return _nullable(annotation_schema(node.left))
+        if _is_none(node.left):
+            return _nullable(annotation_schema(node.right))
+        return {}
+    if isinstance(node, ast.Subscript):
+        base = _name(node.value)
+        if base == "Optional":
+            return _nullable(annotation_schema(node.slice))
+        schema = {"type": _JSON_TYPES[base]} if base in _JSON_TYPES else {}
+        if schema.get("type") == "array" and base in ("list", "List", "Sequence"):
+            items = annotation_schema(node.slice)
+            if items:
+                schema["items"] = items
+        return schema
+    base = _name(node)
+    return {"type": _JSON_TYPES[base]} if base in _JSON_TYPES else {}
+
+
+def parameters_schema(args: ast.arguments) -> Dict[str, Any]:
+    """Object schema for a function's named parameters.
+
+    Parameters without a default are required; literal defaults are
+    recorded. ``*args`` is ignored; without ``**kwargs`` other argument
+    names are rejected.
+    """
+    positional = args.posonlyargs + args.args
+    defaults: List[ast.AST | None] = [None] * (len(positional) - len(args.defaults))
+    defaults += args.defaults
+    params = list(zip(positional, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults))
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    for arg, default in params:
+        prop = annotation_schema(arg.annotation)
+        if default is None:
+            required.append(arg.arg)
+        else:
+            try:
+                prop["default"] = ast.literal_eval(default)
+            except ValueError:
+                pass
+        properties[arg.arg] = prop
+    schema: Dict[str, Any] = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = required
+    if args.kwarg is None:
+        schema["additionalProperties"] = False
+    return schema
+
+
+def type_schema(tp: Any) -> Dict[str, Any]:
+    """Like :func:`annotation_schema` but for an evaluated type hint."""
+    origin = get_origin(tp)
+    if origin in _UNION_TYPES:
+        args = [a for a in get_args(tp) if a is not type(None)]
+        if len(args) == 1 and len(args) < len(get_args(tp)):
+            return _nullable(type_schema(args[0]))
+        return {}
+    base = getattr(origin or tp, "__name__", None)
+    schema = {"type": _JSON_TYPES[base]} if base in _JSON_TYPES else {}
+    if schema.get("type") == "array" and origin is list and get_args(tp):
+        items = type_schema(get_args(tp)[0])
+        if items:
+            schema["items"] = items
+    return schema
+
+
+def signature_schema(fn: Callable) -> Dict[str, Any]:
+    """Parameters schema of an imported function, from its signature."""
+    try:
+        sig = inspect.signature(fn)
+    except (TypeError, ValueError):
+        return {"type": "object", "properties": {}}
+    try:
+        hints = get_type_hints(fn)
+    except Exception:
+        hints = {}
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    closed = True
+    for p in sig.parameters.values():
+        if p.kind is p.VAR_KEYWORD:
+            closed = False
+            continue
+        if p.kind is p.VAR_POSITIONAL:
+            continue
+        prop = type_schema(hints[p.name]) if p.name in hints else {}
+        if p.default is p.empty:
+            required.append(p.name)
+        elif p.default is None or isinstance(p.default, (str, int, float, bool, list, dict)):
+            prop["default"] = p.default
+        properties[p.name] = prop
+    schema: Dict[str, Any] = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = required
+    if closed:
+        schema["additionalProperties"] = False
+    return schema
+
+
+def _skill_options(fn: ast.FunctionDef | ast.AsyncFunctionDef) -> Dict[str, Any] | None:
+    """``@skill`` keyword options of ``fn``, or ``None`` if it is not a skill."""
+    for dec in fn.decorator_list:
+        if _name(dec) == "skill":
+            return {}
+        if isinstance(dec, ast.Call) and _name(dec.func) == "skill":
+            opts = {}
+            for kw in dec.keywords:
+                try:
+                    opts[kw.arg] = ast.literal_eval(kw.value)
+                except ValueError:
+                    logger.warning("non-literal @skill(%s=...) on %s ignored", kw.arg, fn.name)
+            return opts
+    return None
+
+
+def scan_source(source: str | bytes, filename: str = "<skill>") -> List[Dict[str, Any]]:
+    """Return the metadata of every top-level ``@skill`` function in ``source``."""
+    tree = ast.parse(source, filename)
+    found = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        opts = _skill_options(node)
+        if opts is None:
+            continue
+        found.append({
+            "name": node.name,
+            "description": ast.get_docstring(node) or "",
+            "parameters": parameters_schema(node.args),
+            "executor": opts.get("executor", "thread"),
+            "concurrency": opts.get("concurrency"),
+        })
+    return found
+
+
+class _SkillFile:
+    """A scanned skill module, imported on first use."""
+
+    def __init__(self, path: Path, module: str, stat: Tuple[int, int], metas: List[Dict[str, Any]]):
+        self.path = path
+        self.module_name = module
+        self.stat = stat
+        self.metas = metas
+        self._module: ModuleType | None = None
+        self._lock = threading.Lock()
+        self.skills = {m["name"]: LazySkill(self, m) for m in metas}
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        with self._lock:
+            if self._module is None:
+                logger.info("Importing skill module %s", self.path)
+                spec = importlib.util.spec_from_file_location(self.module_name, self.path)
+                mod = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(mod)
+                self._module = mod
+            return self._module
+
+
+class LazySkill:
+    """Callable stand-in for a skill whose module has not been imported yet.
+
+    Carries the attributes the worker and :class:`SkillPool` read from a
+    real skill (``__name__``, ``__doc__``, ``_skill_executor``, ...); the
+    module is imported the first time the skill is called.
+    """
+
+    _is_skill = True
+
+    def __init__(self, source: _SkillFile, meta: Dict[str, Any]):
+        self._source = source
+        self.__name__ = self.__qualname__ = meta["name"]
+        self.__doc__ = meta["description"] or None
+        self.__module__ = source.module_name
+        self._skill_path = str(source.path)
+        self._skill_executor = meta["executor"]
+        self._skill_concurrency = meta["concurrency"]
+        self.parameters = meta["parameters"]
+
+    @property
+    def loaded(self) -> bool:
+        return self._source.loaded
+
+    def resolve(self) -> Callable:
+        """Import the defining module (once) and return the real function."""
+        return getattr(self._source.load(), self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "lazy"
+        return f"<LazySkill {self.__module__}.{self.__name__} ({state})>"
+
+
+class ManifestIndex:
+    """Skills of a directory, discovered statically and cached on disk.
+
+    ``load_dir`` re-parses only files whose :func:`source_stats`
+    fingerprint differs from the cached index and keeps the :class:`LazySkill` objects (and
+    any module already imported) of unchanged files. A file that fails to
+    parse is logged and contributes no skills. ``cache_path`` may be
+    ``None`` to keep the index in memory only.
+    """
+
+    def __init__(self, cache_path: Path | None = None, package: str | None = None):
+        self.cache_path = cache_path
+        self.package = package
+        self._files: Dict[Path, _SkillFile] = {}
+        self._disk: Dict[str, Any] | None = None
+
+    def _module_name(self, path: Path) -> str:
+        return f"{self.package}.{path.stem}" if self.package else path.stem
+
+    def changed(self, directory: Path) -> bool:
+        """Cheap check (stat only) whether ``load_dir`` would re-scan anything."""
+        cached = {p: f.stat for p, f in self._files.items() if p.parent == directory}
+        return source_stats(directory) != cached
+
+    def load_dir(self, directory: Path) -> Dict[str, LazySkill]:
+        """Return lazy skills for every ``@skill`` function in ``directory``."""
+        sources = source_stats(directory)
+        for path in [p for p in self._files if p.parent == directory and p not in sources]:
+            del self._files[path]
+        disk = self._read_index()
+        dirty = False
+        skills: Dict[str, LazySkill] = {}
+        for path, stat in sources.items():
+            entry = self._files.get(path)
+            if entry is None or entry.stat != stat:
+                cached = disk.get(str(path))
+                if cached and tuple(cached["stat"]) == stat:
+                    metas = cached["skills"]
+                else:
+                    metas = self._scan(path)
+                    disk[str(path)] = {"stat": list(stat), "skills": metas}
+                    dirty = True
+                entry = _SkillFile(path, self._module_name(path), stat, metas)
+                self._files[path] = entry
+            skills.update(entry.skills)
+        for key in [k for k in disk if Path(k).parent == directory and Path(k) not in sources]:
+            del disk[key]
+            dirty = True
+        if dirty:
+            self._write_index(disk)
+        return skills
+
+    @staticmethod
+    def _scan(path: Path) -> List[Dict[str, Any]]:
+        try:
+            return scan_source(path.read_bytes(), str(path))
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.warning("Cannot scan skill module %s: %s", path, e)
+            return []
+
+    def _read_index(self) -> Dict[str, Any]:
+        if self._disk is None:
+            self._disk = {}
+            if self.cache_path is not None:
+                try:
+                    data = json.loads(self.cache_path.read_text())
+                    if data.get("version") == INDEX_VERSION:
+                        self._disk = data["files"]
+                except FileNotFoundError:
+                    pass
+                except (OSError, ValueError, KeyError, AttributeError) as e:
+                    logger.warning("Ignoring unreadable skill index %s: %s", self.cache_path, e)
+        return self._disk
+
+    def _write_index(self, files: Dict[str, Any]) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": INDEX_VERSION, "files": files}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logger.warning("Cannot write skill index %s: %s", self.cache_path, e)
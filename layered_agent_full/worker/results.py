@@ -0,0 +1,137 @@
+"""Batch task results before uploading them to the commander."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+from layered_agent_full.worker.client import Backoff
+
+logger = logging.getLogger(__name__)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether a failed upload is worth retrying.
+
+    HTTP errors (anything with ``exc.response.status_code``) are retried
+    only for 5xx and 429; other 4xx mean the commander will never accept
+    the batch. Connection and timeout errors (``OSError``) are retried.
+    """
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    return isinstance(exc, OSError)
+
+
+class ResultBuffer:
+    """Collect results and hand them to ``send`` in batches.
+
+    A batch is flushed once ``max_items`` results are waiting or the oldest
+    one has waited ``max_delay`` seconds, whichever comes first. If ``send``
+    fails with a ``retryable`` error the batch is kept and the background
+    flush waits ``backoff.next()`` seconds before retrying, so a worker does
+    not spin (or hammer a recovering commander) while uploads fail; any
+    other error moves it to ``dead_letter`` so one rejected
+    batch cannot block every later result. At most ``max_pending`` results
+    are held; beyond that the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Dict[str, Any]]], None],
+        max_items: int = 50,
+        max_delay: float = 0.5,
+        max_pending: int = 10_000,
+        retryable: Callable[[BaseException], bool] = is_transient,
+        backoff: Backoff | None = None,
+    ):
+        self.send = send
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.retryable = retryable
+        self.backoff = backoff or Backoff(base=1.0, cap=60.0)
+        self._retry_at = 0.0
+        self.dropped = 0
+        self.dead_letter: Deque[Dict[str, Any]] = deque(maxlen=max_pending)
+        self._items: List[Dict[str, Any]] = []
+        self._oldest = 0.0
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="result-flush", daemon=True)
+        self._thread.start()
+
+    def add(self, item: Dict[str, Any]):
+        with self._cond:
+            if not self._items:
+                # wake the flusher so it starts the max_delay countdown
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            self._items.append(item)
+            self._trim()
+            if len(self._items) >= self.max_items:
+                self._cond.notify()
+
+    def _trim(self):
+        excess = len(self._items) - self.max_pending
+        if excess > 0:
+            del self._items[:excess]
+            self.dropped += excess
+            logger.warning("result buffer full; dropped %d oldest results", excess)
+
+    def flush(self) -> int:
+        """Send everything buffered now; return how many results were sent."""
+        with self._send_lock:
+            with self._cond:
+                batch, self._items = self._items, []
+            if not batch:
+                return 0
+            try:
+                self.send(batch)
+            except Exception as e:
+                if not self.retryable(e):
+                    logger.error("result upload rejected (%s); dead-lettering %d results", e, len(batch))
+                    self.dead_letter.extend(batch)
+                    return 0
+                logger.warning("result upload failed (%s); keeping %d results", e, len(batch))
+                with self._cond:
+                    self._items[:0] = batch
+                    self._trim()
+                    self._oldest = time.monotonic()
+                    self._retry_at = self._oldest + self.backoff.next()
+                return 0
+            self.backoff.reset()
+            with self._cond:
+                self._retry_at = 0.0
+            return len(batch)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def _ready_at(self) -> float:
+        """Monotonic time at which the buffered results should be sent."""
+        at = 0.0 if len(self._items) >= self.max_items else self._oldest + self.max_delay
+        return max(at, self._retry_at)
+
+    def _due(self) -> bool:
+        return bool(self._items) and time.monotonic() >= self._ready_at()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    timeout = None
+                    if self._items:
+                        timeout = self._ready_at() - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            self.flush()
@@ -1,6 +1,13 @@
-def skill(fn):
-    fn._is_skill=True
-    return fn
+def skill(fn=None,*,executor="thread",concurrency=None):
+    """Mark a worker skill; use ``@skill`` or ``@skill(executor=..., concurrency=...)``.
+
+    ``executor`` is ``"thread"`` for I/O-bound skills or ``"process"`` for
+    CPU-bound ones; ``concurrency`` caps simultaneous calls of the skill.
+    """
+    def mark(f):
+        f._is_skill=True;f._skill_executor=executor;f._skill_concurrency=concurrency
+        return f
+    return mark(fn) if fn is not None else mark
 
 @skill
 def run_shell(command:str,timeout:int=120):
@@ -1,7 +1,7 @@
 from .core import skill
 import base64
 
-@skill
+@skill(concurrency=1)
 def capture_image(camera_index: int = 0):
     """Capture a single image from the default camera."""
     try:
@@ -18,7 +18,7 @@ def capture_image(camera_index: int = 0):
     except Exception as e:
         return {"error": str(e)}
 
-@skill
+@skill(concurrency=1)
 def record_audio(duration: int = 3, sample_rate: int = 44100):
     """Record audio from the microphone."""
     try:
@@ -1,45 +1,39 @@
 #!/usr/bin/env python3
-import argparse,importlib.util,inspect,sys,platform,time,traceback,base64,hashlib,json,requests,os,logging
+import argparse,sys,platform,time,json,os,logging,threading
 from pathlib import Path
 from layered_agent_full.plugin_manager import PluginManager
+from layered_agent_full.shared.utils import fernet_for
+from layered_agent_full.worker.client import Backoff,WorkerClient
+from layered_agent_full.worker.executor import SkillPool
+from layered_agent_full.worker.manifest import ManifestIndex,signature_schema
+from layered_agent_full.worker.results import ResultBuffer
 # logging
 L=Path.home()/".agent"/"logs";L.mkdir(parents=True,exist_ok=True)
 logging.basicConfig(filename=L/"worker.log",level=logging.INFO,format="%(asctime)s %(levelname)s %(message)s")
 # helpers
+SKILLS_DIR=Path(__file__).parent/"skills"
+SKILL_INDEX=ManifestIndex(Path.home()/".agent"/"cache"/"skills.json","layered_agent_full.worker.skills")
 def discover():
-    sk={}
-    for f in (Path(__file__).parent/"skills").glob("*.py"):
-6vfos9-codex/run-all-code-from-the-repo
-=======
-c6btom-codex/run-all-code-from-the-repo
-=======
-w55z61-codex/run-all-code-from-the-repo
-main
-main
-        if f.stem=="__init__":continue
-        spec=importlib.util.spec_from_file_location(f.stem,f);m=importlib.util.module_from_spec(spec);spec.loader.exec_module(m)
-=======
-        if f.stem=="__init__":
-            continue
-        spec=importlib.util.spec_from_file_location(
-            "layered_agent_full.worker.skills." + f.stem,
-            f,
-        )
-        m=importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(m)
-main
-        for n,fn in inspect.getmembers(m,inspect.isfunction):
-            if getattr(fn,"_is_skill",False): sk[n]=fn
-    return sk
+    """Built-in skills as lazy proxies; a module is imported on its first call."""
+    return SKILL_INDEX.load_dir(SKILLS_DIR)
 def manifest(sk):
-    return [{"name":n,"description":fn.__doc__ or "","parameters":{}} for n,fn in sk.items()]
+    """Registration entries; lazy skills carry their schema, plugins are inspected."""
+    return [{"name":n,"description":fn.__doc__ or "","parameters":getattr(fn,"parameters",None) or signature_schema(fn)} for n,fn in sk.items()]
 def encrypt(o,p):
     r=json.dumps(o).encode()
     if not p:
         return r.decode()
-    key=hashlib.sha256(p.encode()).digest()
-    from cryptography.fernet import Fernet
-    return Fernet(base64.urlsafe_b64encode(key)).encrypt(r).decode()
+    return fernet_for(p).encrypt(r).decode()
+def parse_limits(items):
+    """Turn ``["name=N", ...]`` from ``--skill-concurrency`` into a dict."""
+    return {n:int(v) for n,v in (i.split("=",1) for i in items or [])}
+def iter_sse(resp):
+    """Yield task batches from a ``text/event-stream`` response."""
+    data=[]
+    for line in resp.iter_lines(decode_unicode=True):
+        if line.startswith("data:"):data.append(line[5:].strip())
+        elif not line and data:
+            yield json.loads("\n".join(data)).get("tasks",[]);data=[]
 
 # plugin support
 PM=PluginManager()
@@ -52,24 +46,83 @@ def refresh_skills(pm:PluginManager=PM):
     base.update(pm.discover_plugins())
     skills=base
     return skills
+def skills_changed(pm:PluginManager=PM):
+    """Stat-only check for added, removed or edited skill files."""
+    return SKILL_INDEX.changed(SKILLS_DIR) or pm.plugins_changed()
+def watch_skills(interval,on_change,pm:PluginManager=PM,stop=None):
+    """Poll skill directories every ``interval`` s; hot-reload on change."""
+    stop=stop or threading.Event()
+    while not stop.wait(interval):
+        try:
+            if skills_changed(pm):on_change(refresh_skills(pm))
+        except Exception:logging.exception("skill reload failed")
 
 # main
-parser=argparse.ArgumentParser();parser.add_argument("--server",required=True);parser.add_argument("--layer",required=True,choices=["L-2","L-3"]);parser.add_argument("--token",required=True);args=parser.parse_args()
+# POLL_WAIT: seconds the commander may hold a long-poll open; SSE_IDLE: read
+# timeout for the push stream (must exceed the server keep-alive interval).
+POLL_WAIT=30;SSE_IDLE=45
+# HEARTBEAT: seconds between lease-renewing heartbeats in --stream mode
+# (keep well below the commander's lease and worker TTL).
+HEARTBEAT=30
+parser=argparse.ArgumentParser();parser.add_argument("--server",required=True);parser.add_argument("--layer",required=True,choices=["L-2","L-3"]);parser.add_argument("--token",required=True)
+parser.add_argument("--stream",action="store_true",help="receive tasks over the SSE push channel instead of long-polling")
+parser.add_argument("--concurrency",type=int,default=4,help="max tasks running at once")
+parser.add_argument("--processes",type=int,default=None,help="size of the process pool for CPU-bound skills")
+parser.add_argument("--skill-concurrency",action="append",metavar="NAME=N",help="cap concurrent calls of one skill")
+parser.add_argument("--result-batch",type=int,default=50,help="upload results once this many are buffered")
+parser.add_argument("--result-delay",type=float,default=0.5,help="max seconds a result waits in the buffer")
+parser.add_argument("--watch-plugins",type=float,default=0,metavar="SECONDS",help="poll skill/plugin files and hot-reload them (0 = off)")
+args=parser.parse_args()
+client=WorkerClient(args.server,args.token,pool_size=4)
 skills=refresh_skills();man=manifest(skills)
+pool=SkillPool(args.concurrency,args.processes,parse_limits(args.skill_concurrency))
 # register
-try:
-    r=requests.post(f"{args.server}/register",json={"token":args.token,"os":platform.system().lower(),"layer":args.layer,"skills":man},timeout=15)
-    r.raise_for_status();wid=r.json().get("worker_id");print("Registered",wid)
+def register(wid=None):
+    """Register (or, after being reaped by the commander, re-register) this worker."""
+    return client.register({"worker_id":wid,"os":platform.system().lower(),"layer":args.layer,"skills":man})
+try:wid=register();print("Registered",wid)
 except Exception as e:sys.exit(f"Reg failed: {e}")
-# poll
+def reload_skills(sk):
+    """Advertise a reloaded skill set to the commander."""
+    global man
+    man=manifest(sk);register(wid);logging.info("skills reloaded: %s",sorted(sk))
+if args.watch_plugins>0:threading.Thread(target=watch_skills,args=(args.watch_plugins,reload_skills),daemon=True).start()
+results=ResultBuffer(client.send_results,args.result_batch,args.result_delay)
+# ids of claimed tasks without a result yet; each poll reports them so the
+# commander renews exactly those leases and re-delivers anything else
+held=set()
+def post_result(t,st,res):
+    tid=t["id"];held.discard(tid)
+    results.add({"task_id":tid,"payload":encrypt({"worker_id":wid,"task_id":tid,"status":st,"result":res},os.getenv("VAULT_PASSPHRASE"))})
+def heartbeat():
+    """--stream mode: the SSE channel is one-way, so renew leases with a max_tasks=0 poll."""
+    while True:
+        time.sleep(HEARTBEAT)
+        try:client.get(f"/task/{wid}",params={"max_tasks":0,"held":sorted(held)})
+        except Exception:logging.exception("heartbeat failed")
+if args.stream:threading.Thread(target=heartbeat,daemon=True).start()
+def batches():
+    if args.stream:
+        # capacity: the commander pushes no more tasks than --concurrency at a time
+        with client.get(f"/task/{wid}/stream",params={"capacity":args.concurrency},stream=True,timeout=(15,SSE_IDLE)) as resp:
+            if resp.status_code==404:register(wid);return
+            resp.raise_for_status();yield from iter_sse(resp)
+    else:
+        # only claim as many tasks as there are free slots; while every slot is
+        # busy keep polling with max_tasks=0 as a heartbeat so the commander
+        # neither reaps this worker nor re-leases the tasks it is running
+        free=pool.wait_for_slot(timeout=POLL_WAIT)
+        resp=client.get(f"/task/{wid}",params={"wait":POLL_WAIT if free else 0,"max_tasks":free,"held":sorted(held)},timeout=POLL_WAIT+15)
+        if resp.status_code==204:return
+        if resp.status_code==404:register(wid);return
+        resp.raise_for_status();yield resp.json()["tasks"]
+# poll; after errors back off exponentially (with jitter, so a fleet of
+# workers does not hit a recovering commander in lockstep)
+backoff=Backoff(base=1.0,cap=60.0)
 while True:
     try:
-        h={"Authorization":args.token}
-        resp=requests.get(f"{args.server}/task/{wid}",headers=h,timeout=15)
-        if resp.status_code==204: time.sleep(10);continue
-        resp.raise_for_status();t=resp.json();tid=t["id"];fn=t["function"]["name"];kw=t["function"]["arguments"]
-        try:res=skills[fn](**kw);st="success"
-        except Exception:res={"trace":traceback.format_exc()};st="error"
-        body={"payload":encrypt({"worker_id":wid,"task_id":tid,"status":st,"result":res},os.getenv("VAULT_PASSPHRASE"))}
-        r2=requests.post(f"{args.server}/result/{tid}",json=body,headers=h,timeout=15);r2.raise_for_status()
-    except Exception as e:logging.exception("poll err");time.sleep(15)
+        for batch in batches():
+            for t in batch:held.add(t["id"]);pool.submit(t,skills,post_result)
+        backoff.reset()
+    except Exception as e:
+        delay=backoff.next();logging.exception("poll err; retrying in %.1fs",delay);time.sleep(delay)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Content-addressed, on-disk cache of LLM responses.
+
+    Entries are keyed by a sha256 of the model, system message and prompt
+    and stored in SQLite (WAL mode), so they survive restarts. An entry
+    older than ``ttl`` seconds is a miss; once more than ``max_entries``
+    are stored the least recently used ones are evicted. ``hits`` and
+    ``misses`` count lookups made through this instance. Storage errors
+    are logged and treated as misses so a broken cache never blocks a
+    query.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    used REAL NOT NULL
+                )
+                """
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_used "
+                "ON responses(used)"
+            )
+            db.commit()
+            self._db = db
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"LLM cache disabled: {e}")
+
+    @staticmethod
+    def key(model: str, system: str, prompt: str) -> str:
+        blob = json.dumps([model, system, prompt], ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, system: str, prompt: str) -> Optional[str]:
+        key = self.key(model, system, prompt)
+        now = self._clock()
+        with self._lock:
+            value = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM responses WHERE key=?",
+                        (key,),
+                    ).fetchone()
+                    if row and now - row[1] < self.ttl:
+                        value = row[0]
+                        self._db.execute(
+                            "UPDATE responses SET used=? WHERE key=?",
+                            (now, key),
+                        )
+                    elif row:
+                        self._db.execute(
+                            "DELETE FROM responses WHERE key=?", (key,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM cache read failed: {e}")
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, model: str, system: str, prompt: str, value: str) -> None:
+        key = self.key(model, system, prompt)
+        now = self._clock()
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE created <= ?",
+                    (now - self.ttl,),
+                )
+                self._db.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses
+                        ORDER BY used DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is None:
+                return 0
+            return self._db.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
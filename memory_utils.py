@@ -1,31 +1,134 @@
 import json
+import logging
+import os
+from collections import deque
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, TextIO
+
+logger = logging.getLogger(__name__)
 
 
 class ConversationMemory:
-    """Simple JSON-based persistent memory for chat history."""
+    """Persistent chat history stored as an append-only JSON-lines log.
+
+    Each ``append`` writes a single line, so the per-message cost does not
+    depend on how long the history is. Only the newest ``keep`` entries are
+    loaded (read backwards from the end of the file) and held in memory.
+    Once the log holds ``compact_factor`` times that many lines it is
+    rewritten with just the newest ``keep``. ``fsync_every`` > 0 forces the
+    log to disk after that many appends; by default flushing is left to the
+    OS. A legacy JSON-array history file is converted on first load.
+    """
 
-    def __init__(self, path: Path):
+    def __init__(
+        self,
+        path: Path,
+        keep: int = 500,
+        compact_factor: int = 4,
+        fsync_every: int = 0,
+    ):
         self.path = path
+        self.keep = keep
+        self.compact_factor = compact_factor
+        self.fsync_every = fsync_every
         self.history: List[Dict[str, str]] = []
+        self._lines = 0
+        self._unsynced = 0
+        self._fh: Optional[TextIO] = None
         self.load()
 
     def load(self) -> None:
-        if self.path.exists():
+        self.history = []
+        self._lines = 0
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "rb") as f:
+                first = f.read(1)
+            if first == b"[":
+                self.history = json.loads(self.path.read_text())[-self.keep:]
+                self.save()
+                return
+            self.history = self._read_tail()
+        except Exception as e:
+            logger.warning(f"Failed to load chat history: {e}")
+            self.history = []
+
+    def _read_tail(self) -> List[Dict[str, str]]:
+        """Parse the last ``keep`` lines without reading the whole file."""
+        block = 64 * 1024
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= self.keep:
+                step = min(block, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.splitlines()
+        self._lines = len(lines)
+        if pos > 0:
+            lines = lines[1:]  # first line may be partial
+            # older entries remain on disk: compact on the next append
+            self._lines = self.keep * self.compact_factor
+        entries = deque(maxlen=self.keep)
+        for line in lines:
             try:
-                self.history = json.loads(self.path.read_text())
-            except Exception:
-                self.history = []
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # torn write at the end of the log
+        return list(entries)
 
     def append(self, role: str, content: str) -> None:
-        self.history.append({"role": role, "content": content})
-        self.history = self.history[-50:]
-        self.save()
+        entry = {"role": role, "content": content}
+        self.history.append(entry)
+        if len(self.history) > self.keep:
+            del self.history[: len(self.history) - self.keep]
+        try:
+            fh = self._handle()
+            fh.write(json.dumps(entry) + "\n")
+            fh.flush()
+            self._lines += 1
+            self._unsynced += 1
+            if self.fsync_every and self._unsynced >= self.fsync_every:
+                os.fsync(fh.fileno())
+                self._unsynced = 0
+            if self._lines >= self.keep * self.compact_factor:
+                self.save()
+        except Exception as e:
+            logger.warning(f"Failed to persist chat history: {e}")
 
     def save(self) -> None:
+        """Compact the log to the in-memory history (atomic rewrite)."""
         try:
+            self.close()
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            self.path.write_text(json.dumps(self.history))
-        except Exception:
-            pass
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(e) + "\n" for e in self.history)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._lines = len(self.history)
+        except Exception as e:
+            logger.warning(f"Failed to compact chat history: {e}")
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            self._unsynced = 0
+
+    def _handle(self) -> TextIO:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if self._fh.tell() and not self._ends_with_newline():
+                self._fh.write("\n")  # terminate a torn last line
+        return self._fh
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
@@ -0,0 +1,385 @@
+"""In-process patch application and validation for self-modification.
+
+``apply_unified_diff`` applies a ``diff -u`` style patch to an in-memory
+string. ``PatchValidator`` runs candidate code with ``--testmode`` inside
+a throwaway sandbox directory, using a warm helper process that forks
+once per check, so already imported dependencies are not loaded again.
+"""
+import json
+import logging
+import os
+import re
+import runpy
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """The diff is malformed or does not match the original text."""
+
+
+# --------------------------------------------------------------------------
+#    Unified diff
+# --------------------------------------------------------------------------
+
+
+class Hunk:
+    __slots__ = ("old_start", "old_len", "new_start", "new_len", "lines")
+
+    def __init__(self, old_start, old_len, new_start, new_len):
+        self.old_start = old_start
+        self.old_len = old_len
+        self.new_start = new_start
+        self.new_len = new_len
+        # (tag, text) with tag in " -+"; text keeps its line ending.
+        self.lines: List[Tuple[str, str]] = []
+
+    def old_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "+"]
+
+    def new_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "-"]
+
+
+def _strip_newline(hunk: Hunk) -> None:
+    if hunk.lines:
+        tag, text = hunk.lines[-1]
+        hunk.lines[-1] = (tag, text.rstrip("\r\n"))
+
+
+def parse_unified_diff(diff_text: str) -> List[Hunk]:
+    """Parse the hunks of a single-file unified diff."""
+    lines = diff_text.splitlines(keepends=True)
+    hunks: List[Hunk] = []
+    i = 0
+    headers = 0
+    while i < len(lines):
+        line = lines[i]
+        m = _HUNK_RE.match(line)
+        if not m:
+            if line.startswith("--- "):
+                headers += 1
+                if headers > 1:
+                    raise PatchError("multi-file diffs are not supported")
+            i += 1
+            continue
+        old_start, old_len, new_start, new_len = (
+            int(g) if g is not None else 1 for g in m.groups())
+        hunk = Hunk(old_start, old_len, new_start, new_len)
+        i += 1
+        old_seen = new_seen = 0
+        while old_seen < old_len or new_seen < new_len:
+            if i >= len(lines):
+                raise PatchError(f"truncated hunk at line {old_start}")
+            line = lines[i]
+            if line.startswith("\\"):
+                _strip_newline(hunk)  # "\ No newline at end of file"
+                i += 1
+                continue
+            tag, text = (line[0], line[1:]) if line.strip("\r\n") else (
+                " ", line)  # editors often strip the blank context marker
+            if tag not in " -+":
+                raise PatchError(f"unexpected line in hunk: {line!r}")
+            if tag != "+":
+                old_seen += 1
+            if tag != "-":
+                new_seen += 1
+            hunk.lines.append((tag, text))
+            i += 1
+        if i < len(lines) and lines[i].startswith("\\"):
+            _strip_newline(hunk)
+            i += 1
+        if old_seen != old_len or new_seen != new_len:
+            raise PatchError(f"hunk at line {old_start} has wrong length")
+        hunks.append(hunk)
+    return hunks
+
+
+def _same(a: Sequence[str], b: Sequence[str]) -> bool:
+    return len(a) == len(b) and all(
+        x.rstrip("\r\n") == y.rstrip("\r\n") for x, y in zip(a, b))
+
+
+def _locate(lines: List[str], block: List[str], want: int, lo: int) -> int:
+    """Find ``block`` in ``lines`` at ``want`` or the nearest offset."""
+    hi = len(lines) - len(block)
+    want = min(max(want, lo), max(hi, lo))
+    for delta in range(0, max(hi - lo, 0) + 1):
+        for pos in (want - delta, want + delta) if delta else (want,):
+            if lo <= pos <= hi and _same(lines[pos:pos + len(block)], block):
+                return pos
+    return -1
+
+
+def apply_unified_diff(original: str, diff_text: str) -> str:
+    """Return ``original`` with ``diff_text`` applied.
+
+    Like ``patch`` without fuzz, each hunk must match exactly but may sit
+    at an offset from the line numbers in its header. Raises PatchError
+    if a hunk cannot be placed.
+    """
+    hunks = parse_unified_diff(diff_text)
+    if not hunks:
+        raise PatchError("no hunks found in diff")
+    src = original.splitlines(keepends=True)
+    out: List[str] = []
+    pos = 0
+    offset = 0
+    for n, hunk in enumerate(hunks, 1):
+        old = hunk.old_lines()
+        want = hunk.old_start - 1 + offset if old else hunk.old_start + offset
+        at = _locate(src, old, want, pos)
+        if at < 0:
+            raise PatchError(
+                f"hunk {n} (line {hunk.old_start}) does not apply")
+        offset = at - (hunk.old_start - 1 if old else hunk.old_start)
+        out.extend(src[pos:at])
+        k = at
+        for tag, text in hunk.lines:
+            if tag == " ":
+                out.append(src[k])
+                k += 1
+            elif tag == "-":
+                k += 1
+            else:
+                out.append(text)
+        pos = k
+    out.extend(src[pos:])
+    # A line taken from the end of the original may lack its newline.
+    for i in range(len(out) - 1):
+        if not out[i].endswith("\n"):
+            out[i] += "\n"
+    return "".join(out)
+
+
+# --------------------------------------------------------------------------
+#    Sandbox & validation
+# --------------------------------------------------------------------------
+
+
+def _sandbox_root() -> Optional[str]:
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return None
+
+
+@contextmanager
+def sandbox(prefix: str = "patch-") -> Iterator[Path]:
+    """Throwaway directory, on tmpfs where available."""
+    with tempfile.TemporaryDirectory(
+        prefix=prefix, dir=_sandbox_root()
+    ) as tmp:
+        yield Path(tmp)
+
+
+def _run_forked(path: str, args: List[str], timeout: float, log: str):
+    """Fork, run ``path`` as __main__ in the child, wait with a timeout."""
+    pid = os.fork()
+    if pid == 0:  # child
+        code = 1
+        try:
+            fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(fd, 1)
+            os.dup2(fd, 2)
+            null = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(null, 0)
+            sys.argv = [path, *args]
+            sys.path.insert(0, os.path.dirname(path))
+            os.chdir(os.path.dirname(path))
+            try:
+                runpy.run_path(path, run_name="__main__")
+                code = 0
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+            except BaseException:
+                traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+    deadline = time.monotonic() + timeout
+    while True:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.waitstatus_to_exitcode(status), False
+        if time.monotonic() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return -signal.SIGKILL, True
+        time.sleep(0.002)
+
+
+def serve(project_dir: str, preload: Sequence[str] = ()) -> None:
+    """Validator loop: one JSON request per stdin line, one reply per line.
+
+    Imports ``preload`` once; every request forks from this warm state.
+    """
+    sys.path.insert(0, project_dir)
+    os.chdir(project_dir)
+    for name in preload:
+        try:
+            __import__(name)
+        except Exception as e:
+            print(f"preload {name} failed: {e}", file=sys.stderr)
+    out = sys.stdout
+    for line in sys.stdin:
+        req = json.loads(line)
+        log = os.path.join(os.path.dirname(req["path"]), "validate.log")
+        code, timed_out = _run_forked(
+            req["path"], req.get("args", []), req.get("timeout", 10.0), log)
+        try:
+            with open(log, encoding="utf-8", errors="replace") as f:
+                output = f.read()
+        except OSError:
+            output = ""
+        out.write(json.dumps({
+            "returncode": code, "timed_out": timed_out, "output": output,
+        }) + "\n")
+        out.flush()
+
+
+class PatchValidator:
+    """Run candidate source with ``--testmode`` and report the outcome.
+
+    Candidates are written to a sandbox (tmpfs where available) under
+    ``filename`` and executed there, with ``project_dir`` on ``sys.path``
+    so sibling imports resolve as they would for the real file. On POSIX a
+    warm helper process, started on first use, imports ``preload`` once and
+    forks per candidate; elsewhere each check spawns a fresh interpreter.
+    """
+
+    def __init__(
+        self,
+        project_dir: Path,
+        filename: str = "candidate.py",
+        preload: Sequence[str] = (),
+        timeout: float = 10.0,
+        args: Sequence[str] = ("--testmode",),
+    ):
+        self.project_dir = Path(project_dir)
+        self.filename = filename
+        self.preload = tuple(preload)
+        self.timeout = timeout
+        self.args = list(args)
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self.warm = hasattr(os, "fork")
+
+    def validate(self, code: str) -> Dict[str, Any]:
+        with self._lock, sandbox() as tmp:
+            path = tmp / self.filename
+            try:
+                path.write_text(code, encoding="utf-8")
+            except Exception as e:
+                return {"passed": False, "reason": f"Cannot write code: {e}"}
+            try:
+                if self.warm:
+                    res = self._request(path)
+                else:
+                    res = self._spawn(path)
+            except Exception as e:
+                self._stop()
+                return {"passed": False, "reason": f"Test run exception: {e}"}
+        if res["timed_out"]:
+            return {
+                "passed": False,
+                "reason": f"Timed out after {self.timeout}s\n{res['output']}",
+            }
+        if res["returncode"] != 0:
+            return {
+                "passed": False,
+                "reason": (
+                    f"Exit code {res['returncode']}\n"
+                    f"Output:\n{res['output']}"
+                ),
+            }
+        return {"passed": True, "reason": "All good."}
+
+    def _spawn(self, path: Path) -> Dict[str, Any]:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [str(self.project_dir), env.get("PYTHONPATH")]))
+        try:
+            proc = subprocess.run(
+                [sys.executable, str(path), *self.args],
+                cwd=path.parent, env=env, capture_output=True,
+                text=True, timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired as e:
+            return {"returncode": None, "timed_out": True,
+                    "output": str(e.stdout or "")}
+        return {"returncode": proc.returncode, "timed_out": False,
+                "output": proc.stdout + proc.stderr}
+
+    def _request(self, path: Path) -> Dict[str, Any]:
+        for attempt in (1, 2):
+            proc = self._ensure_server()
+            req = {"path": str(path), "args": self.args,
+                   "timeout": self.timeout}
+            try:
+                proc.stdin.write(json.dumps(req) + "\n")
+                proc.stdin.flush()
+                # Generous bound: the helper enforces ``timeout`` itself.
+                ready, _, _ = select.select(
+                    [proc.stdout], [], [], self.timeout + 30)
+                line = proc.stdout.readline() if ready else ""
+            except (BrokenPipeError, OSError):
+                line = ""
+            if line:
+                return json.loads(line)
+            logger.warning("Patch validator helper died; restarting.")
+            self._stop()
+        raise RuntimeError("patch validator helper is not responding")
+
+    def _ensure_server(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            code = (
+                "import sys, patch_utils; "
+                "patch_utils.serve(sys.argv[1], sys.argv[2:])"
+            )
+            env = dict(os.environ)
+            here = str(Path(__file__).resolve().parent)
+            env["PYTHONPATH"] = os.pathsep.join(
+                filter(None, [here, env.get("PYTHONPATH")]))
+            self._proc = subprocess.Popen(
+                [sys.executable, "-c", code, str(self.project_dir),
+                 *self.preload],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                cwd=self.project_dir, env=env, text=True,
+            )
+        return self._proc
+
+    def _stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.stdin.close()
+                try:
+                    self._proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    pass
+            self._stop()
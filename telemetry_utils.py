@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+from array import array
+from typing import Callable, Dict, Optional, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("cpu_percent", "memory_percent", "disk_free_gb", "efi_mounted")
+
+
+class RingBuffer:
+    """Fixed-size window of floats with O(1) running mean.
+
+    Values live in a preallocated ``array('d')``; the running sum is
+    adjusted as old values are overwritten and recomputed exactly each
+    time the write index wraps, so float drift cannot accumulate.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def push(self, value: float) -> None:
+        i = self._next
+        if self._count == self.capacity:
+            self._sum -= self._data[i]
+        else:
+            self._count += 1
+        self._data[i] = value
+        self._sum += value
+        self._next = (i + 1) % self.capacity
+        if self._next == 0:
+            self._sum = sum(self._data)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._data[self._next - 1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def _window(self):
+        if self._count == self.capacity:
+            return self._data
+        return self._data[:self._count]
+
+    def min(self) -> Optional[float]:
+        return min(self._window()) if self._count else None
+
+    def max(self) -> Optional[float]:
+        return max(self._window()) if self._count else None
+
+
+def probe_system(
+    disk_path: str = "/", efi_path: str = "/boot/efi"
+) -> Tuple[float, float, float, float]:
+    """Take one reading of FIELDS.
+
+    ``psutil.cpu_percent(None)`` reports utilisation since the previous
+    call, so it is only meaningful when called periodically.
+    """
+    return (
+        psutil.cpu_percent(interval=None),
+        psutil.virtual_memory().percent,
+        psutil.disk_usage(disk_path).free / (1024 ** 3),
+        1.0 if os.path.exists(efi_path) else 0.0,
+    )
+
+
+class TelemetrySampler:
+    """Background thread that records system readings into ring buffers.
+
+    ``state()`` and ``summary()`` only read the buffers, so callers get
+    rolling aggregates without sampling on demand. ``interval`` is the
+    sampling period in seconds and ``window`` the number of samples kept.
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        window: int = 300,
+        probe: Callable[[], Tuple[float, ...]] = probe_system,
+    ):
+        self.interval = interval
+        self.window = window
+        self._probe = probe
+        self._buffers = {f: RingBuffer(window) for f in FIELDS}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self._probe is probe_system:
+            psutil.cpu_percent(interval=None)  # prime the CPU counters
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Record one reading now."""
+        try:
+            reading = self._probe()
+        except Exception as e:
+            logger.warning(f"Telemetry sample failed: {e}")
+            return
+        with self._lock:
+            for field, value in zip(FIELDS, reading):
+                self._buffers[field].push(float(value))
+
+    def __len__(self) -> int:
+        return len(self._buffers[FIELDS[0]])
+
+    def state(self) -> Dict[str, float]:
+        """Rolling view in the shape the predictor expects.
+
+        CPU and memory are averaged over the window; disk space and the
+        EFI mount are the latest reading. Samples once if the buffers are
+        still empty.
+        """
+        if not len(self):
+            self.sample()
+        with self._lock:
+            b = self._buffers
+            if not len(b["cpu_percent"]):
+                return {}
+            return {
+                "cpu_percent": b["cpu_percent"].mean,
+                "memory_percent": b["memory_percent"].mean,
+                "disk_free_gb": b["disk_free_gb"].last,
+                "efi_mounted": bool(b["efi_mounted"].last),
+            }
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Latest, mean, min and max of every field over the window."""
+        with self._lock:
+            return {
+                field: {
+                    "last": buf.last,
+                    "mean": buf.mean,
+                    "min": buf.min(),
+                    "max": buf.max(),
+                }
+                for field, buf in self._buffers.items()
+            }
@@ -0,0 +1,35 @@
+import importlib
+import signal
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared import state as state_module
+
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    """Point CommanderState at a throwaway database for this test."""
+    path = tmp_path / "tasks.db"
+    monkeypatch.setattr(state_module, "DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch, state_db):
+    """A freshly imported commander server with isolated state.
+
+    HOME is redirected so no real secrets.toml is read. Importing the server
+    installs a SIGHUP handler, so the previous one is restored afterwards
+    instead of chaining another handler per test.
+    """
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    previous = signal.getsignal(signal.SIGHUP) if hasattr(signal, "SIGHUP") else None
+    module = importlib.reload(importlib.import_module("layered_agent_full.commander.server"))
+    yield module
+    if previous is not None:
+        signal.signal(signal.SIGHUP, previous)
@@ -7,9 +7,7 @@ from layered_agent_full.shared import state as state_module
 import json
 
 
-def test_audit_records_event(tmp_path):
-    state_module.DB_PATH = tmp_path / "audit.db"
-    state_module.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+def test_audit_records_event(state_db):
     s = state_module.CommanderState()
 
     s.audit("test", {"foo": "bar"})
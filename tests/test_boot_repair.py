@@ -0,0 +1,364 @@
+import sys
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+HELPERS = (
+    "boot_repair.py", "llm_cache.py", "memory_utils.py", "patch_utils.py",
+    "telemetry_utils.py", "voice_utils.py",
+)
+
+HEAVY = (
+    "pandas", "sklearn", "openai", "tkinter",
+    "transformers", "vllm", "pyvirtualdisplay",
+)
+
+
+@pytest.fixture
+def sandbox(tmp_path):
+    """Copy boot_repair and its helpers so logs/data dirs land in tmp."""
+    for name in HELPERS:
+        shutil.copy(ROOT / name, tmp_path / name)
+    return tmp_path
+
+
+def _run(sandbox, *args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=sandbox,
+        capture_output=True, text=True, timeout=30,
+    )
+
+
+def test_import_defers_heavy_modules(sandbox):
+    code = (
+        "import sys, boot_repair\n"
+        f"print('loaded:', [m for m in {HEAVY!r} if m in sys.modules])\n"
+    )
+    proc = _run(sandbox, "-c", code)
+    assert proc.returncode == 0, proc.stderr
+    assert "loaded: []" in proc.stdout
+
+
+def test_testmode_starts_quickly(sandbox):
+    start = time.perf_counter()
+    proc = _run(sandbox, "boot_repair.py", "--testmode")
+    elapsed = time.perf_counter() - start
+    assert proc.returncode == 0, proc.stderr
+    assert elapsed < 1.0
+
+
+WRITE_CSV = """
+from boot_repair import BootIssuePredictor, DATA_DIR
+
+rows = ["cpu_percent,memory_percent,disk_free_gb,efi_mounted,issue"]
+issues = ["kernel_panic_rootfs", "filesystem_corrupt", "no_issue"]
+rows += [f"{i % 90},{i % 70},{i % 40},{i % 2 == 0},{issues[i % 3]}"
+         for i in range(60)]
+csv = DATA_DIR / "synthetic_boot_issues.csv"
+csv.write_text("\\n".join(rows) + "\\n")
+"""
+
+CACHE_SCRIPT = WRITE_CSV + """
+
+trained = []
+orig = BootIssuePredictor.train_model
+def counting(self, data):
+    trained.append(len(data))
+    return orig(self, data)
+BootIssuePredictor.train_model = counting
+
+p = BootIssuePredictor()
+p.load_and_train_model()          # same data: no-op
+BootIssuePredictor()              # fresh instance: loads from joblib cache
+print("after_cache", len(trained))
+
+csv.write_text(csv.read_text() + "1,2,3,True,no_issue\\n")
+p.load_and_train_model()          # data changed: retrain
+print("after_change", len(trained))
+"""
+
+
+def test_model_is_cached_until_data_changes(sandbox):
+    proc = _run(sandbox, "-c", CACHE_SCRIPT)
+    assert proc.returncode == 0, proc.stderr
+    assert "after_cache 1" in proc.stdout
+    assert "after_change 2" in proc.stdout
+    assert (sandbox / "models" / "boot_issue_model.joblib").exists()
+
+
+PREDICT_SCRIPT = WRITE_CSV + """
+import warnings
+import numpy as np
+warnings.simplefilter("error")
+
+p = BootIssuePredictor()
+states = [
+    {"cpu_percent": i % 90, "memory_percent": i % 70,
+     "disk_free_gb": i % 40, "efi_mounted": i % 2 == 0}
+    for i in range(60)
+]
+batch = p.predict_batch(states)
+assert batch == [p.predict_issue(s) for s in states]
+assert batch == [str(c) for c in p.model.predict(p._as_matrix(states))]
+X = np.array([[s[f] for f in p.FEATURES] for s in states])
+assert p.predict_batch(X) == batch
+assert p.predict_batch([states[0], {"cpu_percent": 1.0}]) == [
+    batch[0], "unknown"]
+assert p.predict_batch(s for s in states) == batch
+assert p.predict_batch(s for s in [states[0], "garbage"]) == ["unknown"] * 2
+assert p.predict_issue({}) == "unknown"
+print("ok")
+"""
+
+
+def test_predict_batch_matches_single_predictions(sandbox):
+    proc = _run(sandbox, "-c", PREDICT_SCRIPT)
+    assert proc.returncode == 0, proc.stderr
+    assert "ok" in proc.stdout
+
+
+INCREMENTAL_SCRIPT = WRITE_CSV + """
+p = BootIssuePredictor(incremental=True, chunksize=7)
+assert p.is_fitted
+assert p.model.named_steps["scale"].n_samples_seen_ == 60
+assert p.predict_issue({"cpu_percent": 5, "memory_percent": 5,
+                        "disk_free_gb": 5, "efi_mounted": True}) in (
+    "kernel_panic_rootfs", "filesystem_corrupt", "no_issue")
+forest = BootIssuePredictor()     # cache key differs: retrains a forest
+assert type(forest.model).__name__ == "RandomForestClassifier"
+print("ok")
+"""
+
+
+def test_incremental_training_streams_chunks(sandbox):
+    proc = _run(sandbox, "-c", INCREMENTAL_SCRIPT)
+    assert proc.returncode == 0, proc.stderr
+    assert "ok" in proc.stdout
+
+
+REPAIR_SCRIPT = """
+import asyncio, logging, sys, threading, time
+import boot_repair
+logging.disable(logging.DEBUG)
+from boot_repair import BootRepairLogic, DefaultProcessManager
+
+llm_calls = []
+boot_repair.query_deepseek = lambda prompt: llm_calls.append(prompt) or ""
+boot_repair.apply_solution = lambda solution: False
+
+def py(code):
+    return (sys.executable, "-c", code)
+
+async def ticking(coro):
+    ticks = 0
+    task = asyncio.ensure_future(coro)
+    while not task.done():
+        ticks += 1
+        await asyncio.sleep(0.01)
+    return await task, ticks
+
+async def main():
+    # Large output on both pipes must not deadlock; the loop keeps running.
+    logic = BootRepairLogic()
+    logic.KERNEL_PANIC_ROOTFS_COMMANDS = (
+        py("import sys, time; sys.stdout.write('o\\\\n' * 200000); "
+           "time.sleep(0.3)"),
+        py("import sys; sys.stderr.write('e\\\\n' * 200000)"),
+    )
+    ok, ticks = await ticking(logic.repair_issue("kernel_panic_rootfs"))
+    assert ok and logic.process_status == "completed", logic.process_status
+    assert ticks >= 5, ticks
+    assert logic.process_manager.running() == 0
+
+    # A failing step reports its output tail and goes through the LLM path.
+    logic.KERNEL_PANIC_ROOTFS_COMMANDS = (
+        py("import sys; print('boom'); sys.exit(3)"),)
+    assert not await logic.repair_issue("kernel_panic_rootfs")
+    assert logic.process_status == "failed"
+    assert len(llm_calls) == 1 and "boom" in llm_calls[0]
+
+    # terminate_all() from another thread stops the running step and the
+    # remaining ones, without asking the LLM for a fix.
+    manager = DefaultProcessManager()
+    logic = BootRepairLogic(manager)
+    logic.KERNEL_PANIC_ROOTFS_COMMANDS = (
+        py("import time; time.sleep(30)"), py("print('never')"))
+    def stop_when_running():
+        while not manager.running():
+            time.sleep(0.01)
+        manager.terminate_all()
+    threading.Thread(target=stop_when_running).start()
+    start = time.monotonic()
+    assert not await logic.repair_issue("kernel_panic_rootfs")
+    assert time.monotonic() - start < 10
+    assert logic.process_status == "cancelled"
+    assert len(llm_calls) == 1
+
+    # Cancelling the asyncio task terminates the child process.
+    logic.KERNEL_PANIC_ROOTFS_COMMANDS = (py("import time; time.sleep(30)"),)
+    task = asyncio.ensure_future(logic.repair_issue("kernel_panic_rootfs"))
+    while logic.current_process is None:
+        await asyncio.sleep(0.01)
+    proc = logic.current_process
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    assert proc.returncode is not None and manager.running() == 0
+    print("ok")
+
+asyncio.run(main())
+"""
+
+
+def test_repair_commands_run_without_blocking(sandbox):
+    proc = _run(sandbox, "-c", REPAIR_SCRIPT)
+    assert proc.returncode == 0, proc.stderr + proc.stdout[-2000:]
+    assert "ok" in proc.stdout
+
+
+PATCH_SCRIPT = """
+import difflib, time
+import boot_repair
+from boot_repair import THIS_FILE_PATH
+
+boot_repair.confirm_patch_application = lambda diff: True
+boot_repair.attempt_git_commit = lambda msg: None
+original = THIS_FILE_PATH.read_text()
+
+broken = original.replace(
+    'logger.info("Running in testmode, exit 0.")', 'raise SystemExit(5)')
+patched = original.replace(
+    "Running in testmode, exit 0.", "Running in testmode (patched).")
+
+def diff(new):
+    return "".join(difflib.unified_diff(
+        original.splitlines(keepends=True), new.splitlines(keepends=True),
+        "a/boot_repair.py", "b/boot_repair.py"))
+
+result = boot_repair.apply_patch_changes(diff(broken))
+assert "Exit code 5" in result, result
+assert THIS_FILE_PATH.read_text() == original
+
+start = time.perf_counter()
+for _ in range(5):
+    assert boot_repair.run_local_test_suite_with_code(original)["passed"]
+print("per-check", (time.perf_counter() - start) / 5)
+
+result = boot_repair.apply_patch_changes(diff(patched))
+assert "Code updated successfully" in result, result
+assert THIS_FILE_PATH.read_text() == patched
+backup = THIS_FILE_PATH.with_name("boot_repair_backup.py")
+assert backup.read_text() == original
+assert sorted(p.name for p in THIS_FILE_PATH.parent.glob("*temp*")) == []
+print("ok")
+"""
+
+
+def test_patch_applied_in_process_and_validated(sandbox):
+    proc = _run(sandbox, "-c", PATCH_SCRIPT)
+    assert proc.returncode == 0, proc.stderr + proc.stdout[-2000:]
+    assert "ok" in proc.stdout
+
+
+LLM_CACHE_SCRIPT = """
+import itertools
+import boot_repair
+from types import SimpleNamespace
+
+calls = []
+replies = itertools.chain(
+    ["--- a/x\\\\n+++ b/x\\\\n", RuntimeError("503")], itertools.repeat(""))
+
+def create(**kwargs):
+    calls.append(kwargs["messages"][-1]["content"])
+    reply = next(replies)
+    if isinstance(reply, Exception):
+        raise reply
+    msg = SimpleNamespace(message=SimpleNamespace(content=reply))
+    return SimpleNamespace(choices=[msg])
+
+boot_repair._ds_client = SimpleNamespace(
+    chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+first = boot_repair.query_deepseek("kernel panic")
+assert boot_repair.query_deepseek("kernel panic") == first
+assert calls == ["kernel panic"]
+
+# Errors and empty answers are not cached.
+assert "couldn't process" in boot_repair.query_deepseek("grub error")
+assert boot_repair.query_deepseek("grub error") == ""
+assert boot_repair.query_deepseek("grub error") == ""
+assert calls == ["kernel panic", "grub error", "grub error", "grub error"]
+
+stats = boot_repair.get_llm_cache().stats()
+assert stats["hits"] == 1 and stats["entries"] == 1, stats
+print("ok")
+"""
+
+
+def test_query_deepseek_caches_successful_answers(sandbox):
+    proc = _run(sandbox, "-c", LLM_CACHE_SCRIPT)
+    assert proc.returncode == 0, proc.stderr + proc.stdout[-2000:]
+    assert "ok" in proc.stdout
+
+
+LOCAL_LLM_SCRIPT = """
+import boot_repair
+from types import SimpleNamespace
+
+prompts = []
+
+class FakeLLM:
+    def generate(self, batch, sampling_params):
+        prompts.extend(batch)
+        return [SimpleNamespace(outputs=[SimpleNamespace(text="local diff")])]
+
+boot_repair._ds_client = None
+boot_repair._local_llm = (FakeLLM(), "params")
+assert boot_repair.query_deepseek("fsck failed") == "local diff"
+assert boot_repair.query_deepseek("fsck failed") == "local diff"
+assert len(prompts) == 1 and prompts[0].endswith("fsck failed")
+
+boot_repair._local_llm = (None, None)
+assert "Placeholder" in boot_repair.query_deepseek("grub error")
+print("ok")
+"""
+
+
+def test_query_deepseek_falls_back_to_local_llm(sandbox):
+    proc = _run(sandbox, "-c", LOCAL_LLM_SCRIPT)
+    assert proc.returncode == 0, proc.stderr + proc.stdout[-2000:]
+    assert "ok" in proc.stdout
+
+
+STATUS_SCRIPT = """
+import asyncio
+import boot_repair
+from types import SimpleNamespace
+from telemetry_utils import TelemetrySampler
+
+state = {"cpu_percent": 12.0, "memory_percent": 34.0}
+telemetry = TelemetrySampler(probe=lambda: (50.0, 60.0, 7.0))
+agent = SimpleNamespace(_get_system_state=lambda: state, telemetry=telemetry)
+chat = boot_repair.ChatInterface(agent)
+
+reply = asyncio.run(chat._route_command("status"))
+assert "peak None" not in reply and reply.count("(peak n/a)") == 2, reply
+
+telemetry.sample()
+reply = asyncio.run(chat._route_command("status"))
+assert "(peak 50.0%)" in reply and "(peak 60.0%)" in reply, reply
+print("ok")
+"""
+
+
+def test_status_without_samples_has_no_peak(sandbox):
+    proc = _run(sandbox, "-c", STATUS_SCRIPT)
+    assert proc.returncode == 0, proc.stderr + proc.stdout[-2000:]
+    assert "ok" in proc.stdout
@@ -0,0 +1,90 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace as NS
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+
+class FakeCompletions:
+    def __init__(self, message=None, chunks=()):
+        self.message = message
+        self.chunks = chunks
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0)
+        if kwargs.get("stream"):
+            return self._stream()
+        return NS(choices=[NS(message=self.message)])
+
+    async def _stream(self):
+        for delta in self.chunks:
+            yield NS(choices=[NS(delta=delta)])
+
+
+def use_llm(server, monkeypatch, completions):
+    monkeypatch.setattr(server, "llm", NS(chat=NS(completions=completions)))
+    return server
+
+
+def record_enqueue_loop(server, monkeypatch):
+    """Record, per enqueue, whether it ran on the event loop thread."""
+    on_loop = []
+    enqueue = server.state.enqueue
+
+    def spy(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return enqueue(*args, **kwargs)
+
+    monkeypatch.setattr(server.state, "enqueue", spy)
+    return on_loop
+
+
+def test_chat_queues_function_call(server, monkeypatch):
+    fc = NS(name="run_shell", arguments='{"command": "ls"}')
+    use_llm(server, monkeypatch, FakeCompletions(NS(function_call=fc, content=None)))
+    server.state.register_worker("w1", {"skills": [{"name": "run_shell"}]})
+    on_loop = record_enqueue_loop(server, monkeypatch)
+
+    resp = TestClient(server.app).post("/chat", json={"message": "list files"})
+
+    assert "Queued `run_shell`" in resp.json()["reply"]
+    assert on_loop == [False]
+    task = server.state.fetch_tasks("w1")[0]
+    assert task["function"] == {"name": "run_shell", "arguments": {"command": "ls"}}
+
+
+def test_chat_stream_forwards_tokens(server, monkeypatch):
+    chunks = [NS(content="Hel", function_call=None), NS(content="lo", function_call=None)]
+    use_llm(server, monkeypatch, FakeCompletions(chunks=chunks))
+
+    resp = TestClient(server.app).post("/chat/stream", json={"message": "hi"})
+
+    events = [e for e in resp.text.split("\n\n") if e]
+    assert [json.loads(e.split("data: ")[1]) for e in events] == [
+        {"delta": "Hel"},
+        {"delta": "lo"},
+        {"reply": "Hello"},
+    ]
+    assert server.state.history[-1].content == "Hello"
+
+
+def test_chat_stream_queues_function_call_off_the_loop(server, monkeypatch):
+    chunks = [NS(content=None, function_call=NS(name="run_shell", arguments='{"command": "ls"}'))]
+    use_llm(server, monkeypatch, FakeCompletions(chunks=chunks))
+    server.state.register_worker("w1", {"skills": [{"name": "run_shell"}]})
+    on_loop = record_enqueue_loop(server, monkeypatch)
+
+    resp = TestClient(server.app).post("/chat/stream", json={"message": "list files"})
+
+    assert "Queued `run_shell`" in resp.text
+    assert on_loop == [False]
@@ -1,22 +1,13 @@
 import sys
 from pathlib import Path
-import importlib
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from fastapi.testclient import TestClient
 from layered_agent_full.shared.protocol import FunctionCall
-from layered_agent_full.shared import state as state_module
 
 
-def test_worker_registration_and_queue(tmp_path, monkeypatch):
-    # isolate state DB
-    state_module.DB_PATH = tmp_path / "tasks.db"
-    state_module.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
-
-    server = importlib.reload(importlib.import_module("layered_agent_full.commander.server"))
+def test_worker_registration_and_queue(server):
     client = TestClient(server.app)
 
     payload = {"token": server.state.bearer_token, "worker_id": "w1", "skills": []}
@@ -0,0 +1,49 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared import state as state_module
+from layered_agent_full.shared.conversation import Conversation, ConversationStore
+from layered_agent_full.shared.protocol import ChatMessage, FunctionCall
+
+
+def test_conversation_trims_to_token_budget():
+    conv = Conversation(token_budget=30)
+    for i in range(10):
+        conv.append(ChatMessage(role="user", content=f"message {i:02d} " * 4))
+
+    assert conv.tokens <= 30
+    assert conv.messages[-1].content.startswith("message 09")
+    assert conv.prompt() == [m.model_dump() for m in conv.messages]
+
+
+def test_prompt_is_a_snapshot():
+    conv = Conversation(token_budget=20)
+    conv.append(ChatMessage(role="user", content="first message here"))
+    prompt = conv.prompt()
+    conv.append(ChatMessage(role="user", content="second message, long enough to evict the first"))
+
+    assert [m["content"] for m in prompt] == ["first message here"]
+
+
+def test_store_evicts_least_recently_used():
+    store = ConversationStore(max_sessions=2)
+    a = store.get("a")
+    store.get("b")
+    assert store.get("a") is a
+    store.get("c")
+
+    assert "a" in store and "c" in store
+    assert "b" not in store
+
+
+def test_results_go_to_requesting_session(state_db):
+    s = state_module.CommanderState()
+    tid = s.enqueue("w1", FunctionCall(name="dummy"), session_id="alice")
+
+    s.complete(tid, {"ok": True})
+
+    assert json.loads(s.sessions.get("alice").messages[-1].content)["task_id"] == tid
+    assert s.history == []
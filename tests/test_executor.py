@@ -0,0 +1,90 @@
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.worker.executor import SkillPool
+from layered_agent_full.worker.skills.core import skill
+
+
+@skill
+def nap(seconds: float = 0.2):
+    time.sleep(seconds)
+    return {"slept": seconds}
+
+
+@skill(concurrency=1)
+def exclusive(seconds: float = 0.1):
+    time.sleep(seconds)
+    return {"ok": True}
+
+
+@skill(executor="process")
+def square(n: int):
+    return {"square": n * n}
+
+
+def task(tid, name, **kw):
+    return {"id": tid, "function": {"name": name, "arguments": kw}}
+
+
+def run_all(pool, tasks, skills):
+    results = {}
+    finished = threading.Event()
+
+    def done(t, status, result):
+        results[t["id"]] = (status, result)
+        if len(results) == len(tasks):
+            finished.set()
+
+    for t in tasks:
+        pool.submit(t, skills, done)
+    assert finished.wait(10)
+    return results
+
+
+def test_tasks_run_in_parallel():
+    pool = SkillPool(max_workers=4)
+    start = time.monotonic()
+    results = run_all(pool, [task(str(i), "nap") for i in range(4)], {"nap": nap})
+    assert time.monotonic() - start < 0.6
+    assert all(status == "success" for status, _ in results.values())
+    assert pool.free_slots() == 4
+
+
+def test_per_skill_concurrency_limit():
+    pool = SkillPool(max_workers=4)
+    start = time.monotonic()
+    run_all(pool, [task(str(i), "exclusive") for i in range(3)], {"exclusive": exclusive})
+    assert time.monotonic() - start >= 0.3
+
+
+def test_process_skill_and_errors():
+    pool = SkillPool(max_workers=2, max_processes=1)
+    results = run_all(
+        pool,
+        [task("a", "square", n=7), task("b", "missing")],
+        {"square": square},
+    )
+    assert results["a"] == ("success", {"square": 49})
+    assert results["b"][0] == "error"
+    assert "unknown skill" in results["b"][1]["trace"]
+    pool.shutdown()
+
+
+def test_process_plugin_does_not_shadow_real_modules(tmp_path):
+    path = tmp_path / "json.py"
+    path.write_text(
+        "import sys\n"
+        "def probe():\n"
+        "    return {'real_json': sys.modules['json'].__file__ != __file__}\n"
+    )
+    probe = types.SimpleNamespace(
+        _skill_executor="process", _skill_path=str(path), __module__="json", __name__="probe")
+    pool = SkillPool(max_workers=1, max_processes=1)
+    results = run_all(pool, [task("a", "probe"), task("b", "probe")], {"probe": probe})
+    pool.shutdown()
+    assert results == {t: ("success", {"real_json": True}) for t in "ab"}
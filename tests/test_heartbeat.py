@@ -0,0 +1,110 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared import state as state_module
+from layered_agent_full.shared.protocol import FunctionCall
+
+
+def make_state():
+    s = state_module.CommanderState(routing="round_robin")
+    s.register_worker("dead", {"skills": [{"name": "ping"}, {"name": "solo"}]})
+    s.register_worker("live", {"skills": [{"name": "ping"}]})
+    return s
+
+
+def test_poll_refreshes_heartbeat(state_db):
+    s = make_state()
+    s.last_seen["live"] = 0
+    s.fetch_tasks("live")
+    assert time.time() - s.last_seen["live"] < 5
+    assert s.reap(ttl=60) == []
+
+
+def test_reap_evicts_and_reroutes(state_db):
+    s = make_state()
+    pending = s.enqueue("dead", FunctionCall(name="ping"))
+    leased = s.enqueue("dead", FunctionCall(name="ping"))
+    stranded = s.enqueue("dead", FunctionCall(name="solo"))
+    s.fetch_tasks("dead", max_tasks=1)
+    s.last_seen["dead"] = time.time() - 1000
+
+    assert s.reap(ttl=60) == ["dead"]
+
+    assert "dead" not in s.workers
+    assert s.get_worker_with_skill("ping") == "live"
+    assert "solo" not in s.skills
+    assert {t["id"] for t in s.fetch_tasks("live")} == {pending, leased}
+    row = s.conn.execute("SELECT worker_id FROM queue WHERE id=?", (stranded,)).fetchone()
+    assert row[0] == "dead"
+    snap = s.snapshot()
+    assert (snap["live_workers"], snap["dead_workers"]) == (1, 1)
+
+    s.register_worker("dead", {"skills": [{"name": "solo"}]})
+    assert s.snapshot()["dead_workers"] == 0
+
+
+def test_result_upload_is_a_heartbeat(state_db):
+    s = make_state()
+    tid = s.enqueue("live", FunctionCall(name="ping"))
+    s.fetch_tasks("live")
+    s.last_seen["live"] = time.time() - 1000
+    s.complete(tid, {"pong": True})
+    assert "live" not in s.reap(ttl=60)
+    assert "live" in s.workers
+
+
+def test_saturated_heartbeat_poll_returns_at_once(server):
+    from fastapi.testclient import TestClient
+
+    server.state.register_worker("w1", {"skills": [{"name": "ping"}]})
+    server.state.last_seen["w1"] = 0
+    start = time.monotonic()
+    resp = TestClient(server.app).get(
+        "/task/w1", params={"wait": 10, "max_tasks": 0},
+        headers={"Authorization": server.state.bearer_token})
+    assert resp.status_code == 204
+    assert time.monotonic() - start < 5
+    assert time.time() - server.state.last_seen["w1"] < 5
+
+
+def test_heartbeat_poll_renews_only_held_leases(server):
+    from fastapi.testclient import TestClient
+
+    s = server.state
+    s.register_worker("w1", {"skills": [{"name": "ping"}]})
+    held, lost = (s.enqueue("w1", FunctionCall(name="ping")) for _ in range(2))
+    s.fetch_tasks("w1", lease=0.5)
+    resp = TestClient(server.app).get(
+        "/task/w1", params={"max_tasks": 0, "held": [held]},
+        headers={"Authorization": s.bearer_token})
+    assert resp.status_code == 204
+
+    time.sleep(0.6)
+    assert s.requeue_expired() == 1
+    status = dict(s.conn.execute("SELECT id, status FROM queue").fetchall())
+    assert status == {held: "sent", lost: "pending"}
+
+
+def test_periodic_jobs_survive_errors_off_the_event_loop(server):
+    import asyncio
+    import sqlite3
+    import threading
+
+    calls = []
+
+    def reap():
+        calls.append(threading.current_thread() is threading.main_thread())
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    async def main():
+        task = asyncio.create_task(server._every(0.01, reap))
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert calls[:3] == [False, False, False]
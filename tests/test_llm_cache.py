@@ -0,0 +1,82 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from llm_cache import LLMCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_persistence(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = LLMCache(path)
+    assert cache.get("m", "sys", "fix grub") is None
+    cache.put("m", "sys", "fix grub", "--- a\n+++ b\n")
+    assert cache.get("m", "sys", "fix grub") == "--- a\n+++ b\n"
+    # model and system message are part of the key
+    assert cache.get("other", "sys", "fix grub") is None
+    assert cache.get("m", "other", "fix grub") is None
+    assert cache.stats() == {"hits": 1, "misses": 3, "entries": 1}
+    cache.close()
+
+    reopened = LLMCache(path)
+    assert reopened.get("m", "sys", "fix grub") == "--- a\n+++ b\n"
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    clock = Clock()
+    cache = LLMCache(tmp_path / "c.db", ttl=60, clock=clock)
+    cache.put("m", "s", "p", "answer")
+    clock.now += 59
+    assert cache.get("m", "s", "p") == "answer"
+    clock.now += 2
+    assert cache.get("m", "s", "p") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    clock = Clock()
+    cache = LLMCache(tmp_path / "c.db", max_entries=3, clock=clock)
+    for p in "abc":
+        clock.now += 1
+        cache.put("m", "s", p, p.upper())
+    clock.now += 1
+    assert cache.get("m", "s", "a") == "A"  # a is now most recent
+    clock.now += 1
+    cache.put("m", "s", "d", "D")
+    assert len(cache) == 3
+    assert cache.get("m", "s", "b") is None
+    assert [cache.get("m", "s", p) for p in "acd"] == ["A", "C", "D"]
+
+
+def test_concurrent_access(tmp_path):
+    cache = LLMCache(tmp_path / "c.db", max_entries=100)
+
+    def worker(n):
+        for i in range(100):
+            cache.put("m", "s", f"{n}-{i % 20}", str(i))
+            cache.get("m", "s", f"{n}-{i % 20}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.hits == 400 and len(cache) == 80
+
+
+def test_unusable_path_degrades_to_misses(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = LLMCache(blocker / "cache.db")
+    cache.put("m", "s", "p", "v")
+    assert cache.get("m", "s", "p") is None
+    assert cache.stats()["entries"] == 0
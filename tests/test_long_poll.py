@@ -0,0 +1,111 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from layered_agent_full.shared.protocol import FunctionCall
+
+
+@pytest.fixture
+def client(server):
+    client = TestClient(server.app)
+    client.post("/register", json={"token": server.state.bearer_token, "worker_id": "w1", "skills": []})
+    return client
+
+
+def test_long_poll_wakes_on_enqueue(server, client):
+    headers = {"Authorization": server.state.bearer_token}
+
+    def enqueue_later():
+        time.sleep(0.2)
+        server.state.enqueue("w1", FunctionCall(name="dummy", arguments={}))
+
+    threading.Thread(target=enqueue_later).start()
+    start = time.monotonic()
+    resp = client.get("/task/w1", params={"wait": 10}, headers=headers)
+    elapsed = time.monotonic() - start
+
+    assert resp.status_code == 200
+    assert resp.json()["tasks"][0]["function"]["name"] == "dummy"
+    assert elapsed < 5
+
+
+def test_long_poll_times_out_with_204(server, client):
+    headers = {"Authorization": server.state.bearer_token}
+
+    resp = client.get("/task/w1", params={"wait": 0.2}, headers=headers)
+    assert resp.status_code == 204
+
+
+def test_fetch_runs_off_the_event_loop(server, client):
+    token = server.state.bearer_token
+    held = threading.Event()
+
+    def hold_lock():
+        with server.state._lock:  # e.g. a slow SQLite write
+            held.set()
+            time.sleep(0.5)
+
+    async def main():
+        threading.Thread(target=hold_lock).start()
+        held.wait()
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        resp = await server.get_task("w1", wait=0, held=[], authorization=token)
+        ticker.cancel()
+        return resp, ticks
+
+    resp, ticks = asyncio.run(main())
+    assert resp.status_code == 204
+    assert ticks >= 20  # the loop kept running while fetch waited for the lock
+
+
+def test_stream_claims_only_up_to_capacity(server, client):
+    import json
+
+    s = server.state
+    ids = [s.enqueue("w1", FunctionCall(name="dummy")) for _ in range(5)]
+
+    async def main():
+        resp = await server.stream_tasks("w1", capacity=2, authorization=s.bearer_token)
+        events = resp.body_iterator
+
+        async def next_batch():
+            event = await asyncio.wait_for(events.__anext__(), 5)
+            return [t["id"] for t in json.loads(event.split("data: ")[1])["tasks"]]
+
+        first = await next_batch()
+        s.complete(first[0], {})
+        second = await next_batch()
+        await events.aclose()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == ids[:2] and second == ids[2:3]
+    pending = s.conn.execute("SELECT COUNT(*) FROM queue WHERE status='pending'").fetchone()[0]
+    assert pending == 2
+
+
+def test_long_poll_keeps_waiting_after_an_empty_wake(server, client):
+    s = server.state
+    tid = s.enqueue("w1", FunctionCall(name="dummy"))
+    s.fetch_tasks("w1")
+    threading.Timer(0.1, s.complete, (tid, {})).start()
+
+    start = time.monotonic()
+    resp = client.get("/task/w1", params={"wait": 0.6}, headers={"Authorization": s.bearer_token})
+    assert resp.status_code == 204
+    assert time.monotonic() - start >= 0.5
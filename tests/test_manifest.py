@@ -0,0 +1,119 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.worker import manifest as manifest_mod
+from layered_agent_full.worker.executor import SkillPool
+from layered_agent_full.worker.manifest import ManifestIndex, scan_source
+
+SKILLS = '''
+from typing import List, Optional
+import sys
+from layered_agent_full.worker.skills.core import skill
+sys.modules.setdefault("skills_imported", []).append(__name__)
+
+@skill
+def greet(name: str, times: int = 1, loud: bool = False):
+    """Say hello."""
+    return ("Hello " + name) * times
+
+@skill(executor="process", concurrency=2)
+def total(values: List[float], scale: Optional[float] = None, *, tag: "str | None" = "x"):
+    return sum(values) * (scale or 1)
+
+def helper():
+    return 1
+'''
+
+
+def test_scan_source_derives_schema():
+    greet, total = scan_source(SKILLS)
+    assert greet == {
+        "name": "greet",
+        "description": "Say hello.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "times": {"type": "integer", "default": 1},
+                "loud": {"type": "boolean", "default": False},
+            },
+            "required": ["name"],
+            "additionalProperties": False,
+        },
+        "executor": "thread",
+        "concurrency": None,
+    }
+    assert total["executor"] == "process" and total["concurrency"] == 2
+    assert total["parameters"]["properties"] == {
+        "values": {"type": "array", "items": {"type": "number"}},
+        "scale": {"type": ["number", "null"], "default": None},
+        "tag": {"type": ["string", "null"], "default": "x"},
+    }
+    assert total["parameters"]["required"] == ["values"]
+
+
+def test_skills_are_imported_on_first_call(tmp_path):
+    sys.modules.pop("skills_imported", None)
+    (tmp_path / "demo.py").write_text(SKILLS)
+    skills = ManifestIndex().load_dir(tmp_path)
+    assert set(skills) == {"greet", "total"}
+    greet = skills["greet"]
+    assert greet.__name__ == "greet" and greet.__doc__ == "Say hello."
+    assert not greet.loaded and "skills_imported" not in sys.modules
+
+    assert greet("Bo", times=2) == "Hello BoHello Bo"
+    assert skills["total"]([1, 2]) == 3
+    assert sys.modules["skills_imported"] == ["demo"]  # module ran once
+    sys.modules.pop("skills_imported")
+
+
+def test_index_is_persisted_and_rescanned_on_change(tmp_path, monkeypatch):
+    src = tmp_path / "skills"
+    src.mkdir()
+    (src / "demo.py").write_text(SKILLS)
+    cache = tmp_path / "index.json"
+    first = ManifestIndex(cache).load_dir(src)
+    assert cache.exists()
+
+    def no_scan(*a, **k):
+        raise AssertionError("unchanged file was re-parsed")
+
+    monkeypatch.setattr(manifest_mod, "scan_source", no_scan)
+    index = ManifestIndex(cache)
+    again = index.load_dir(src)
+    assert {n: s.parameters for n, s in again.items()} == {
+        n: s.parameters for n, s in first.items()}
+    assert index.load_dir(src)["greet"] is again["greet"]
+    monkeypatch.undo()
+
+    (src / "demo.py").write_text(SKILLS.replace("def greet", "def hello"))
+    assert index.changed(src)
+    assert set(index.load_dir(src)) == {"hello", "total"}
+    (src / "broken.py").write_text("@skill\ndef oops(:\n")
+    assert set(index.load_dir(src)) == {"hello", "total"}
+    (src / "demo.py").unlink()
+    assert index.load_dir(src) == {}
+    assert ManifestIndex(cache).load_dir(src) == {}
+
+
+def test_lazy_skills_run_in_pool(tmp_path):
+    (tmp_path / "demo.py").write_text(SKILLS)
+    skills = ManifestIndex().load_dir(tmp_path)
+    pool = SkillPool(max_workers=2, max_processes=1)
+
+    def run(skill, **kw):
+        out = []
+        finished = threading.Event()
+        task = {"id": skill, "function": {"name": skill, "arguments": kw}}
+        pool.submit(task, skills, lambda t, st, res: (out.append((st, res)), finished.set()))
+        assert finished.wait(10)
+        return out[0]
+
+    assert run("total", values=[2, 3]) == ("success", 5)
+    assert not skills["total"].loaded  # imported only inside the pool process
+    assert run("greet", name="x") == ("success", "Hello x")
+    assert skills["total"].loaded
+    pool.shutdown()
@@ -0,0 +1,57 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from memory_utils import ConversationMemory
+
+
+def test_append_writes_one_line_per_message(tmp_path):
+    path = tmp_path / "history.json"
+    mem = ConversationMemory(path)
+    for i in range(120):
+        mem.append("user", f"msg {i}")
+    mem.close()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 120
+    assert json.loads(lines[-1]) == {"role": "user", "content": "msg 119"}
+    assert len(ConversationMemory(path).history) == 120
+
+
+def test_tail_load_and_compaction(tmp_path):
+    path = tmp_path / "history.json"
+    mem = ConversationMemory(path, keep=10, compact_factor=3)
+    for i in range(29):
+        mem.append("user", f"msg {i}")
+    assert len(path.read_text().splitlines()) == 29
+
+    mem.append("user", "msg 29")
+    assert len(path.read_text().splitlines()) == 10
+
+    reloaded = ConversationMemory(path, keep=5)
+    assert [e["content"] for e in reloaded.history] == [f"msg {i}" for i in range(25, 30)]
+
+
+def test_legacy_json_array_is_converted(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps([{"role": "user", "content": "old"}]))
+
+    mem = ConversationMemory(path)
+    mem.append("assistant", "new")
+    mem.close()
+
+    assert [e["content"] for e in ConversationMemory(path).history] == ["old", "new"]
+    assert path.read_text().startswith("{")
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text('{"role": "user", "content": "ok"}\n{"role": "us')
+    assert ConversationMemory(path).history == [{"role": "user", "content": "ok"}]
+
+    mem = ConversationMemory(path)
+    mem.append("user", "next")
+    mem.close()
+    assert [e["content"] for e in ConversationMemory(path).history] == ["ok", "next"]
@@ -0,0 +1,112 @@
+import difflib
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from patch_utils import PatchError, PatchValidator, apply_unified_diff
+
+
+def _diff(a: str, b: str) -> str:
+    return "".join(difflib.unified_diff(
+        a.splitlines(keepends=True), b.splitlines(keepends=True),
+        "a/boot_repair.py", "b/boot_repair.py"))
+
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 41))
+
+
+def test_apply_round_trips_difflib_output():
+    rng = random.Random(7)
+    for _ in range(200):
+        lines = ORIGINAL.splitlines(keepends=True)
+        for _ in range(rng.randint(1, 6)):
+            i = rng.randrange(len(lines))
+            op = rng.choice("ird")
+            if op == "i":
+                lines.insert(i, f"new {rng.random()}\n")
+            elif op == "r":
+                lines[i] = f"changed {rng.random()}\n"
+            elif len(lines) > 1:
+                del lines[i]
+        target = "".join(lines)
+        assert apply_unified_diff(ORIGINAL, _diff(ORIGINAL, target)) == target
+
+
+def test_hunk_applies_at_offset():
+    edited = ORIGINAL.replace("line 30\n", "line thirty\n")
+    diff = _diff(ORIGINAL, edited)
+    shifted = "header\nheader\n" + ORIGINAL
+    assert apply_unified_diff(shifted, diff) == "header\nheader\n" + edited
+
+
+def test_missing_newline_at_end_of_file():
+    a = "x = 1\ny = 2"
+    marked = (
+        "--- a\n+++ b\n@@ -1,2 +1,2 @@\n x = 1\n-y = 2\n"
+        "\\ No newline at end of file\n+y = 3\n"
+        "\\ No newline at end of file\n"
+    )
+    assert apply_unified_diff(a, marked) == "x = 1\ny = 3"
+
+
+def test_blank_context_without_leading_space():
+    a = "def f():\n\n    return 1\n"
+    diff = (
+        "--- a\n+++ b\n@@ -1,3 +1,3 @@\n"
+        " def f():\n\n-    return 1\n+    return 2\n"
+    )
+    assert apply_unified_diff(a, diff) == "def f():\n\n    return 2\n"
+
+
+@pytest.mark.parametrize("diff", [
+    "",
+    "not a diff",
+    "--- a\n+++ b\n@@ -1,2 +1,2 @@\n-nope\n+yes\n context\n",
+    "--- a\n+++ b\n@@ -1,3 +1,3 @@\n line 1\n-line 2\n",
+    "--- a\n+++ b\n@@ -1 +1 @@\n-line 1\n+x\n"
+    "--- c\n+++ d\n@@ -1 +1 @@\n-a\n+b\n",
+])
+def test_bad_diffs_raise(diff):
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, diff)
+
+
+@pytest.fixture
+def validator(tmp_path):
+    (tmp_path / "helper_mod.py").write_text("VALUE = 41\n")
+    v = PatchValidator(tmp_path, preload=("helper_mod",), timeout=2)
+    yield v
+    v.close()
+
+
+def test_validator_runs_candidates_in_warm_sandbox(validator, tmp_path):
+    ok = validator.validate(
+        "import sys, helper_mod\n"
+        "assert sys.argv[1:] == ['--testmode']\n"
+        "assert helper_mod.VALUE == 41\n"
+        "open('scratch.txt', 'w').write('x')\n"
+    )
+    assert ok == {"passed": True, "reason": "All good."}
+    assert not (tmp_path / "scratch.txt").exists()
+
+    bad = validator.validate("print('oops'); raise SystemExit(3)")
+    assert not bad["passed"]
+    assert "Exit code 3" in bad["reason"] and "oops" in bad["reason"]
+
+    err = validator.validate("import no_such_module_here\n")
+    assert not err["passed"] and "ModuleNotFoundError" in err["reason"]
+
+
+def test_validator_reuses_helper_and_enforces_timeout(validator):
+    if not validator.warm:
+        pytest.skip("fork not available")
+    validator.validate("pass")
+    pid = validator._proc.pid
+    slow = validator.validate("import time; time.sleep(30)")
+    assert not slow["passed"] and "Timed out" in slow["reason"]
+    assert validator.validate("pass")["passed"]
+    assert validator._proc.pid == pid
@@ -1,10 +1,19 @@
+import hashlib
+import http.server
+import json
+import subprocess
 import sys
+import threading
 from pathlib import Path
+import os
+import time
 import types
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from layered_agent_full.plugin_manager import PluginManager
+from layered_agent_full.plugin_manager import ModuleCache, PluginManager
 
 # load refresh_skills from worker without executing main
 
@@ -35,3 +44,200 @@ def test_plugin_loading(tmp_path):
     refresh_skills(pm)
     assert 'greet' in mod.skills
     assert callable(mod.skills['greet'])
+
+
+SKILL_SRC = (
+    "from layered_agent_full.worker.skills.core import skill\n"
+    "CALLS = []\n"
+    "CALLS.append(1)\n\n"
+    "@skill\n"
+    "def {name}():\n"
+    "    return {value!r}\n"
+)
+
+
+def _write(path, name, value):
+    path.write_text(SKILL_SRC.format(name=name, value=value))
+
+
+def test_cache_only_reimports_changed_files(tmp_path):
+    _write(tmp_path / 'a.py', 'alpha', 1)
+    _write(tmp_path / 'b.py', 'beta', 2)
+    cache = ModuleCache()
+    skills = cache.load_dir(tmp_path)
+    assert {n: f() for n, f in skills.items()} == {'alpha': 1, 'beta': 2}
+    assert not cache.changed(tmp_path)
+
+    first = cache.load_dir(tmp_path)
+    assert first['alpha'] is skills['alpha']
+
+    # touching without editing restats but does not re-execute
+    st = (tmp_path / 'a.py').stat()
+    os.utime(tmp_path / 'a.py', ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.changed(tmp_path)
+    assert cache.load_dir(tmp_path)['alpha'] is skills['alpha']
+    assert not cache.changed(tmp_path)
+
+    _write(tmp_path / 'b.py', 'beta', 'two')
+    reloaded = cache.load_dir(tmp_path)
+    assert reloaded['alpha'] is skills['alpha']
+    assert reloaded['beta']() == 'two'
+
+    (tmp_path / 'a.py').unlink()
+    assert cache.changed(tmp_path)
+    assert set(cache.load_dir(tmp_path)) == {'beta'}
+    assert tmp_path / 'a.py' not in cache._modules
+
+
+def test_cache_does_not_shadow_real_modules(tmp_path):
+    _write(tmp_path / 'json.py', 'fake', 1)
+    cache = ModuleCache()
+    assert cache.load_dir(tmp_path)['fake']() == 1
+    assert sys.modules['json'] is json
+
+
+def test_cache_keeps_skills_of_broken_edit(tmp_path, caplog):
+    path = tmp_path / 'a.py'
+    _write(path, 'alpha', 1)
+    cache = ModuleCache()
+    good = cache.load_dir(tmp_path)['alpha']
+
+    path.write_text("def broken(:\n")
+    assert cache.load_dir(tmp_path)['alpha'] is good
+    caplog.clear()
+    assert not cache.changed(tmp_path)
+    assert cache.load_dir(tmp_path)['alpha'] is good
+    assert not caplog.records  # not retried until edited again
+
+    (tmp_path / 'new.py').write_text("raise RuntimeError('boom')\n")
+    assert set(cache.load_dir(tmp_path)) == {'alpha'}
+
+    _write(path, 'alpha', 'fixed')
+    assert cache.load_dir(tmp_path)['alpha']() == 'fixed'
+
+
+def test_plugin_manager_detects_changes(tmp_path):
+    pm = PluginManager(plugin_dir=tmp_path)
+    assert pm.discover_plugins() == {}
+    assert not pm.plugins_changed()
+    _write(tmp_path / 'p.py', 'plug', 3)
+    assert pm.plugins_changed()
+    assert pm.discover_plugins()['plug']() == 3
+    assert not pm.plugins_changed()
+
+
+def test_watch_skills_hot_reloads(tmp_path):
+    import threading
+    pm = PluginManager(plugin_dir=tmp_path)
+    _, mod = load_refresh()
+    mod.refresh_skills(pm)
+    seen = []
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=mod.watch_skills, args=(0.01, seen.append, pm, stop))
+    watcher.start()
+    try:
+        _write(tmp_path / 'p.py', 'plug', 4)
+        deadline = time.time() + 5
+        while not seen and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        watcher.join()
+    assert len(seen) == 1
+    assert seen[0]['plug']() == 4 and 'run_shell' in seen[0]
+
+
+class _PluginHandler(http.server.BaseHTTPRequestHandler):
+    files = {}
+    hits = []
+
+    def do_GET(self):
+        name = self.path.lstrip('/')
+        self.hits.append((name, self.headers.get('If-None-Match')))
+        if name not in self.files:
+            self.send_error(404)
+            return
+        body = self.files[name].encode()
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:12]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def plugin_server():
+    _PluginHandler.files = {
+        f'p{i}.py': SKILL_SRC.format(name=f'plug{i}', value=i) for i in range(6)}
+    _PluginHandler.hits = []
+    srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _PluginHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{srv.server_address[1]}'
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_install_many_uses_conditional_requests(tmp_path, plugin_server):
+    pm = PluginManager(plugin_dir=tmp_path, max_workers=4)
+    urls = [f'{plugin_server}/p{i}.py' for i in range(6)]
+    results = pm.install_many(urls + [f'{plugin_server}/missing.py'])
+    assert isinstance(results.pop(f'{plugin_server}/missing.py'), Exception)
+    assert results == {u: tmp_path / u.rsplit('/', 1)[1] for u in urls}
+    assert {n: f() for n, f in pm.discover_plugins().items()} == {
+        f'plug{i}': i for i in range(6)}
+
+    _PluginHandler.hits.clear()
+    _PluginHandler.files['p0.py'] = SKILL_SRC.format(name='plug0', value='new')
+    (tmp_path / 'p1.py').write_text('# edited locally\n')
+    pm = PluginManager(plugin_dir=tmp_path)  # validators persist on disk
+    pm.install_many(urls)
+    conditional = {name for name, etag in _PluginHandler.hits if etag}
+    assert conditional == {f'p{i}.py' for i in (0, 2, 3, 4, 5)}
+    assert pm.discover_plugins()['plug0']() == 'new'
+    assert pm.discover_plugins()['plug1']() == 1
+
+
+def _git(*args, cwd=None):
+    subprocess.run(
+        ['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args],
+        cwd=cwd, check=True, capture_output=True)
+
+
+def test_load_from_git_caches_by_commit(tmp_path, monkeypatch):
+    work = tmp_path / 'work'
+    (work / 'skills').mkdir(parents=True)
+    _write(work / 'skills' / 'g.py', 'gitskill', 1)
+    _git('init', '-q', '-b', 'main', str(work))
+    _git('add', '.', cwd=work)
+    _git('commit', '-qm', 'one', cwd=work)
+    bare = tmp_path / 'plugins.git'
+    _git('clone', '-q', '--bare', str(work), str(bare))
+
+    pm = PluginManager(plugin_dir=tmp_path / 'plugins')
+    pm.load_from_git(str(bare), subdir='skills')
+    assert pm.discover_plugins()['gitskill']() == 1
+
+    calls = []
+    real_git = pm._git
+    monkeypatch.setattr(pm, '_git', lambda *a, **k: (calls.append(a), real_git(*a, **k))[1])
+    pm.load_from_git(str(bare), subdir='skills')
+    assert [c[0] for c in calls] == ['ls-remote']  # same commit: no fetch
+    assert not pm.plugins_changed()
+
+    _write(work / 'skills' / 'g.py', 'gitskill', 2)
+    _git('commit', '-qam', 'two', cwd=work)
+    _git('push', '-q', str(bare), 'main', cwd=work)
+    calls.clear()
+    pm.load_from_git(str(bare), subdir='skills')
+    assert {'fetch', 'archive'} <= {arg for c in calls for arg in c}
+    assert pm.discover_plugins()['gitskill']() == 2
+    assert len(list((pm.cache_dir / 'git' / 'trees').iterdir())) == 2
@@ -1,18 +1,16 @@
 import sys
+import time
 from pathlib import Path
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from layered_agent_full.shared import state as state_module
 from layered_agent_full.shared.protocol import FunctionCall
 
 
-def test_enqueue_fetch_once(tmp_path):
-    # use isolated database
-    db_path = tmp_path / "tasks.db"
-    state_module.DB_PATH = db_path
-    state_module.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-
+def test_enqueue_fetch_once(state_db):
     s = state_module.CommanderState()
     fc = FunctionCall(name="dummy", arguments={"a": 1})
     s.enqueue("worker1", fc)
@@ -23,3 +21,113 @@ def test_enqueue_fetch_once(tmp_path):
 
     # second fetch should yield nothing since task marked as sent
     assert s.fetch_tasks("worker1") == []
+
+
+def test_queue_storage_uses_wal_and_index(state_db):
+    s = state_module.CommanderState()
+
+    assert s.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = s.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM queue WHERE worker_id=? AND status='pending'",
+        ("w1",),
+    ).fetchall()
+    assert "idx_queue_claim" in " ".join(str(r) for r in plan)
+
+
+def test_enqueue_many_single_commit(state_db):
+    s = state_module.CommanderState()
+    fc = FunctionCall(name="dummy", arguments={})
+
+    ids = s.enqueue_many([("w1", fc), ("w2", fc), ("w1", fc)])
+
+    assert len(set(ids)) == 3
+    assert not s.conn.in_transaction
+    assert len(s.fetch_tasks("w1")) == 2
+    audits = s.conn.execute("SELECT COUNT(*) FROM audit WHERE action='enqueue'").fetchone()[0]
+    assert audits == 3
+
+
+def test_fetch_respects_max_tasks_and_lease(state_db):
+    s = state_module.CommanderState()
+    fc = FunctionCall(name="dummy", arguments={})
+    ids = s.enqueue_many([("w1", fc)] * 3)
+
+    first = s.fetch_tasks("w1", max_tasks=2, lease=0)
+    assert [t["id"] for t in first] == ids[:2]
+
+    # zero-length lease: unfinished tasks are claimable again
+    again = s.fetch_tasks("w1")
+    assert [t["id"] for t in again] == ids
+
+    s.complete(ids[0], {"ok": True})
+    assert s.fetch_tasks("w1") == []
+    assert s.requeue_expired() == 0
+
+
+def test_concurrent_claims_are_disjoint(state_db):
+    from concurrent.futures import ThreadPoolExecutor
+
+    s = state_module.CommanderState()
+    s.enqueue_many([("w1", FunctionCall(name="dummy"))] * 200)
+
+    with ThreadPoolExecutor(8) as pool:
+        batches = list(pool.map(lambda _: s.fetch_tasks("w1", max_tasks=7), range(40)))
+
+    claimed = [t["id"] for b in batches for t in b]
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
+
+
+def test_failed_enqueue_many_has_no_side_effects(state_db):
+    s = state_module.CommanderState()
+    ok = FunctionCall(name="dummy", arguments={"a": 1})
+    bad = FunctionCall(name="dummy", arguments={"a": {1, 2}})  # not JSON
+    with pytest.raises(TypeError):
+        s.enqueue_many([("w1", ok), ("w2", bad)])
+    assert s.conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0] == 0
+    assert s._inflight == {} and s.outstanding == {}
+    assert s.task_seq("w1") == 0  # no waiter was woken for the rolled-back task
+
+    tid = s.enqueue("w1", ok)
+    assert s.task_seq("w1") == 1 and s.outstanding == {"w1": 1}
+    s.complete(tid, {"ok": True})
+    assert s._inflight == {} and s.outstanding == {"w1": 0}
+
+
+def test_polling_renews_held_leases(state_db):
+    s = state_module.CommanderState()
+    s.register_worker("w1", {"skills": [{"name": "dummy"}]})
+    s.lease_seconds = 0.3
+    long_task = s.enqueue("w1", FunctionCall(name="dummy"))
+    assert [t["id"] for t in s.fetch_tasks("w1")] == [long_task]
+
+    # the worker keeps polling (empty) while the task runs past its lease
+    for _ in range(4):
+        time.sleep(0.1)
+        assert s.fetch_tasks("w1", max_tasks=0, held=[long_task]) == []
+    assert s.requeue_expired() == 0
+    assert s.fetch_tasks("w1") == []
+
+    # once the worker goes quiet the lease lapses as before
+    time.sleep(0.4)
+    assert s.requeue_expired() == 1
+    assert [t["id"] for t in s.fetch_tasks("w1")] == [long_task]
+
+
+def test_unacknowledged_task_is_redelivered_despite_polling(state_db):
+    s = state_module.CommanderState()
+    s.register_worker("w1", {"skills": [{"name": "dummy"}]})
+    s.lease_seconds = 0.3
+    lost = s.enqueue("w1", FunctionCall(name="dummy"))
+    assert [t["id"] for t in s.fetch_tasks("w1")] == [lost]
+
+    # the response never reached the worker: it keeps polling without the task
+    deadline = time.monotonic() + 2
+    redelivered = []
+    while not redelivered and time.monotonic() < deadline:
+        time.sleep(0.1)
+        s.requeue_expired()
+        redelivered = s.fetch_tasks("w1")
+    assert [t["id"] for t in redelivered] == [lost]
+    s.complete(lost, {})
+    assert s.outstanding == {"w1": 0}
@@ -0,0 +1,150 @@
+import sys
+import json
+import random
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from layered_agent_full.shared.protocol import FunctionCall
+from layered_agent_full.worker.client import Backoff
+from layered_agent_full.worker.results import ResultBuffer
+
+
+def test_post_results_json_and_ndjson(server):
+    client = TestClient(server.app)
+    headers = {"Authorization": server.state.bearer_token}
+    ids = server.state.enqueue_many([("w1", FunctionCall(name="dummy"))] * 3)
+    server.state.fetch_tasks("w1")
+
+    body = {"results": [{"task_id": ids[0], "payload": json.dumps({"n": 0})}]}
+    resp = client.post("/results", json=body, headers=headers)
+    assert resp.json() == {"status": "ok", "count": 1}
+
+    lines = "\n".join(
+        json.dumps({"task_id": tid, "payload": json.dumps({"n": i})})
+        for i, tid in enumerate(ids[1:], 1)
+    )
+    resp = client.post(
+        "/results",
+        content=lines.encode(),
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert resp.json()["count"] == 2
+
+    done = server.state.conn.execute("SELECT COUNT(*) FROM queue WHERE status='done'").fetchone()[0]
+    assert done == 3
+    assert json.loads(server.state.history[-1].content)["result"] == {"n": 2}
+
+
+def test_post_results_reports_bad_entries(server):
+    client = TestClient(server.app)
+    headers = {"Authorization": server.state.bearer_token}
+    (tid,) = server.state.enqueue_many([("w1", FunctionCall(name="dummy"))])
+    server.state.fetch_tasks("w1")
+
+    body = {"results": [{"payload": "{}"}, {"task_id": tid, "payload": "{}"}]}
+    resp = client.post("/results", json=body, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["count"] == 1
+    assert [e["index"] for e in resp.json()["errors"]] == [0]
+    assert server.state.conn.execute("SELECT status FROM queue WHERE id=?", (tid,)).fetchone()[0] == "done"
+
+    resp = client.post("/results", json={"results": "nope"}, headers=headers)
+    assert resp.status_code == 422
+
+
+def wait_for(pred, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not pred() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_result_buffer_flushes_on_size_and_time():
+    sent = []
+    buf = ResultBuffer(sent.append, max_items=3, max_delay=0.2)
+    for i in range(3):
+        buf.add({"task_id": str(i)})
+    wait_for(lambda: len(sent) == 1)
+    buf.add({"task_id": "late"})
+    wait_for(lambda: len(sent) == 2)
+    buf.close()
+
+    assert [len(b) for b in sent] == [3, 1]
+
+
+def test_result_buffer_keeps_batch_on_failure():
+    calls = []
+
+    def flaky(batch):
+        calls.append(list(batch))
+        if len(calls) == 1:
+            raise ConnectionError("down")
+
+    buf = ResultBuffer(flaky, max_items=100, max_delay=60)
+    buf.add({"task_id": "a"})
+    assert buf.flush() == 0
+    assert buf.flush() == 1
+    buf.close()
+    assert calls[-1] == [{"task_id": "a"}]
+
+
+class _Rejected(Exception):
+    def __init__(self, status):
+        self.response = type("Response", (), {"status_code": status})()
+
+
+def test_result_buffer_dead_letters_rejected_batches():
+    calls = []
+
+    def send(batch):
+        calls.append(list(batch))
+        raise _Rejected(400)
+
+    buf = ResultBuffer(send, max_items=100, max_delay=60)
+    buf.add({"task_id": "a"})
+    assert buf.flush() == 0
+    assert buf.flush() == 0
+    buf.close()
+    assert len(calls) == 1
+    assert list(buf.dead_letter) == [{"task_id": "a"}]
+
+
+def test_result_buffer_retries_server_errors_and_caps_size():
+    calls = []
+
+    def send(batch):
+        calls.append(list(batch))
+        raise _Rejected(503)
+
+    buf = ResultBuffer(send, max_items=100, max_delay=60, max_pending=2)
+    for tid in "abc":
+        buf.add({"task_id": tid})
+    assert buf.dropped == 1
+    buf.flush()
+    buf.flush()
+    assert calls == [[{"task_id": "b"}, {"task_id": "c"}]] * 2
+    assert not buf.dead_letter
+    buf.close()
+
+
+def test_result_buffer_backs_off_while_uploads_fail():
+    calls = []
+
+    def down(batch):
+        calls.append(len(batch))
+        raise ConnectionError("down")
+
+    backoff = Backoff(base=1.0, cap=60.0, rng=random.Random(0))
+    buf = ResultBuffer(down, max_items=5, max_delay=0.05, backoff=backoff)
+    for i in range(5):
+        buf.add({"task_id": str(i)})
+    time.sleep(1.0)
+    assert 1 <= len(calls) <= 4
+    assert backoff.failures == len(calls)
+
+    buf.send = lambda batch: calls.append(len(batch))
+    assert buf.flush() == 5
+    assert backoff.failures == 0
+    buf.close()
@@ -0,0 +1,84 @@
+import sys
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared import state as state_module
+from layered_agent_full.shared.protocol import FunctionCall
+from layered_agent_full.shared.routing import LatencyWeighted
+
+
+def make_state(routing):
+    s = state_module.CommanderState(routing=routing)
+    for wid in ("w1", "w2", "w3"):
+        s.register_worker(wid, {"skills": [{"name": "ping"}]})
+    s.register_worker("w4", {"skills": [{"name": "other"}]})
+    return s
+
+
+def test_index_tracks_reregistration(state_db):
+    s = make_state("round_robin")
+    assert s.skill_workers["ping"] == ["w1", "w2", "w3"]
+
+    s.register_worker("w2", {"skills": [{"name": "other"}]})
+    assert s.skill_workers["ping"] == ["w1", "w3"]
+    assert s.skill_workers["other"] == ["w4", "w2"]
+    assert s.get_worker_with_skill("missing") is None
+
+
+def test_round_robin_spreads_load(state_db):
+    s = make_state("round_robin")
+    picks = [s.get_worker_with_skill("ping") for _ in range(6)]
+    assert picks == ["w1", "w2", "w3", "w1", "w2", "w3"]
+
+
+def test_least_outstanding_prefers_idle_worker(state_db):
+    s = make_state("least_outstanding")
+    busy = s.enqueue("w1", FunctionCall(name="ping"))
+    s.enqueue("w2", FunctionCall(name="ping"))
+
+    assert s.get_worker_with_skill("ping") == "w3"
+    s.complete(busy, {})
+    assert s.outstanding["w1"] == 0
+    assert "w1" in s.latency
+
+
+def test_latency_weighted_favours_fast_worker(state_db):
+    s = make_state(LatencyWeighted(random.Random(0)))
+    s.latency.update({"w1": 0.01, "w2": 1.0, "w3": 1.0})
+
+    picks = [s.get_worker_with_skill("ping") for _ in range(200)]
+    assert picks.count("w1") > 150
+
+
+def test_least_outstanding_buckets_follow_load_and_membership(state_db):
+    s = make_state("least_outstanding")
+    assert [s.get_worker_with_skill("ping") for _ in range(3)] == ["w1", "w2", "w3"]
+
+    busy = s.enqueue("w1", FunctionCall(name="ping"))
+    s.enqueue("w3", FunctionCall(name="ping"))
+    assert [s.get_worker_with_skill("ping") for _ in range(2)] == ["w2", "w2"]
+
+    s.register_worker("w2", {"skills": [{"name": "other"}]})
+    s.complete(busy, {})
+    assert s.get_worker_with_skill("ping") == "w1"
+
+    s.last_seen["w1"] = 0
+    s.reap(ttl=60)
+    assert s.get_worker_with_skill("ping") == "w3"
+    assert {s.get_worker_with_skill("other") for _ in range(2)} == {"w4", "w2"}
+
+
+def test_least_outstanding_buckets_match_linear_scan(state_db):
+    s = make_state("least_outstanding")
+    rng = random.Random(0)
+    pending = []
+    for _ in range(200):
+        if pending and rng.random() < 0.4:
+            s.complete(pending.pop(rng.randrange(len(pending))), {})
+        else:
+            wid = s.get_worker_with_skill("ping")
+            least = min(s.outstanding.get(w, 0) for w in s.skill_workers["ping"])
+            assert s.outstanding.get(wid, 0) == least
+            pending.append(s.enqueue(wid, FunctionCall(name="ping")))
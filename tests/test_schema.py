@@ -0,0 +1,58 @@
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared import state as state_module
+from layered_agent_full.shared.schema import SkillSchemaIndex
+
+
+SKILLS = [
+    {"name": "run_shell", "description": "Execute shell command"},
+    {"name": "capture_image", "description": "Capture a single image from the default camera."},
+    {"name": "record_audio", "description": "Record audio from the microphone."},
+]
+
+
+def test_updates_are_incremental_and_versioned():
+    idx = SkillSchemaIndex()
+    for meta in SKILLS:
+        assert idx.update(meta)
+    version, cached = idx.version, idx.as_list()
+
+    assert not idx.update(SKILLS[0])
+    assert idx.version == version
+    assert idx.as_list() is cached
+
+    idx.update({"name": "run_shell", "description": "Run a command"})
+    assert idx.version == version + 1
+    assert json.loads(idx.serialized())[0]["description"] == "Run a command"
+
+    idx.remove("record_audio")
+    assert [e["name"] for e in idx.as_list()] == ["run_shell", "capture_image"]
+
+
+def test_top_k_ranks_by_relevance():
+    idx = SkillSchemaIndex()
+    for meta in SKILLS:
+        idx.update(meta)
+
+    assert [e["name"] for e in idx.top_k("please record some audio", 1)] == ["record_audio"]
+    assert idx.top_k("take a picture with the camera", 2)[0]["name"] == "capture_image"
+    assert len(idx.top_k("hello", 2)) == 2
+    assert len(idx.top_k("hello", 10)) == 3
+
+
+def test_register_and_reap_keep_schema_in_sync(state_db):
+    s = state_module.CommanderState()
+    s.register_worker("w1", {"skills": SKILLS[:2]})
+    s.register_worker("w2", {"skills": SKILLS[1:]})
+    assert len(s.function_schema) == 3
+
+    s.register_worker("w1", {"skills": SKILLS[1:2]})
+    assert {e["name"] for e in s.function_schema} == {"capture_image", "record_audio"}
+
+    s.last_seen["w2"] = 0
+    s.reap(ttl=60)
+    assert [e["name"] for e in s.function_schema] == ["capture_image"]
@@ -0,0 +1,41 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layered_agent_full.shared.utils import SecretsFile, aes_decrypt, aes_encrypt, fernet_for
+
+
+def test_secrets_file_rereads_only_on_change(tmp_path):
+    path = tmp_path / "secrets.toml"
+    secrets = SecretsFile(path, check_interval=0)
+    assert secrets.get("vault_passphrase") is None
+
+    path.write_text('vault_passphrase = "one"\n')
+    assert secrets.get("vault_passphrase") == "one"
+
+    # same size and mtime: the cached value is served
+    data = secrets.data()
+    assert secrets.data() is data
+
+    path.write_text('vault_passphrase = "two!"\n')
+    os.utime(path, ns=(0, 10**9))
+    assert secrets.get("vault_passphrase") == "two!"
+
+
+def test_invalidate_forces_reload(tmp_path):
+    path = tmp_path / "secrets.toml"
+    path.write_text('vault_passphrase = "a"\n')
+    secrets = SecretsFile(path, check_interval=3600)
+    assert secrets.get("vault_passphrase") == "a"
+
+    path.write_text('vault_passphrase = "b"\n')
+    assert secrets.get("vault_passphrase") == "a"
+    secrets.invalidate()
+    assert secrets.get("vault_passphrase") == "b"
+
+
+def test_fernet_is_cached_per_passphrase():
+    assert fernet_for("p") is fernet_for("p")
+    assert aes_decrypt(aes_encrypt(b"data", "p"), "p") == b"data"
@@ -0,0 +1,68 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from telemetry_utils import FIELDS, RingBuffer, TelemetrySampler
+
+
+def test_ring_buffer_rolls_over_window():
+    buf = RingBuffer(4)
+    assert buf.mean is None and buf.last is None and buf.max() is None
+    for v in range(1, 4):
+        buf.push(v)
+    assert len(buf) == 3
+    assert buf.mean == pytest.approx(2.0)
+    assert (buf.min(), buf.max(), buf.last) == (1, 3, 3)
+
+    for v in range(4, 11):
+        buf.push(v)
+    assert len(buf) == 4
+    assert buf.mean == pytest.approx(8.5)  # 7, 8, 9, 10
+    assert (buf.min(), buf.max(), buf.last) == (7, 10, 10)
+
+
+def test_ring_buffer_sum_does_not_drift():
+    buf = RingBuffer(10)
+    for i in range(100_000):
+        buf.push(0.1 * (i % 7))
+    exact = sum(0.1 * (i % 7) for i in range(100_000 - 10, 100_000)) / 10
+    assert buf.mean == pytest.approx(exact, abs=1e-12)
+
+
+def test_sampler_records_in_background():
+    readings = iter(
+        (float(i), 50.0 + i, 100.0 - i, 1.0) for i in range(1_000_000))
+    sampler = TelemetrySampler(
+        interval=0.005, window=8, probe=lambda: next(readings))
+    sampler.start()
+    try:
+        deadline = time.time() + 5
+        while len(sampler) < 8 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        sampler.stop()
+    assert len(sampler) == 8
+
+    state = sampler.state()
+    summary = sampler.summary()
+    assert set(state) == set(FIELDS)
+    assert state["efi_mounted"] is True
+    cpu = summary["cpu_percent"]
+    assert cpu["max"] - cpu["min"] == 7
+    assert state["cpu_percent"] == pytest.approx(cpu["max"] - 3.5)
+    assert state["disk_free_gb"] == summary["disk_free_gb"]["last"]
+
+
+def test_state_samples_once_when_empty():
+    sampler = TelemetrySampler(probe=lambda: (10.0, 20.0, 30.0, 0.0))
+    assert sampler.state() == {
+        "cpu_percent": 10.0,
+        "memory_percent": 20.0,
+        "disk_free_gb": 30.0,
+        "efi_mounted": False,
+    }
+    assert len(sampler) == 1
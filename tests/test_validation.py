@@ -0,0 +1,92 @@
+import sys
+import inspect
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import HTTPException
+from layered_agent_full.shared import state as state_module
+from layered_agent_full.shared.protocol import FunctionCall
+from layered_agent_full.shared.validation import InvalidArguments, compile_validator
+from layered_agent_full.worker.manifest import scan_source, signature_schema
+from layered_agent_full.worker.skills.core import run_shell, skill
+
+
+@skill
+def shaped(command: str, timeout: int = 120, env: Optional[Dict[str, str]] = None,
+           args: List[str] | None = None, ratio: float = 0.5, dry: bool = False):
+    pass
+
+
+RUN_SHELL = {"name": "run_shell", "description": "", "parameters": signature_schema(run_shell)}
+
+
+def test_signature_and_ast_schemas_agree():
+    assert signature_schema(shaped) == scan_source(inspect.getsource(shaped))[0]["parameters"]
+    assert signature_schema(run_shell) == {
+        "type": "object",
+        "properties": {
+            "command": {"type": "string"},
+            "timeout": {"type": "integer", "default": 120},
+        },
+        "required": ["command"],
+        "additionalProperties": False,
+    }
+    assert "additionalProperties" not in signature_schema(lambda a, **kw: None)
+
+
+def test_compiled_validator():
+    validate = compile_validator(signature_schema(shaped))
+    assert validate({"command": "ls"}) == []
+    assert validate({"command": "ls", "timeout": 5, "env": None, "args": ["-l"], "ratio": 1}) == []
+    assert validate({}) == ["arguments: missing required argument 'command'"]
+    assert validate({"command": "ls", "timeout": "5"}) == [
+        "arguments.timeout: expected integer, got str"]
+    assert validate({"command": "ls", "timeout": True, "dry": 1, "bogus": 0}) == [
+        "arguments.timeout: expected integer, got bool",
+        "arguments.dry: expected boolean, got int",
+        "arguments: unexpected argument 'bogus'",
+    ]
+    assert validate({"command": "ls", "args": ["a", 2]}) == [
+        "arguments.args[1]: expected string, got int"]
+    assert validate(["ls"]) == ["arguments: expected object, got list"]
+
+    # legacy workers advertise ``{}``; anything goes
+    assert compile_validator({})({"whatever": 1}) == []
+    assert compile_validator({"type": "object", "properties": {"x": {"type": "decimal"}}})({"x": "1"}) == []
+
+
+def test_enqueue_rejects_invalid_calls(state_db):
+    s = state_module.CommanderState()
+    s.register_worker("w1", {"skills": [RUN_SHELL]})
+    ok = FunctionCall(name="run_shell", arguments={"command": "ls"})
+    bad = FunctionCall(name="run_shell", arguments={"cmd": "ls"})
+
+    with pytest.raises(InvalidArguments) as e:
+        s.enqueue_many([("w1", ok), ("w1", bad)])
+    assert e.value.errors == [
+        "arguments: missing required argument 'command'",
+        "arguments: unexpected argument 'cmd'",
+    ]
+    assert s.conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0] == 0
+    assert s.outstanding.get("w1", 0) == 0
+
+    s.enqueue("w1", ok)
+    assert len(s.fetch_tasks("w1")) == 1
+
+    # re-registering with a new schema recompiles the validator
+    s.register_worker("w1", {"skills": [{**RUN_SHELL, "parameters": {}}]})
+    s.enqueue("w1", bad)
+
+
+def test_chat_call_with_bad_arguments_is_422(server):
+    server.state.register_worker("w1", {"skills": [RUN_SHELL]})
+
+    for arguments in ('{"command": 5}', '{"command": ', '[1]', '"x"', ["ls"]):
+        with pytest.raises(HTTPException) as e:
+            server._queue_call("run_shell", arguments)
+        assert e.value.status_code == 422
+    assert "Queued `run_shell`" in server._queue_call("run_shell", '{"command": "ls"}')
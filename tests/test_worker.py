@@ -1,12 +1,6 @@
 import sys
+import types
 from pathlib import Path
-6vfos9-codex/run-all-code-from-the-repo
-=======
-c6btom-codex/run-all-code-from-the-repo
-=======
-w55z61-codex/run-all-code-from-the-repo
-main
-main
 from unittest import mock
 
 # ensure package root on path
@@ -16,6 +10,8 @@ sys.path.insert(0, str(ROOT))
 # Provide stub modules to satisfy imports when dependencies are missing
 sys.modules.setdefault('requests', mock.MagicMock())
 
+from layered_agent_full.worker.skills.core import run_shell
+
 def manual_discover():
     import importlib.util, inspect
     skills_dir = ROOT / 'layered_agent_full' / 'worker' / 'skills'
@@ -53,16 +49,7 @@ def test_sensor_fallback_when_modules_missing():
         reload(sensor2)
         res = sensor2.record_audio()
         assert 'error' in res
-6vfos9-codex/run-all-code-from-the-repo
-=======
-c6btom-codex/run-all-code-from-the-repo
-=======
-=======
-import types
-
-sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from layered_agent_full.worker.skills.core import run_shell
 
 
 def load_worker():
@@ -80,6 +67,3 @@ def test_discover_via_module():
     skills = worker.discover()
     assert 'run_shell' in skills
     assert skills['run_shell'].__name__ == run_shell.__name__
-main
-main
-main
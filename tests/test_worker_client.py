@@ -0,0 +1,108 @@
+import gzip
+import http.server
+import json
+import random
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+from layered_agent_full.commander.middleware import GzipRequestMiddleware
+from layered_agent_full.shared.protocol import FunctionCall
+from layered_agent_full.worker.client import Backoff, WorkerClient
+
+
+def test_backoff_grows_with_jitter_and_resets():
+    b = Backoff(base=1.0, cap=8.0, rng=random.Random(3))
+    delays = [b.next() for _ in range(8)]
+    for n, d in enumerate(delays):
+        assert 0 <= d <= min(8.0, 2 ** n)
+    assert len(set(delays)) == len(delays)
+    assert max(delays[4:]) > 2
+    b.reset()
+    assert b.next() <= 1.0
+
+    # two workers failing together draw different delays
+    a, c = Backoff(rng=random.Random(1)), Backoff(rng=random.Random(2))
+    assert [a.next() for _ in range(3)] != [c.next() for _ in range(3)]
+
+
+class _Commander(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    seen = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        self.seen.append((self.client_address[1], self.path, encoding, json.loads(body)))
+        out = json.dumps({"worker_id": "w1"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def commander():
+    _Commander.seen = []
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Commander)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_client_reuses_connection_and_gzips_large_bodies(commander):
+    client = WorkerClient(commander, "tok")
+    assert client.register({"layer": "L-2", "skills": []}) == "w1"
+    small = [{"task_id": "t0", "payload": "{}"}]
+    large = [{"task_id": f"t{i}", "payload": "x" * 40} for i in range(100)]
+    client.send_results(small)
+    client.send_results(large)
+    client.close()
+
+    ports = {port for port, *_ in _Commander.seen}
+    assert len(ports) == 1  # one TCP connection for all three requests
+    (_, _, enc0, reg), (_, _, enc1, res1), (_, path, enc2, res2) = _Commander.seen
+    assert reg == {"token": "tok", "layer": "L-2", "skills": []}
+    assert (enc0, enc1, enc2) == (None, None, "gzip")
+    assert path == "/results" and res2 == {"results": large}
+
+
+def test_server_inflates_gzip_requests(server):
+    client = TestClient(server.app)
+    headers = {"Authorization": server.state.bearer_token, "Content-Encoding": "gzip"}
+    ids = server.state.enqueue_many([("w1", FunctionCall(name="dummy"))] * 2)
+
+    body = {"results": [{"task_id": t, "payload": json.dumps({"n": i})} for i, t in enumerate(ids)]}
+    resp = client.post("/results", content=gzip.compress(json.dumps(body).encode()), headers=headers)
+    assert resp.json() == {"status": "ok", "count": 2}
+
+    resp = client.post("/results", content=b"not gzip", headers=headers)
+    assert resp.status_code == 400
+    truncated = gzip.compress(json.dumps(body).encode())[:-10]
+    assert client.post("/results", content=truncated, headers=headers).status_code == 400
+
+
+def test_inflated_size_is_bounded():
+    async def echo(scope, receive, send):
+        body = (await receive())["body"]
+        await PlainTextResponse(str(len(body)))(scope, receive, send)
+
+    client = TestClient(GzipRequestMiddleware(echo, max_size=100))
+    headers = {"Content-Encoding": "gzip"}
+    assert client.post("/", content=gzip.compress(b"x" * 100), headers=headers).text == "100"
+    assert client.post("/", content=gzip.compress(b"x" * 101), headers=headers).status_code == 413
+    assert client.post("/", content=b"plain").text == "5"